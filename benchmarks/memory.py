@@ -0,0 +1,139 @@
+'''
+Memory-per-entity benchmark for population groups and firms.
+
+Builds many groups and firms the way the compiled-world loader does and
+reports the bytes each one holds (traced allocations divided by count) and
+the time to read a state field through its property, for the object layout
+and for groups bound to a PopulationStore.
+
+Store-bound groups are not the memory-saving layout. They keep their
+object, params and stream, and add a row view plus one row in every store
+column. So they take more bytes per group than plain objects, and a property
+read through the view is slower. What the store buys is the vectorized
+tick, which benchmarks.run measures. This benchmark guards both layouts
+against regressions.
+
+    python -m benchmarks.memory --count 100000 --output benchmarks/baselines/memory.json
+    python -m benchmarks.memory --count 100000 --compare benchmarks/baselines/memory.json
+'''
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from model.core.random import RandomStreams
+from model.economy import Firm
+from model.population import PopulationGroup, PopulationStore
+
+
+def _build_groups(count: int, streams: RandomStreams) -> list:
+    rng = np.random.default_rng(0)
+    return PopulationGroup.from_arrays(
+        size=rng.integers(100, 10_000, count),
+        base_healthcare=rng.random(count),
+        healthcare_capacity=rng.integers(100, 1_000, count),
+        rngs=[streams.entity("group") for _ in range(count)],
+    )
+
+
+def _build_firms(count: int, streams: RandomStreams) -> list:
+    rng = np.random.default_rng(1)
+    return Firm.from_arrays(
+        productivity=rng.random(count) + 0.5,
+        production_capacity=rng.integers(100, 10_000, count),
+        ownership=["state"] * count,
+        good=["food"] * count,
+        capital=rng.random(count) * 1_000,
+        wage=rng.random(count) * 10,
+        rngs=[streams.entity("firm") for _ in range(count)],
+    )
+
+
+def _traced(build) -> tuple[object, int]:
+    '''Result of build() and the bytes it left allocated.'''
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def _read_seconds(entities, name: str) -> float:
+    '''Seconds per entity to read one property.'''
+    start = time.perf_counter()
+    for entity in entities:
+        getattr(entity, name)
+    return (time.perf_counter() - start) / len(entities)
+
+
+def measure(count: int) -> dict:
+    streams = RandomStreams(seed=0)
+    groups, group_bytes = _traced(lambda: _build_groups(count, streams))
+    firms, firm_bytes = _traced(lambda: _build_firms(count, streams))
+    bound, bound_bytes = _traced(lambda: PopulationStore.from_groups(_build_groups(count, streams), rng=streams))
+    return {
+        "count": count,
+        "group_bytes": group_bytes / count,
+        "firm_bytes": firm_bytes / count,
+        "store_group_bytes": bound_bytes / count,
+        "group_read_ns": _read_seconds(groups, "size") * 1e9,
+        "firm_read_ns": _read_seconds(firms, "employed") * 1e9,
+        "store_group_read_ns": _read_seconds(bound.groups, "size") * 1e9,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    '''Per-entity byte counts of report that grew past baseline.'''
+    regressions = []
+    for name in ("group_bytes", "firm_bytes", "store_group_bytes"):
+        base = baseline["results"].get(name)
+        value = report["results"][name]
+        if base and value > base * (1.0 + tolerance):
+            regressions.append(f"{name}: {value:.0f} bytes is {value / base - 1.0:.0%} above baseline {base:.0f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=100_000, help="groups and firms to build")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline JSON to check results against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed fractional growth in bytes per entity before failing")
+    args = parser.parse_args(argv)
+
+    results = measure(args.count)
+    print(f"{results['count']} entities")
+    for kind in ("group", "firm", "store_group"):
+        print(f"  {kind:<12} {results[kind + '_bytes']:8.0f} bytes  {results[kind + '_read_ns']:6.0f} ns/read")
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "numpy": np.__version__,
+                    "platform": platform.platform()},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+'''
+Scaling benchmark over synthetic worlds.
+
+Each rung of the ladder runs in a fresh process so peak memory is its own.
+Results are written as JSON; pass --compare to check them against a
+recorded baseline and exit non-zero on a throughput regression.
+
+    python -m benchmarks.run --ticks 5 --history-retention 8 --output benchmarks/baselines/columnar.json
+    python -m benchmarks.run --groups 1000 10000 --history-retention 8 --compare benchmarks/baselines/columnar.json
+
+City histories grow with the samples they record, so a short run only pays
+for a few samples per group at any configured retention. --history-retention
+caps them for every rung alike; peak memory in a baseline is only comparable
+at the same setting.
+'''
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+
+from config import CONFIG
+from model.core.synthetic_world import SyntheticWorldSpec, write_synthetic_world
+from model.core.ticks import Core
+
+
+DEFAULT_LADDER = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def run_rung(groups: int, ticks: int, engine: str, streams: str, seed: int,
+             history_retention: int | None = None) -> dict:
+    '''Build a synthetic world of about this many groups and time ticking it.'''
+    spec = SyntheticWorldSpec.for_group_count(groups, seed=seed)
+    city_cfg = CONFIG.get("city")
+    if history_retention is not None:
+        city_cfg = {**city_cfg, "history": {**city_cfg.get("history", {}), "retention": history_retention}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "world.json")
+        write_synthetic_world(path, spec)
+
+        core = Core(
+            seed_cfg={"seed": seed, "use": True, "streams": streams},
+            city_cfg=city_cfg,
+            province_cfg=CONFIG.get("province"),
+            country_cfg=CONFIG.get("country"),
+            core_cfg={"population": {"engine": engine}, "profiler": {"enabled": True}},
+        )
+        start = time.perf_counter()
+        core.build_sim(path)
+        build_seconds = time.perf_counter() - start
+
+    core.tick()  # warm-up
+    core.profiler.ticks.clear()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        core.tick()
+    elapsed = time.perf_counter() - start
+    totals = core.profiler.totals()
+
+    return {
+        "groups": spec.total_groups,
+        "cities": spec.total_cities,
+        "ticks": ticks,
+        "build_seconds": build_seconds,
+        "ticks_per_second": ticks / elapsed if elapsed > 0 else None,
+        "phase_seconds_per_tick": {name: timer["seconds"] / ticks
+                                   for name, timer in sorted(totals["timers"].items())},
+        "counters_per_tick": {name: value / ticks for name, value in sorted(totals["counters"].items())},
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_ladder(ladder, ticks: int, engine: str, streams: str, seed: int,
+               history_retention: int | None = None) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for groups in ladder:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_rung, groups, ticks, engine, streams, seed, history_retention).result()
+        results.append(result)
+        print(f"{result['groups']:>9} groups  {result['ticks_per_second']:9.2f} ticks/s  "
+              f"build {result['build_seconds']:7.2f}s  peak {result['peak_rss_mb']:8.1f} MB")
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "numpy": np.__version__,
+                    "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {"engine": engine, "streams": streams, "ticks": ticks, "seed": seed,
+                     "history_retention": history_retention},
+        "results": results,
+    }
+
+
+# Settings a baseline must share with a run for their numbers to be comparable.
+COMPARED_SETTINGS = ("engine", "streams", "history_retention")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    '''Regressions of report against baseline, matched by group count.
+
+    A baseline recorded with different settings is reported instead of compared.
+    '''
+    settings, base_settings = report.get("settings", {}), baseline.get("settings", {})
+    mismatched = [f"{name} {settings.get(name)!r} vs baseline {base_settings.get(name)!r}"
+                  for name in COMPARED_SETTINGS if settings.get(name) != base_settings.get(name)]
+    if mismatched:
+        return ["settings differ: " + ", ".join(mismatched)]
+    reference = {result["groups"]: result for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        base = reference.get(result["groups"])
+        if base is None or not base["ticks_per_second"]:
+            continue
+        ratio = result["ticks_per_second"] / base["ticks_per_second"]
+        if ratio < 1.0 - tolerance:
+            regressions.append(f"{result['groups']} groups: {result['ticks_per_second']:.2f} ticks/s "
+                               f"is {1.0 - ratio:.0%} below baseline {base['ticks_per_second']:.2f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--groups", type=int, nargs="+", default=DEFAULT_LADDER,
+                        help="ladder of world sizes, in population groups")
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--engine", choices=("columnar", "object"), default="columnar")
+    parser.add_argument("--streams", choices=("keyed", "shared"), default="keyed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history-retention", type=int,
+                        help="city history samples to keep (default: the configured retention)")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline JSON to check results against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed fractional drop in ticks/s before failing")
+    args = parser.parse_args(argv)
+
+    report = run_ladder(args.groups, args.ticks, args.engine, args.streams, args.seed, args.history_retention)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,41 +1,127 @@
+# CONFIG is the authoritative set of defaults for a run. Where a key is
+# left out, Core, City, Province and LabourMarket fall back to the original
+# reference engines instead ("shared" streams, "object" population, "loop"
+# migration and labour). The faster engines chosen here agree with those
+# in expectation but not draw for draw, so partial configs, e.g. in tests,
+# keep the reference behaviour.
 CONFIG = {
 
     "seed":
         {"seed": 42,
-         "use": True}, # Random seed for later use
+         "use": True, # Random seed for later use
+         "streams": "keyed", # "keyed" per-entity streams (order independent), "shared" one generator
+         },
+
+    "core":
+        {"population":
+            {"engine": "columnar", # "columnar" ticks all groups in one vectorized pass, "object" one at a time
+            },
+        "parallel":
+            {"workers": 1, # Province ticks are spread over this many processes when > 1
+            "shared_memory": False, # Keep group, firm and city numbers in shared memory; workers keep their provinces between ticks
+            },
+        "profiler":
+            {"enabled": False, # Time each tick phase and count draws, migrations and labour flows
+            "output": "profile.json", # Written after the run; a .csv path gives flat rows
+            },
+        "invariants":
+            {"enabled": True, # Check non-negative stocks, sizes and money and employed <= size while running
+            "interval": 4, # Check every n-th tick
+            "sample": 0.25, # Fraction of cities per check; the sample rotates so all are covered
+            "on_violation": "raise", # "raise" stops the run, "record" keeps up to max_records violations
+            "max_records": 1000,
+            },
+        "world":
+            {"cache": True, # Compile the input file to a binary cache on first load
+            "cache_dir": ".worldsim_cache", # Compiled worlds are keyed by the input file's hash
+            },
+        },
 
     "main":
-        {"reporter":     # Controls reporting system; what is printed/saved and how often
+        {"weeks": 51, # Length of a run
+        "input": "input_data.json", # World definition file
+        "reporter":     # Controls reporting system; what is printed/saved and how often
             {"enabled": True,
             "report_interval": 6,
-            "sub_province_report": True
+            "sub_province_report": True,
+            "background": True, # Format and write reports on a writer thread instead of in the tick loop
+            "queue_size": 8, # Reported weeks waiting to be written before the tick loop waits
+            "outputs": ["stdout"], # Any of "stdout", "jsonl", "csv"
+            "jsonl_path": "report.jsonl", # One JSON line per reported week
+            "csv_path": "report.csv", # One row per city per reported week
             },
         "pop_graph":
             {"enabled": False,
             },
+        "checkpoint": # Periodically saves the whole simulation so a run can be resumed
+            {"enabled": False,
+            "interval": 13,
+            "path": "worldsim.ckpt",
+            },
+        "ensemble": # Runs the world under many seeds and writes metric bands instead of reports
+            {"enabled": False,
+            "runs": 16, # Seeds seed .. seed + runs - 1
+            "workers": 4, # Processes; each member builds from the shared compiled world
+            "quantiles": [0.05, 0.5, 0.95], # Streaming (P-square) estimates per week and metric
+            "output": "ensemble.json",
+            },
         },
 
     "city": 
         {"migration":
             {"enabled": True,
             "intergroup_rate": 0.0005, # Default = 0.0005 = 0.05%
-            }
+            "engine": "batched", # "batched" moves every group of a city in one pass, "loop" one source group at a time
+            "spill_dir": None, # Append each tick's events to <spill_dir>/<city>.city.events before they are cleared
+            },
+        "market":
+            {"food_price": 1.0, # Paid per Kg of city food by groups
+            "food_policy": "sequential", # Who eats when food runs short: "sequential" (list order), "proportional", "money_priority"
+            },
+        "labour":
+            {"engine": "matrix", # "matrix" draws a whole clearing round at once, "loop" one pair at a time
+            },
+        "aggregates":
+            {"debug": False, # Cross-check cached group sums against a full recomputation on every read
+            },
+        "history":
+            {"retention": 520, # Samples kept per city (520 = 10 years of weeks)
+             "policy": "ring", # When full: "ring" drops the oldest, "downsample" halves resolution
+             "interval": 1, # Record every n-th tick
+            },
+        "stepping":
+            {"enabled": False, # Quiet cities hold and advance several weeks in one aggregated step
+             "max_weeks": 4, # Longest step
+             "quiet_weeks": 3, # Quiet steps in a row before a city may hold
+             "population_tol": 0.001, # Relative population change per week
+             "employment_tol": 0.01, # Change in employment rate per step
+             "migration_tol": 0.001, # Intergroup migrants per head per week
+            },
         },
 
     "province":
         {"migration":
             {"enabled": True,
+             "engine": "batched", # "batched" draws every target from one sorted index, "indexed" one source at a time, "loop" rescans every pair
              "intercity_rate": 0.0001, 
             # Default = 0.0001 = 0.01%
-             # Future distance hooks:
-             # "distance_enabled": False,
-             # "distance_mode": "neutral",  # placeholder for matrix/provider modes
+             "distance_mode": "neutral", # "euclidean" weights targets by exp(-distance / distance_scale); cities need a "location"
+             "distance_scale": 100.0,
+             "spill_dir": None, # As city migration, to <spill_dir>/<province>.province.events
             }
         },
 
     "country":
         {"_":
          {"enabled": True,
-          }
+          },
+        "market":
+            {"enabled": False, # Firms buy input goods from cities' stock across the country each tick
+            "price": 1.0, # Paid per unit by the buying firm to the selling city
+            "reserved_goods": ["food"], # Kept by cities for their own consumption
+            "distance_mode": "neutral", # As province migration; "euclidean" prefers nearby sellers
+            "distance_scale": 100.0,
+            "nearest_sellers": 8, # Selling cities each buying city considers under a distance mode
+            },
         },
 }
@@ -1,42 +1,150 @@
 '''
 This module calls core to run the simulation, and prints outputs
+
+    python main.py --weeks 104 --input world.json --output jsonl --seed 7
+    python main.py --ensemble 32 --workers 4 --no-report
+
+Options override the matching CONFIG values for one run. Plotting and the
+ensemble/process pool machinery are only imported when a run needs them,
+so headless and batch runs start fast; IMPORT_BUDGET_SECONDS is the
+budget tests hold "import main" to.
 '''
+import argparse
+import copy
+
 from config import CONFIG
 from model.core import Core
-from visualisation.report import report
-from visualisation.graph import graph_total_pop
+from visualisation.pipeline import ReportPipeline
+from visualisation.summary import summarise
+
+
+IMPORT_BUDGET_SECONDS = 0.5
 
 
-MAIN_CFG = CONFIG["main"]
-REPORTER_CFG = MAIN_CFG.get("reporter", {})
+def parse_args(argv=None) -> argparse.Namespace:
+    main_cfg = CONFIG["main"]
+    parser = argparse.ArgumentParser(description="Run the world simulation.")
+    parser.add_argument("--weeks", type=int, default=main_cfg.get("weeks", 51),
+                        help="weeks to simulate")
+    parser.add_argument("--input", default=main_cfg.get("input", "input_data.json"),
+                        help="world definition file")
+    parser.add_argument("--output", nargs="+", choices=("stdout", "jsonl", "csv"),
+                        help="report sinks (default: main.reporter.outputs)")
+    parser.add_argument("--no-report", action="store_true", help="don't write reports")
+    parser.add_argument("--seed", type=int, help="random seed (default: seed.seed)")
+    parser.add_argument("--profile", nargs="?", const="", metavar="PATH",
+                        help="profile tick phases, writing to PATH (default: core.profiler.output)")
+    parser.add_argument("--ensemble", type=int, metavar="RUNS",
+                        help="run RUNS seeds and write metric bands instead of reports")
+    parser.add_argument("--workers", type=int, help="processes for --ensemble runs")
+    parser.add_argument("--graph", action="store_true", help="plot the first city's population")
+    return parser.parse_args(argv)
 
 
-def main():
+def run_config(args: argparse.Namespace) -> dict:
+    '''CONFIG with the command-line options applied.'''
+    cfg = copy.deepcopy(CONFIG)
+    main_cfg = cfg["main"]
+    main_cfg["weeks"] = args.weeks
+    main_cfg["input"] = args.input
+    if args.output:
+        main_cfg["reporter"]["outputs"] = args.output
+    if args.no_report:
+        main_cfg["reporter"]["enabled"] = False
+    if args.seed is not None:
+        cfg["seed"]["seed"] = args.seed
+        cfg["seed"]["use"] = True
+    if args.profile is not None:
+        cfg["core"]["profiler"]["enabled"] = True
+        if args.profile:
+            cfg["core"]["profiler"]["output"] = args.profile
+    if args.ensemble is not None:
+        main_cfg["ensemble"]["enabled"] = True
+        main_cfg["ensemble"]["runs"] = args.ensemble
+    if args.workers is not None:
+        main_cfg["ensemble"]["workers"] = args.workers
+    if args.graph:
+        main_cfg["pop_graph"]["enabled"] = True
+    return cfg
+
+
+def run_ensemble(cfg: dict):
     '''
-    Runs whole simulation. Also handles output by calling report function
+    Runs the simulation under many seeds and writes per-week metric bands
+    (mean, std and quantiles) instead of reports.
     '''
+    from model.core.ensemble import EnsembleRunner
+
+    ensemble_cfg = cfg["main"].get("ensemble", {})
+    runner = EnsembleRunner(
+        cfgs={name: cfg.get(name) for name in ("seed", "city", "province", "country", "core")},
+        runs=ensemble_cfg.get("runs", 16),
+        ticks=cfg["main"].get("weeks", 51),
+        workers=ensemble_cfg.get("workers", 1),
+        base_seed=cfg["seed"]["seed"],
+        quantiles=ensemble_cfg.get("quantiles", (0.05, 0.5, 0.95)),
+    )
+    stats = runner.run(cfg["main"].get("input", "input_data.json"))
+    stats.export(ensemble_cfg.get("output", "ensemble.json"))
+
+
+def run(cfg: dict) -> Core:
+    '''
+    Runs whole simulation. Reports are summarised each reported week and
+    written by the report pipeline, off the tick loop.
+    '''
+    main_cfg = cfg["main"]
+    reporter_cfg = main_cfg.get("reporter", {})
+    checkpoint_cfg = main_cfg.get("checkpoint", {})
+
     # Core initialises whole simulation.
     core = Core(
-        seed_cfg=CONFIG.get("seed"),
-        city_cfg=CONFIG.get("city"),
-        province_cfg=CONFIG.get("province"),
-        country_cfg=CONFIG.get("country")
+        seed_cfg=cfg.get("seed"),
+        city_cfg=cfg.get("city"),
+        province_cfg=cfg.get("province"),
+        country_cfg=cfg.get("country"),
+        core_cfg=cfg.get("core"),
         )
 
-    core.build_sim()
+    reporting = reporter_cfg.get('enabled', True)
+    try:
+        core.build_sim(main_cfg.get("input", "input_data.json"))
+        with ReportPipeline.from_cfg(reporter_cfg if reporting else {"outputs": [], "background": False}) as reports:
+            for week in range(1, main_cfg.get("weeks", 51) + 1):
 
-    for week in range(1, 52):
+                core.tick()
 
-        core.tick()
+                if reporting and week % reporter_cfg.get('report_interval', 1) == 0:
+                    spr = reporter_cfg.get('sub_province_report', False)
 
-        if REPORTER_CFG.get('enabled', True) and week % REPORTER_CFG.get('report_interval', 1) == 0:
-            spr = REPORTER_CFG.get('sub_province_report', False)
+                    core.sync()
+                    reports.submit(summarise(week, core, spr))
 
-            report(week, core, spr)
+                if checkpoint_cfg.get('enabled', False) and week % checkpoint_cfg.get('interval', 13) == 0:
+                    core.save_checkpoint(checkpoint_cfg.get('path', 'worldsim.ckpt'))
+    finally:
+        # Worker processes and shared memory blocks outlive the process otherwise.
+        core.close()
+
+    profiler_cfg = cfg["core"].get("profiler", {})
+    if core.profiler.enabled:
+        core.profiler.export(profiler_cfg.get("output", "profile.json"))
+
+    if main_cfg['pop_graph']['enabled']:
+        from visualisation.graph import graph_total_pop
 
-    if MAIN_CFG['pop_graph']['enabled']:
         graph_total_pop(city=core.countries[0].provinces[0].cities[0])
+    return core
+
+
+def main(argv=None):
+    '''Command-line entry point.'''
+    cfg = run_config(parse_args(argv))
+    if cfg["main"]["ensemble"].get('enabled', False):
+        run_ensemble(cfg)
+    else:
+        run(cfg)
 
 
-if __name__ == "__main__":  # Temporary main function for testing
+if __name__ == "__main__":
     main()
@@ -1,2 +1,3 @@
-from .protocols import DistanceProvider, NeutralDistanceProvider
-from .location_service import LocationService
\ No newline at end of file
+from .protocols import (DistanceProvider, EuclideanDistanceProvider, NeutralDistanceProvider,
+                        batch_weights, distance_provider_from_cfg)
+from .location_service import LocationService
@@ -2,11 +2,19 @@
 
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass, field
+
+import numpy as np
+
+from model.city.city_aggregates import CityAggregates
 from model.city.city_data import CityData
+from model.city.food_rationing import ration_food
+from model.city.stepping import SteppingParams, StepState, observe_step
+from model.core.profiler import NULL_PROFILER
 from model.economy import LabourMarket
 from model.economy.labour.labour_market import LabourClearResult
-from model.migration import GroupMigrationEvent, Migration
+from model.migration import Migration, MigrationEventLog
 
 
 @dataclass
@@ -16,6 +24,7 @@ class CityParams:
     name: str
     populations: list
     firms: list
+    location: tuple[float, float] | None = None
 
 
 @dataclass
@@ -23,31 +32,58 @@ class CityState:
     """Mutable city state updated during each simulation tick."""
 
     employed: int = 0
-    migrations: list[GroupMigrationEvent] = field(default_factory=list)
+    migrations: MigrationEventLog = field(default_factory=MigrationEventLog)
     last_food_deficit: float | None = None
     inv: dict[str, float] = field(default_factory=dict)
     treasury: float = 0.0
     labour_result: LabourClearResult | None = None
     starving: bool = False
+    stepping: StepState = field(default_factory=StepState)
+
+
+# Numeric CityState fields as stored in columns (checkpoints, shared memory).
+CITY_STATE_DTYPES = {
+    "employed": np.int64,
+    "treasury": np.float64,
+    "starving": np.bool_,
+}
 
 
 class City:
     """City object owned by provinces."""
 
+    profiler = NULL_PROFILER
+
     def __init__(self, cfg: dict, rng, params: CityParams) -> None:
         self.p = params
         self.rng = rng
         self.cfg = cfg
 
         self.state = CityState()
+        self.aggregates = CityAggregates(
+            self.p.populations,
+            debug=self.cfg.get("aggregates", {}).get("debug", False),
+        )
+
+        spill_dir = self.cfg.get("migration", {}).get("spill_dir")
+        if spill_dir is not None:
+            self.state.migrations.spill_path = os.path.join(spill_dir, f"{self.p.name}.city.events")
+
+        stepping_cfg = self.cfg.get("stepping", {})
+        self.stepping = SteppingParams.from_cfg(stepping_cfg) if stepping_cfg.get("enabled", False) else None
 
         intergroup_rate = self.cfg.get("migration", {}).get("intergroup_rate", 0.0005)
         self.migration = Migration.for_intergroup(
             rng=self.rng,
             intergroup_rate=intergroup_rate,
+            engine=self.cfg.get("migration", {}).get("engine", "loop"),
         )
 
-        self.labour_market = LabourMarket(self.rng, country_policy=None)
+        self.labour_market = LabourMarket(
+            self.rng,
+            country_policy=None,
+            engine=self.cfg.get("labour", {}).get("engine", "loop"),
+        )
 
         for firm in self.p.firms:
             self.state.inv.setdefault(firm.good, 0.0)
@@ -63,6 +99,7 @@ class City:
                 name=city_data["name"],
                 populations=populations,
                 firms=firms,
+                location=tuple(city_data["location"]) if "location" in city_data else None,
             ),
             rng=rng,
             cfg=cfg,
@@ -73,7 +110,7 @@ class City:
         return self.state.employed
 
     @property
-    def migrations(self) -> list[GroupMigrationEvent]:
+    def migrations(self) -> MigrationEventLog:
         return self.state.migrations
 
     @property
@@ -88,13 +125,13 @@ class City:
     def migration_attractiveness(self) -> float:
         if self.state.starving:
             return 0.0
-        return sum(group.migration_attractiveness for group in self.p.populations)
+        return self.aggregates.attractiveness_total()
 
 
     @property
     def total_population(self) -> float:
         """Canonical city population used by migration and reporting."""
-        return sum(group.size for group in self.populations)
+        return self.aggregates.total("size")
 
     @property
     def group_count(self) -> int:
@@ -105,6 +142,10 @@ class City:
     def name(self) -> str:
         return self.p.name
 
+    @property
+    def location(self) -> tuple[float, float] | None:
+        return self.p.location
+
     @property
     def populations(self) -> list:
         return self.p.populations
@@ -113,37 +154,73 @@ class City:
     def firms(self) -> list:
         return self.p.firms
 
-    def tick(self) -> None:
-        self.tick_groups()
-
-        self.state.labour_result = self.labour_market.clear_market(
-            populations=self.p.populations,
-            firms=self.p.firms,
-        )
-        self.state.employed = self.state.labour_result.total_employed
-        self.settle_labour_tax()
-
-        for firm in self.p.firms:
-            if firm.good not in self.state.inv:
-                self.state.inv.setdefault(firm.good, 0.0)
-            firm.tick()
+    def tick(self, tick_groups: bool = True, week: int | None = None) -> None:
+        '''Runs one week for the city, or the weeks planned by adaptive stepping.
+        tick_groups is False when Core has already ticked every group in bulk.
+        week is Core.week, which stamps this tick's migration events.'''
+        profiler = self.profiler
+        weeks = self.state.stepping.weeks
+        if weeks == 0:
+            with profiler.phase("city", "hold"):
+                self.hold(week)
+            return
 
-            if firm.ownership == "state":
-                transfer = firm.transfer_to_city()
-                self.state.inv[firm.good] += transfer
-                firm.market_capital += transfer * (1 / firm.p.productivity) * 30
+        if tick_groups:
+            with profiler.phase("city", "tick_groups"):
+                self.tick_groups(weeks)
 
-        self.consume_food()
-        self.run_migrations()
+        with profiler.phase("city", "labour"):
+            self.state.labour_result = self.labour_market.clear_market(
+                populations=self.p.populations,
+                firms=self.p.firms,
+                weeks=weeks,
+            )
+        self.state.employed = self.state.labour_result.total_employed
+        profiler.count("city", "labour_flows", len(self.state.labour_result.flows))
+
+        with profiler.phase("city", "labour_tax"):
+            self.settle_labour_tax(weeks)
+
+        with profiler.phase("city", "production"):
+            for firm in self.p.firms:
+                if firm.good not in self.state.inv:
+                    self.state.inv.setdefault(firm.good, 0.0)
+                firm.tick(weeks)
+
+                if firm.ownership == "state":
+                    transfer = firm.transfer_to_city()
+                    self.state.inv[firm.good] += transfer
+                    firm.market_capital += transfer * (1 / firm.p.productivity) * 30
+
+        with profiler.phase("city", "consume_food"):
+            self.consume_food(weeks)
+        with profiler.phase("city", "migration"):
+            self.run_migrations(weeks, week)
+        profiler.count("city", "migration_events", len(self.state.migrations))
+        with profiler.phase("city", "city_data"):
+            self.city_data.update_city_data()
+        if self.stepping is not None:
+            observe_step(self)
+
+    def hold(self, week: int | None = None) -> None:
+        """Carry the city over a week it skips under adaptive stepping.
+
+        State is left as it is; the week is recorded with no births, deaths
+        or migrations, which the next step catches up on.
+        """
+        self.state.migrations.clear(week)
+        for group in self.p.populations:
+            group.births = 0
+            group.deaths = 0
         self.city_data.update_city_data()
 
-    def run_migrations(self) -> None:
+    def run_migrations(self, weeks: int = 1, week: int | None = None) -> None:
         """Run migration between groups inside this city."""
-        self.state.migrations = []
+        self.state.migrations.clear(week)
         if self.cfg.get("migration", {}).get("enabled", True):
-            self.state.migrations.extend(self.migration.migrate_within_city(self))
+            self.migration.migrate_within_city(self, log=self.state.migrations, weeks=weeks)
 
-    def settle_labour_tax(self) -> None:
+    def settle_labour_tax(self, weeks: int = 1) -> None:
         """Collect labour income tax from groups."""
         if self.state.labour_result is None:
             return
@@ -153,48 +230,55 @@ class City:
             return
 
         for group, income in zip(self.p.populations, self.state.labour_result.group_income):
-            tax = max(income, 0.0) * labour_tax_rate
+            tax = max(income, 0.0) * weeks * labour_tax_rate
             paid = min(group.money, tax)
             group.money -= paid
             self.state.treasury += paid
 
-    def consume_food(self) -> None:
-        """Groups buy and consume food from city inventory."""
+    def consume_food(self, weeks: int = 1) -> None:
+        """Groups buy and consume food from city inventory.
+
+        All groups are rationed at once under market.food_policy (see
+        food_rationing); groups left short starve. Over several weeks groups
+        buy for all of them and starve on the average weekly shortfall.
+        """
         if not self.p.populations:
             self.state.last_food_deficit = None
             return
 
         market_cfg = self.cfg.get("market", {})
         food_price = max(float(market_cfg.get("food_price", 1.0)), 0.0)
-        total_deficit = 0.0
-
-        for group in self.p.populations:
-            needed = group.compute_food_consumption()
-            available = self.state.inv["food"]
-            if available <= 0:
-                purchased = 0.0
-            elif food_price <= 0:
-                purchased = min(needed, available)
-            else:
-                affordable = group.money / food_price
-                purchased = min(needed, available, affordable)
-
-            if food_price > 0 and purchased > 0:
-                spent = purchased * food_price
-                group.money = max(group.money - spent, 0.0)
-            self.state.inv["food"] -= purchased
-
-            deficit = max(needed - purchased, 0.0)
-            total_deficit += deficit
-            if deficit > 0:
-                group.starve(food_deficit=deficit)
-
+        groups = self.p.populations
+
+        needed = np.array([group.compute_food_consumption() for group in groups], dtype=np.float64)
+        if weeks != 1:
+            needed *= weeks
+        money = np.array([group.money for group in groups], dtype=np.float64)
+        available = self.state.inv["food"]
+        purchased = ration_food(needed, money, available, food_price,
+                                policy=market_cfg.get("food_policy", "sequential"))
+
+        if food_price > 0:
+            spent = purchased * food_price
+            for i in np.flatnonzero(spent > 0).tolist():
+                groups[i].money = max(float(money[i] - spent[i]), 0.0)
+        if purchased.any():
+            # Summing the rations can overshoot a fully bought stock by rounding.
+            self.state.inv["food"] = max(available - float(purchased.sum()), 0.0)
+
+        deficit = np.maximum(needed - purchased, 0.0)
+        if weeks != 1:
+            deficit /= weeks
+        for i in np.flatnonzero(deficit > 0).tolist():
+            groups[i].starve(food_deficit=float(deficit[i]))
+
+        total_deficit = float(deficit.sum())
         if total_deficit > 0:
             self.state.last_food_deficit = total_deficit
             self.state.starving = True
         else:
             self.state.last_food_deficit = None
 
-    def tick_groups(self):
-        for group in self.p.populations:
-            group.tick()
+    def tick_groups(self, weeks: int = 1):
+        # Group ticks write state around the setters; their change is applied to the sums.
+        self.aggregates.track_updates(lambda group: group.tick(weeks))
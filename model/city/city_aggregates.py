@@ -0,0 +1,140 @@
+'''
+Cached sums over a city's population groups.
+
+Groups report changes made through their property setters, and the sums
+are adjusted by the difference instead of being recomputed from every
+group on each read. Group ticks write state directly and report their
+change per city through add() (the columnar store) or track_updates()
+(per-object ticks). Structural changes, such as groups being added or
+removed, call invalidate(), and the next read rebuilds the sums once.
+'''
+
+from typing import Sequence
+
+
+# Group state fields whose city-wide sum is cached.
+SUMMED_FIELDS = ("size", "births", "deaths", "employable")
+
+# Fields that feed a group's migration attractiveness.
+ATTRACTIVENESS_FIELDS = ("size", "healthcare", "employed")
+
+
+def _attractiveness(state) -> float:
+    '''Same formula as PopulationGroup.migration_attractiveness, zero for empty groups.'''
+    employment_rate = state.employed / state.size if state.size else 0.0
+    return (state.healthcare * 0.3) + (employment_rate * 0.2)
+
+
+class CityAggregates:
+    '''
+    Incrementally maintained totals for one city's groups.
+
+    With debug set, every read is checked against a full recomputation
+    and a mismatch raises AssertionError.
+    '''
+
+    def __init__(self, groups: Sequence, debug: bool = False) -> None:
+        self.groups = groups
+        self.debug = debug
+        self.totals = dict.fromkeys(SUMMED_FIELDS, 0)
+        self.attractiveness = 0.0
+        self.dirty = True
+        for group in groups:
+            group.aggregates = self
+
+    def invalidate(self) -> None:
+        '''Mark the sums stale after group state was written around the setters.'''
+        self.dirty = True
+
+    def add(self, totals: dict, attractiveness: float) -> None:
+        '''Apply changes made to the groups around the setters.'''
+        if self.dirty:
+            return
+        for name, change in totals.items():
+            self.totals[name] += change
+        self.attractiveness += attractiveness
+
+    def track_updates(self, update) -> None:
+        '''Call update(group) for every group and apply what it changed to the sums.'''
+        if self.dirty:
+            for group in self.groups:
+                update(group)
+            return
+        totals = dict.fromkeys(SUMMED_FIELDS, 0)
+        attractiveness = 0.0
+        for group in self.groups:
+            state = group.state
+            for name in SUMMED_FIELDS:
+                totals[name] -= getattr(state, name)
+            attractiveness -= _attractiveness(state)
+            update(group)
+            state = group.state
+            for name in SUMMED_FIELDS:
+                totals[name] += getattr(state, name)
+            attractiveness += _attractiveness(state)
+        self.add(totals, attractiveness)
+
+    @property
+    def cached(self) -> tuple[dict, float, bool]:
+        '''Cached sums and staleness, to carry them to another copy of the city.'''
+        return dict(self.totals), self.attractiveness, self.dirty
+
+    @cached.setter
+    def cached(self, value: tuple[dict, float, bool]) -> None:
+        totals, self.attractiveness, self.dirty = value
+        self.totals = dict(totals)
+
+    def refresh(self) -> None:
+        '''Recompute every sum from the groups.'''
+        self.totals, self.attractiveness = self._recompute()
+        self.dirty = False
+
+    def _recompute(self) -> tuple[dict, float]:
+        totals = {name: sum(getattr(group.state, name) for group in self.groups)
+                  for name in SUMMED_FIELDS}
+        attractiveness = sum(_attractiveness(group.state) for group in self.groups)
+        return totals, attractiveness
+
+    def set_group_field(self, group, name: str, value) -> None:
+        '''Write one group state field and apply the change to the sums.'''
+        state = group.state
+        if self.dirty:
+            setattr(state, name, value)
+            return
+
+        tracks_attractiveness = name in ATTRACTIVENESS_FIELDS
+        if tracks_attractiveness:
+            self.attractiveness -= _attractiveness(state)
+        if name in self.totals:
+            self.totals[name] += value - getattr(state, name)
+        setattr(state, name, value)
+        if tracks_attractiveness:
+            self.attractiveness += _attractiveness(state)
+
+    def total(self, name: str):
+        self._ensure_fresh()
+        return self.totals[name]
+
+    def attractiveness_total(self) -> float:
+        self._ensure_fresh()
+        return self.attractiveness
+
+    def _ensure_fresh(self) -> None:
+        if self.dirty:
+            self.refresh()
+        elif self.debug:
+            self.check()
+
+    def check(self) -> None:
+        '''Raise AssertionError if the cached sums drifted from a full recomputation.'''
+        totals, attractiveness = self._recompute()
+        errors = [
+            f"{name}: cached {self.totals[name]!r}, recomputed {totals[name]!r}"
+            for name in SUMMED_FIELDS
+            if abs(self.totals[name] - totals[name]) > 1e-6 * max(1.0, abs(totals[name]))
+        ]
+        if abs(self.attractiveness - attractiveness) > 1e-9 * max(1.0, abs(attractiveness)):
+            errors.append(f"attractiveness: cached {self.attractiveness!r}, "
+                          f"recomputed {attractiveness!r}")
+        if errors:
+            raise AssertionError("City aggregates out of date:\n" + "\n".join(errors))
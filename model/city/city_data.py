@@ -5,6 +5,8 @@ City data module contains class CityData, which supplies various data-related fu
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, TypedDict
 
+from model.city.city_history import CityHistory
+
 if TYPE_CHECKING:
     from model.city.city import City
 
@@ -43,28 +45,58 @@ class CitySnapshot(TypedDict):
 @dataclass
 class CityData:
     '''
-    City data handles data for cities by updating, creating summaries and storing it
+    City data handles data for cities by updating, creating summaries and storing it.
+    History is kept column-wise in a CityHistory; indexing it by tick still
+    gives a CitySnapshot.
     '''
     city: "City"
-    data: list[CitySnapshot] = field(default_factory=list)
+    data: CityHistory = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.data = CityHistory.for_city(self.city, cfg=self.city.cfg.get("history"))
 
     def update_city_data(self) -> None:
         '''
         Updates data that is dependent on variables the city object handles
         '''
         c = self.city
-        c.birth_total = sum(group.births for group in c.populations)
-        c.death_total = sum(group.deaths for group in c.populations)
+        c.birth_total = c.aggregates.total("births")
+        c.death_total = c.aggregates.total("deaths")
 
         # People of fit age and health to work as decimal.
         if c.populations:
-            c.employable = sum(group.employable for group in c.populations) / len(c.populations)
+            c.employable = c.aggregates.total("employable") / len(c.populations)
         else:
             c.employable = 0.0
 
         c.productivity = sum(firm.total_productivity for firm in c.firms)
 
-        self.data.append(self.store_data())
+        self.record_data()
+
+    def record_data(self) -> None:
+        '''
+        Writes this tick's city, group and firm metrics into the history columns.
+        Ticks off the recording interval are only counted.
+        '''
+        if not self.data.due():
+            self.data.skip()
+            return
+        c = self.city
+        self.data.record(
+            city_values=self.sum_city_data(),
+            group_values={
+                'size': [group.size for group in c.populations],
+                'healthcare': [group.healthcare for group in c.populations],
+                'last_births': [group.births for group in c.populations],
+                'last_deaths': [group.deaths for group in c.populations],
+                'employment_rate': [group.employment_rate for group in c.populations],
+                'sick_rate': [group.sick_rate for group in c.populations],
+            },
+            firm_values={
+                'employed': [firm.employed for firm in c.firms],
+                'total_productivity': [firm.total_productivity for firm in c.firms],
+            },
+        )
 
     def sum_population_data(self) -> list[PopulationSummary]:
 
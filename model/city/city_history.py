@@ -0,0 +1,263 @@
+'''
+Columnar, bounded per-tick history for a city.
+
+Each metric is a NumPy array indexed by (sample, entity), so recording a
+tick is a handful of array writes instead of a nested dict. The arrays
+start small and double as samples arrive, up to the retention, so a short
+run over a large world only pays for the samples it records. Samples are
+addressed by tick index like the old list of snapshots, and CitySnapshot
+dicts are only built when a sample is read.
+'''
+
+from typing import TYPE_CHECKING, Iterator
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from model.city.city_data import CitySnapshot
+
+
+CITY_METRICS = {
+    "population": np.int64,
+    "births": np.int64,
+    "deaths": np.int64,
+    "employable": np.float64,
+    "productivity": np.float64,
+}
+
+GROUP_METRICS = {
+    "size": np.int64,
+    "healthcare": np.float64,
+    "last_births": np.int64,
+    "last_deaths": np.int64,
+    "employment_rate": np.float64,
+    "sick_rate": np.float64,
+}
+
+FIRM_METRICS = {
+    "employed": np.int64,
+    "total_productivity": np.float64,
+}
+
+# Samples allocated up front; the arrays double from here up to the retention.
+INITIAL_CAPACITY = 8
+
+
+class CityHistory:
+    '''
+    Fixed-capacity history of city, group and firm metrics.
+
+    retention is the number of samples kept. When full, "ring" evicts the
+    oldest sample and "downsample" drops every other sample and doubles
+    the recording interval, so the whole run stays covered at lower
+    resolution.
+    '''
+
+    def __init__(self,
+                 group_count: int,
+                 firm_labels: list[tuple[str, str]],
+                 retention: int = 520,
+                 policy: str = "ring",
+                 interval: int = 1) -> None:
+        if retention < 1:
+            raise ValueError("retention must be at least 1")
+        if policy not in ("ring", "downsample"):
+            raise ValueError(f"Unknown history policy: {policy!r}")
+        if interval < 1:
+            raise ValueError("interval must be at least 1")
+
+        self.group_count = group_count
+        self.firm_labels = list(firm_labels)
+        self.retention = retention
+        self.policy = policy
+        self.interval = interval
+
+        # Ring buffer cursor: ticks seen (recorded or not), oldest slot, slots in use.
+        self.updates = 0
+        self.head = 0
+        self.filled = 0
+        capacity = min(retention, INITIAL_CAPACITY)
+        self.slot_ticks = np.zeros(capacity, dtype=np.int64)
+        self.city = {name: np.zeros(capacity, dtype=dtype) for name, dtype in CITY_METRICS.items()}
+        self.groups = {name: np.zeros((capacity, group_count), dtype=dtype)
+                       for name, dtype in GROUP_METRICS.items()}
+        self.firms = {name: np.zeros((capacity, len(self.firm_labels)), dtype=dtype)
+                      for name, dtype in FIRM_METRICS.items()}
+        # Set when the arrays are views of shared memory (shared_state.SharedHistory).
+        self.shared = None
+
+    @classmethod
+    def for_city(cls, city, cfg: dict | None = None) -> "CityHistory":
+        cfg = cfg or {}
+        return cls(
+            group_count=len(city.populations),
+            firm_labels=[(firm.ownership, firm.good) for firm in city.firms],
+            retention=cfg.get("retention", 520),
+            policy=cfg.get("policy", "ring"),
+            interval=cfg.get("interval", 1),
+        )
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        if self.shared is not None:
+            # A copy in another process attaches to the same shared arrays.
+            for name in ("city", "groups", "firms", "slot_ticks"):
+                del state[name]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if self.shared is not None:
+            self.shared.attach(self)
+
+    def detached(self) -> "CityHistory":
+        '''Small empty history continuing from this one's tick count.
+
+        Used when a city is ticked in another process: the copy records
+        the new ticks, which are merged back with extend().
+        '''
+        copy = CityHistory(self.group_count, self.firm_labels, retention=1,
+                           policy="ring", interval=self.interval)
+        copy.updates = self.updates
+        return copy
+
+    @property
+    def capacity(self) -> int:
+        '''Samples the arrays can hold before they grow or start evicting.'''
+        return len(self.slot_ticks)
+
+    def reserve(self, capacity: int) -> None:
+        '''Grow the arrays to hold at least capacity samples, at most the retention.
+
+        The retained samples are moved to the front, oldest first.
+        '''
+        capacity = min(max(capacity, self.capacity), self.retention)
+        if capacity == self.capacity:
+            return
+        slots = self._ordered_slots()
+
+        def grown(values: np.ndarray) -> np.ndarray:
+            out = np.zeros((capacity, *values.shape[1:]), dtype=values.dtype)
+            out[:len(slots)] = values[slots]
+            return out
+
+        self.slot_ticks = grown(self.slot_ticks)
+        for arrays in (self.city, self.groups, self.firms):
+            for name, values in arrays.items():
+                arrays[name] = grown(values)
+        self.head = 0
+
+    def due(self) -> bool:
+        '''Whether the next tick falls on the recording interval.'''
+        return self.updates % self.interval == 0
+
+    def skip(self) -> None:
+        '''Count a tick that isn't due without gathering its values.'''
+        self.updates += 1
+
+    def record(self, city_values: dict, group_values: dict, firm_values: dict) -> None:
+        '''Count one tick and store it if it falls on the recording interval.'''
+        tick = self.updates
+        self.updates += 1
+        if tick % self.interval == 0:
+            self._store(tick, city_values, group_values, firm_values)
+
+    def extend(self, other: "CityHistory") -> None:
+        '''Append the samples another history recorded after this one's last tick.'''
+        for slot in other._ordered_slots():
+            tick = int(other.slot_ticks[slot])
+            if tick < self.updates or tick % self.interval != 0:
+                continue
+            self._store(tick,
+                        {name: values[slot] for name, values in other.city.items()},
+                        {name: values[slot] for name, values in other.groups.items()},
+                        {name: values[slot] for name, values in other.firms.items()})
+        self.updates = max(self.updates, other.updates)
+
+    def _store(self, tick, city_values, group_values, firm_values) -> None:
+        if self.filled == self.capacity < self.retention:
+            self.reserve(2 * self.capacity)
+        if self.filled == self.retention:
+            if self.policy == "downsample":
+                self._downsample()
+                if tick % self.interval != 0:
+                    return
+            else:
+                self.head = (self.head + 1) % self.capacity
+                self.filled -= 1
+
+        slot = (self.head + self.filled) % self.capacity
+        self.slot_ticks[slot] = tick
+        for name, values in self.city.items():
+            values[slot] = city_values[name]
+        for name, values in self.groups.items():
+            values[slot] = group_values[name]
+        for name, values in self.firms.items():
+            values[slot] = firm_values[name]
+        self.filled += 1
+
+    def _downsample(self) -> None:
+        '''Keep samples on the doubled interval, packed to the front.'''
+        self.interval *= 2
+        slots = self._ordered_slots()
+        keep = slots[self.slot_ticks[slots] % self.interval == 0]
+        for arrays in (self.city, self.groups, self.firms, {"ticks": self.slot_ticks}):
+            for values in arrays.values():
+                values[:len(keep)] = values[keep]
+        self.head = 0
+        self.filled = len(keep)
+
+    def _ordered_slots(self) -> np.ndarray:
+        return (self.head + np.arange(self.filled)) % self.capacity
+
+    def ticks(self) -> np.ndarray:
+        '''Tick indexes of the retained samples, oldest first.'''
+        return self.slot_ticks[self._ordered_slots()]
+
+    def series(self, metric: str, index: int | None = None) -> np.ndarray:
+        '''Retained values of one metric, oldest first.
+
+        City metrics take no index; group and firm metrics take the entity index.
+        '''
+        slots = self._ordered_slots()
+        if metric in self.city:
+            return self.city[metric][slots]
+        if metric in self.groups:
+            return self.groups[metric][slots, index]
+        if metric in self.firms:
+            return self.firms[metric][slots, index]
+        raise KeyError(metric)
+
+    def snapshot(self, slot: int) -> "CitySnapshot":
+        '''Build the nested CitySnapshot dict for one stored slot.'''
+        return {
+            'city_data': {name: values[slot].item() for name, values in self.city.items()},
+            'population_data': [
+                {'group': i + 1,
+                 **{name: values[slot, i].item() for name, values in self.groups.items()}}
+                for i in range(self.group_count)
+            ],
+            'firm_data': [
+                {'ownership': ownership,
+                 'good': good,
+                 **{name: values[slot, i].item() for name, values in self.firms.items()}}
+                for i, (ownership, good) in enumerate(self.firm_labels)
+            ],
+        }
+
+    def __len__(self) -> int:
+        return self.updates
+
+    def __getitem__(self, tick: int) -> "CitySnapshot":
+        '''Snapshot for a tick index; raises IndexError if it wasn't kept.'''
+        if tick < 0:
+            tick += self.updates
+        slots = self._ordered_slots()
+        pos = int(np.searchsorted(self.slot_ticks[slots], tick))
+        if pos == len(slots) or self.slot_ticks[slots[pos]] != tick:
+            raise IndexError(f"tick {tick} is not retained in city history")
+        return self.snapshot(int(slots[pos]))
+
+    def __iter__(self) -> Iterator["CitySnapshot"]:
+        for slot in self._ordered_slots():
+            yield self.snapshot(int(slot))
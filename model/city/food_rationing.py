@@ -0,0 +1,45 @@
+'''
+Rationing of a city's food stock between its population groups.
+
+Each group wants its food need, limited to what its money can buy. When
+the stock can't cover every group's demand, the policy decides who gets it:
+
+    "sequential"     - groups are served in list order until food runs out
+    "proportional"   - every group gets the same share of its demand
+    "money_priority" - the richest groups are served first
+'''
+
+import numpy as np
+
+
+FOOD_POLICIES = ("sequential", "proportional", "money_priority")
+
+
+def _serve_in_order(demand: np.ndarray, available: float, order: np.ndarray | None = None) -> np.ndarray:
+    '''Give each group its demand from what the groups before it in order left.'''
+    ordered = demand if order is None else demand[order]
+    before = np.cumsum(ordered) - ordered
+    served = np.clip(available - before, 0.0, ordered)
+    if order is None:
+        return served
+    purchased = np.empty_like(served)
+    purchased[order] = served
+    return purchased
+
+
+def ration_food(needed: np.ndarray, money: np.ndarray, available: float, price: float,
+                policy: str = "sequential") -> np.ndarray:
+    '''Food each group buys this tick, for all groups at once.'''
+    if policy not in FOOD_POLICIES:
+        raise ValueError(f"Unknown food rationing policy: {policy!r}")
+    if available <= 0:
+        return np.zeros_like(needed)
+
+    demand = np.minimum(needed, money / price) if price > 0 else needed.copy()
+    demand = np.maximum(demand, 0.0)
+    if policy == "proportional":
+        total = demand.sum()
+        return demand if total <= available else demand * (available / total)
+    if policy == "money_priority":
+        return _serve_in_order(demand, available, np.argsort(-money, kind="stable"))
+    return _serve_in_order(demand, available)
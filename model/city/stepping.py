@@ -0,0 +1,105 @@
+'''
+Adaptive multi-week stepping for quiescent cities.
+
+A city that has ticked quiet_weeks weeks in a row within every tolerance
+(population and employment rate nearly flat, little migration, no food
+deficit, no firms waiting on market inputs) stops paying for weekly ticks.
+Core plans each tick before any group is ticked: a quiet city holds,
+recording its unchanged state, until max_weeks have passed and then
+advances all of them in one step. Weekly expectations are summed over the
+step and sampled once; the model's birth and death expectations scale
+with a group's initial size, so the k-week expectation is k times the
+weekly one and one normal draw has the same mean and variance as k.
+
+A city drops back to weekly ticks when its step fails the tolerances, and
+catches up at once when, while holding, its population drifts (intercity
+migration) or it is marked starving. stepping_error() measures the
+difference from a weekly run of the same world.
+'''
+
+from dataclasses import dataclass
+
+
+@dataclass
+class SteppingParams:
+    max_weeks: int = 4  # Longest aggregated step
+    quiet_weeks: int = 3  # Quiet steps in a row before a city may hold
+    population_tol: float = 0.001  # Relative population change per week
+    employment_tol: float = 0.01  # Change in employed / population per step
+    migration_tol: float = 0.001  # Intergroup migrants per head per week
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> "SteppingParams":
+        return cls(**{name: cfg[name] for name in cls.__dataclass_fields__ if name in cfg})
+
+
+@dataclass
+class StepState:
+    weeks: int = 1  # Weeks the city advances this tick; 0 while holding
+    quiet: int = 0  # Quiet steps in a row
+    held: int = 0  # Weeks held since the last step
+    population: float = 0.0  # At the end of the last step
+    employment_rate: float = 0.0  # Employed / population at the end of the last step
+
+
+def eligible(city) -> bool:
+    '''Firms with input materials depend on weekly market deliveries, so their cities never hold.'''
+    return not any(firm.input_mats for firm in city.firms)
+
+
+def plan_step(city) -> int:
+    '''Decide how many weeks city advances this tick and record it in its step state.'''
+    params, s = city.stepping, city.state.stepping
+    if params is None or s.quiet < params.quiet_weeks:
+        s.weeks = 1
+        return s.weeks
+
+    s.held += 1
+    drift = abs(city.total_population - s.population) / max(s.population, 1.0)
+    if s.held >= params.max_weeks or drift > params.population_tol or city.state.starving:
+        s.weeks, s.held = s.held, 0
+    else:
+        s.weeks = 0
+    return s.weeks
+
+
+def observe_step(city) -> None:
+    '''After a step, count it as quiet or send the city back to weekly ticks.'''
+    params, s = city.stepping, city.state.stepping
+    population = city.total_population
+    employment_rate = city.employed / population if population > 0 else 0.0
+    migrants = sum(city.migrations.column("amount").tolist())
+
+    weeks = max(s.weeks, 1)
+    quiet = (
+        s.population > 0
+        and abs(population - s.population) <= params.population_tol * weeks * s.population
+        and abs(employment_rate - s.employment_rate) <= params.employment_tol
+        and migrants <= params.migration_tol * weeks * population
+        and city.state.last_food_deficit is None
+        and eligible(city)
+    )
+    s.quiet = s.quiet + 1 if quiet else 0
+    s.held = 0
+    s.population = population
+    s.employment_rate = employment_rate
+
+
+def stepping_error(reference, candidate) -> dict[str, float]:
+    '''Largest relative difference per city metric between two Cores of the same world.
+
+    Run one with weekly ticks and one with adaptive stepping for the same
+    number of weeks to measure the error stepping introduced.
+    '''
+    metrics = {
+        "population": lambda city: city.total_population,
+        "employed": lambda city: city.employed,
+        "treasury": lambda city: city.state.treasury,
+        "food": lambda city: city.inv.get("food", 0.0),
+    }
+    error = {name: 0.0 for name in metrics}
+    for ref_city, city in zip(reference.iter_cities(), candidate.iter_cities()):
+        for name, metric in metrics.items():
+            expected = metric(ref_city)
+            error[name] = max(error[name], abs(metric(city) - expected) / max(abs(expected), 1.0))
+    return error
@@ -0,0 +1,28 @@
+'''Helpers for moving entity fields between Python lists and NumPy columns.'''
+
+import math
+
+import numpy as np
+
+
+def _as_list(values) -> list:
+    '''Python scalars from an array or sequence (tolist keeps ints as ints).'''
+    return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+
+def _as_optional_list(values, count: int) -> list:
+    '''Like _as_list, with NaN (or a missing column) read as None.'''
+    if values is None:
+        return [None] * count
+    return [None if isinstance(v, float) and math.isnan(v) else v for v in _as_list(values)]
+
+
+def _column(values) -> np.ndarray:
+    '''Array for a column of numbers, keeping ints as int64. None becomes NaN.'''
+    values = list(values)
+    if any(v is None for v in values):
+        return np.array([math.nan if v is None else v for v in values], dtype=np.float64)
+    array = np.asarray(values)
+    if array.dtype.kind not in "iuf" and len(values):
+        raise TypeError("column values must be numbers or None")
+    return array if len(values) else np.zeros(0, dtype=np.float64)
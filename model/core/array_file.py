@@ -0,0 +1,70 @@
+'''Single-file container for named NumPy arrays plus JSON metadata.
+
+Layout: magic, header length, JSON header, then each array's raw bytes at
+a 64-byte aligned offset. Arrays can be memory-mapped straight out of the
+file on read.
+'''
+
+import json
+import os
+import struct
+
+import numpy as np
+
+
+MAGIC = b"WSARRAY1"
+ALIGN = 64
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_array_file(path, meta: dict, arrays: dict[str, np.ndarray]) -> None:
+    '''Write metadata and arrays to path atomically.'''
+    arrays = {name: np.ascontiguousarray(values) for name, values in arrays.items()}
+    entries = {}
+    offset = 0
+    for name, values in arrays.items():
+        entries[name] = {"dtype": values.dtype.str, "shape": list(values.shape), "offset": offset}
+        offset = _align(offset + values.nbytes)
+
+    header = json.dumps({"meta": meta, "arrays": entries}).encode()
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, values in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(values.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_array_file(path, mmap: bool = True) -> tuple[dict, dict[str, np.ndarray]]:
+    '''Return (meta, arrays). With mmap the arrays are read-only views of the file.'''
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a worldsim array file")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    data_start = _align(len(MAGIC) + 8 + header_len)
+
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        if dtype.itemsize * int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+            continue
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buffer,
+                                  offset=data_start + entry["offset"])
+    return header["meta"], arrays
@@ -0,0 +1,444 @@
+'''Binary checkpoint and restore of a running simulation.
+
+A checkpoint is a single array file (see array_file). Structure, names,
+configs and RNG state go in its JSON header. Every numeric field of the
+groups, firms, cities and city histories is stored as a column. Restoring
+builds entities straight from those columns instead of parsing JSON, and a
+restored Core continues the saved run bit for bit.
+'''
+
+import math
+from dataclasses import fields
+
+import numpy as np
+
+from model.city.city import CITY_STATE_DTYPES, City, CityParams, CityState
+from model.city.city_aggregates import SUMMED_FIELDS
+from model.city.stepping import StepState
+from model.city.city_history import CITY_METRICS, FIRM_METRICS, GROUP_METRICS, CityHistory
+from model.core.array_columns import _column
+from model.core.array_file import read_array_file, write_array_file
+from model.core.ticks import Core
+from model.country.country import Country
+from model.country.country_properties import CountryParams
+from model.economy import Firm
+from model.economy.industry.firm_properties import FIRM_STATE_DTYPES, FirmParams, FirmState
+from model.economy.labour.labour_market import LabourClearResult, LabourFlow
+from model.migration.event_log import CHANNELS, COLUMNS as EVENT_COLUMNS
+from model.population import PopulationGroup
+from model.population.group_properties import PopulationGroupState
+from model.population.group_store import STATE_DTYPES
+from model.province.province import Province
+from model.province.province_properties import ProvinceParams
+
+
+CHECKPOINT_VERSION = 1
+
+GROUP_STATE_FIELDS = [f.name for f in fields(PopulationGroupState)]
+
+STEP_STATE_DTYPES = {
+    "weeks": np.int64,
+    "quiet": np.int64,
+    "held": np.int64,
+    "population": np.float64,
+    "employment_rate": np.float64,
+}
+
+FIRM_PARAM_FIELDS = ("productivity", "production_capacity", "education_wanted", "capital", "wage")
+
+# Written onto the city by CityData; missing before the first tick.
+CITY_SUMMARY_FIELDS = ("birth_total", "death_total", "employable", "productivity")
+
+LABOUR_FLOW_FIELDS = ("group_index", "firm_index", "workers", "wage_rate", "gross_pay")
+
+
+def _optional(value) -> float:
+    return math.nan if value is None else value
+
+
+def _from_optional(value: float):
+    return None if math.isnan(value) else value
+
+
+def _write_numbers(arrays: dict, key: str, values) -> None:
+    '''Column for numbers that may mix ints and floats (None as NaN).
+
+    An all-int column is int64. Otherwise ints are flagged in a mask
+    column, so they come back as ints rather than floats.
+    '''
+    values = list(values)
+    arrays[key] = _column(values)
+    if arrays[key].dtype.kind == "f":
+        is_int = np.array([isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in values],
+                          dtype=bool)
+        if is_int.any():
+            arrays[f"{key}.int"] = is_int
+
+
+def _read_numbers(arrays: dict, key: str) -> list:
+    values = arrays[key].tolist()
+    is_int = arrays.get(f"{key}.int")
+    if is_int is not None:
+        values = [int(v) if flag else v for v, flag in zip(values, is_int.tolist())]
+    return values
+
+
+def _stream_ids(entities) -> np.ndarray:
+    return np.array([getattr(entity.rng, "entity_id", -1) for entity in entities], dtype=np.int64)
+
+
+def _flatten_inventories(inventories: list[dict]) -> tuple[list[list[str]], list]:
+    goods = [list(inv) for inv in inventories]
+    values = [amount for inv in inventories for amount in inv.values()]
+    return goods, values
+
+
+def _unflatten_inventories(goods: list[list[str]], values: list) -> list[dict]:
+    out = []
+    pos = 0
+    for keys in goods:
+        out.append(dict(zip(keys, values[pos:pos + len(keys)])))
+        pos += len(keys)
+    return out
+
+
+def _labour_table(results, cities, arrays: dict) -> None:
+    '''Each city's latest labour clearing result; group and firm lists line up with the entities.'''
+    arrays["labour.has_result"] = np.array([result is not None for result in results], dtype=bool)
+    empty = [LabourClearResult(group_employed=[0] * city.group_count, group_income=[0.0] * city.group_count,
+                               firm_employed=[0] * len(city.firms), firm_wage_bill=[0.0] * len(city.firms))
+             for city in cities]
+    results = [result if result is not None else blank for result, blank in zip(results, empty)]
+    arrays["labour.total_employed"] = np.array([result.total_employed for result in results], dtype=np.int64)
+    for name in ("group_employed", "group_income", "firm_employed", "firm_wage_bill"):
+        _write_numbers(arrays, f"labour.{name}", [value for result in results for value in getattr(result, name)])
+    arrays["labour.flow_offsets"] = np.cumsum([0] + [len(result.flows) for result in results], dtype=np.int64)
+    for name in LABOUR_FLOW_FIELDS:
+        _write_numbers(arrays, f"labour.flows.{name}",
+                       [getattr(flow, name) for result in results for flow in result.flows])
+
+
+def _read_labour(arrays: dict, cities: list[dict]) -> list[LabourClearResult | None]:
+    '''Labour results written by _labour_table; cities give each one's group and firm counts.'''
+    if "labour.has_result" not in arrays:
+        return [None] * len(cities)
+    lists = {name: _read_numbers(arrays, f"labour.{name}")
+             for name in ("group_employed", "group_income", "firm_employed", "firm_wage_bill")}
+    flows = list(zip(*(_read_numbers(arrays, f"labour.flows.{name}") for name in LABOUR_FLOW_FIELDS)))
+    offsets = arrays["labour.flow_offsets"].tolist()
+    results = []
+    group_pos = firm_pos = 0
+    for i, (has_result, total, city) in enumerate(zip(arrays["labour.has_result"].tolist(),
+                                                      arrays["labour.total_employed"].tolist(), cities)):
+        groups = slice(group_pos, group_pos + city["groups"])
+        firms = slice(firm_pos, firm_pos + city["firms"])
+        group_pos, firm_pos = groups.stop, firms.stop
+        if not has_result:
+            results.append(None)
+            continue
+        results.append(LabourClearResult(
+            total_employed=total,
+            group_employed=lists["group_employed"][groups],
+            firm_employed=lists["firm_employed"][firms],
+            flows=[LabourFlow(*flow) for flow in flows[offsets[i]:offsets[i + 1]]],
+            group_income=lists["group_income"][groups],
+            firm_wage_bill=lists["firm_wage_bill"][firms],
+        ))
+    return results
+
+
+def _event_table(prefix: str, logs, names: dict, channels: dict, arrays: dict) -> None:
+    arrays[f"{prefix}.offsets"] = np.cumsum([0] + [len(log) for log in logs], dtype=np.int64)
+    arrays[f"{prefix}.ticks"] = np.array([log.tick for log in logs], dtype=np.int64)
+    codes = np.array([channels.setdefault(channel, len(channels)) for channel in CHANNELS], dtype=np.int64)
+    columns = {name: [] for name in EVENT_COLUMNS}
+    for log in logs:
+        ids = np.array([names.setdefault(name, len(names)) for name in log.names], dtype=np.int64)
+        for name in EVENT_COLUMNS:
+            values = log.column(name)
+            if name in ("source_city", "target_city"):
+                values = ids[values]
+            elif name == "channel":
+                values = codes[values]
+            columns[name].append(values)
+    for name, values in columns.items():
+        arrays[f"{prefix}.{name}"] = np.concatenate([np.empty(0, dtype=np.int64)] + values).astype(np.int64)
+
+
+def _read_events(prefix: str, arrays: dict, names: list[str], channels: list[str], logs) -> None:
+    offsets = arrays[f"{prefix}.offsets"].tolist()
+    codes = np.array([CHANNELS.index(channel) for channel in channels], dtype=np.int64)
+    columns = {name: np.asarray(arrays[f"{prefix}.{name}"]) for name in EVENT_COLUMNS}
+    columns["channel"] = codes[columns["channel"]]
+    for log, tick, start, end in zip(logs, arrays[f"{prefix}.ticks"].tolist(), offsets[:-1], offsets[1:]):
+        log.tick = tick
+        log.append_columns(names, {name: values[start:end] for name, values in columns.items()})
+
+
+def save_checkpoint(core: Core, path) -> None:
+    '''Write every country, province, city, group and firm of core to path.'''
+    provinces = [province for country in core.countries for province in country.provinces]
+    cities = [city for province in provinces for city in province.cities]
+    groups = [group for city in cities for group in city.populations]
+    firms = [firm for city in cities for firm in city.firms]
+    histories = [city.city_data.data for city in cities]
+
+    arrays: dict[str, np.ndarray] = {}
+
+    # Groups
+    arrays["group.p.size"] = np.array([g.p.size for g in groups], dtype=np.int64)
+    arrays["group.p.base_healthcare"] = np.array([g.p.base_healthcare for g in groups], dtype=np.float64)
+    _write_numbers(arrays, "group.p.healthcare_capacity", [g.p.healthcare_capacity for g in groups])
+    for name in GROUP_STATE_FIELDS:
+        arrays[f"group.state.{name}"] = np.array([getattr(g.state, name) for g in groups],
+                                                 dtype=STATE_DTYPES[name])
+    arrays["group.stream"] = _stream_ids(groups)
+
+    # Firms
+    for name in FIRM_PARAM_FIELDS:
+        _write_numbers(arrays, f"firm.p.{name}", [getattr(f.p, name) for f in firms])
+    for name in FIRM_STATE_DTYPES:
+        _write_numbers(arrays, f"firm.state.{name}", [getattr(f.state, name) for f in firms])
+    firm_goods, firm_inv = _flatten_inventories([f.state.inv for f in firms])
+    _write_numbers(arrays, "firm.inv", firm_inv)
+    arrays["firm.stream"] = _stream_ids(firms)
+
+    # Cities
+    for name, dtype in CITY_STATE_DTYPES.items():
+        arrays[f"city.state.{name}"] = np.array([getattr(c.state, name) for c in cities], dtype=dtype)
+    for name, dtype in STEP_STATE_DTYPES.items():
+        arrays[f"city.step.{name}"] = np.array([getattr(c.state.stepping, name) for c in cities],
+                                               dtype=dtype)
+    arrays["city.state.last_food_deficit"] = np.array(
+        [_optional(c.state.last_food_deficit) for c in cities], dtype=np.float64)
+    city_goods, city_inv = _flatten_inventories([c.state.inv for c in cities])
+    _write_numbers(arrays, "city.inv", city_inv)
+    arrays["city.has_summary"] = np.array([hasattr(c, "birth_total") for c in cities], dtype=bool)
+    for name in CITY_SUMMARY_FIELDS:
+        _write_numbers(arrays, f"city.{name}", [getattr(c, name, 0) for c in cities])
+    # Cached sums, so a restored run adds its deltas to the same values.
+    aggregates = [c.aggregates.cached for c in cities]
+    arrays["city.aggregates.dirty"] = np.array([dirty for _, _, dirty in aggregates], dtype=bool)
+    arrays["city.aggregates.attractiveness"] = np.array([value for _, value, _ in aggregates],
+                                                        dtype=np.float64)
+    for name in SUMMED_FIELDS:
+        _write_numbers(arrays, f"city.aggregates.{name}", [totals[name] for totals, _, _ in aggregates])
+    _labour_table([c.state.labour_result for c in cities], cities, arrays)
+    arrays["city.stream"] = _stream_ids(cities)
+    arrays["province.stream"] = _stream_ids(provinces)
+    arrays["country.stream"] = _stream_ids(core.countries)
+
+    # Migration logs of the latest tick
+    names: dict[str, int] = {}
+    channels: dict[str, int] = {}
+    _event_table("city.migrations", [c.state.migrations for c in cities], names, channels, arrays)
+    _event_table("province.migrations", [p.state.migrations for p in provinces], names, channels, arrays)
+
+    # City history, concatenated across cities
+    arrays["history.cursor"] = np.array(
+        [[h.updates, h.head, h.filled, h.interval, h.retention] for h in histories],
+        dtype=np.int64).reshape(len(histories), 5)
+    capacity = max((h.capacity for h in histories), default=0)
+    arrays["history.slot_ticks"] = np.zeros((len(histories), capacity), dtype=np.int64)
+    for name, dtype in CITY_METRICS.items():
+        arrays[f"history.city.{name}"] = np.zeros((len(histories), capacity), dtype=dtype)
+    for name, dtype in GROUP_METRICS.items():
+        arrays[f"history.groups.{name}"] = np.zeros((capacity, len(groups)), dtype=dtype)
+    for name, dtype in FIRM_METRICS.items():
+        arrays[f"history.firms.{name}"] = np.zeros((capacity, len(firms)), dtype=dtype)
+    group_pos = firm_pos = 0
+    for i, h in enumerate(histories):
+        arrays["history.slot_ticks"][i, :h.capacity] = h.slot_ticks
+        for name, values in h.city.items():
+            arrays[f"history.city.{name}"][i, :h.capacity] = values
+        for name, values in h.groups.items():
+            arrays[f"history.groups.{name}"][:h.capacity, group_pos:group_pos + h.group_count] = values
+        for name, values in h.firms.items():
+            arrays[f"history.firms.{name}"][:h.capacity, firm_pos:firm_pos + len(h.firm_labels)] = values
+        group_pos += h.group_count
+        firm_pos += len(h.firm_labels)
+
+    meta = {
+        "version": CHECKPOINT_VERSION,
+        "week": core.week,
+        "config": {
+            "seed": core.seed_cfg,
+            "city": core.city_cfg,
+            "province": core.province_cfg,
+            "country": core.country_cfg,
+            "core": core.core_cfg,
+        },
+        "rng": core.rng.bit_generator.state,
+        "streams": core.streams.state if core.streams is not None else None,
+        "countries": [
+            {"name": country.name,
+             "provinces": [
+                 {"name": province.name,
+                  "area": province.area,
+                  "cities": [{"name": city.name,
+                              "location": city.location,
+                              "groups": city.group_count,
+                              "firms": len(city.firms)} for city in province.cities]}
+                 for province in country.provinces]}
+            for country in core.countries
+        ],
+        "group_education_level": [g.p.education_level for g in groups],
+        "firm_text": [[f.p.ownership, f.p.good, f.p.input_mats, f.p.required_skill, f.p.country_policy]
+                      for f in firms],
+        "firm_goods": firm_goods,
+        "city_goods": city_goods,
+        "history_policy": [h.policy for h in histories],
+        "event_names": list(names),
+        "event_channels": list(channels),
+    }
+    write_array_file(path, meta, arrays)
+
+
+def load_checkpoint(path, mmap: bool = True) -> Core:
+    '''Rebuild a Core from a checkpoint written by save_checkpoint.'''
+    meta, arrays = read_array_file(path, mmap=mmap)
+    if meta.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {meta.get('version')!r}")
+
+    cfg = meta["config"]
+    core = Core(seed_cfg=cfg["seed"], city_cfg=cfg["city"], province_cfg=cfg["province"],
+                country_cfg=cfg["country"], core_cfg=cfg["core"])
+    core.week = meta["week"]
+    core.rng.bit_generator.state = meta["rng"]
+    if core.streams is not None:
+        core.streams.state = meta["streams"]
+
+    def rng_for(kind: str, entity_id: int):
+        return core.entity_rng(kind, entity_id) if entity_id >= 0 else core.rng
+
+    # Groups
+    groups = PopulationGroup.from_arrays(
+        size=arrays["group.p.size"],
+        base_healthcare=arrays["group.p.base_healthcare"],
+        healthcare_capacity=_read_numbers(arrays, "group.p.healthcare_capacity"),
+        education_level=meta["group_education_level"],
+        rngs=[rng_for("group", stream) for stream in arrays["group.stream"].tolist()],
+    )
+    group_states = zip(*(arrays[f"group.state.{name}"].tolist() for name in GROUP_STATE_FIELDS))
+    for group, values in zip(groups, group_states):
+        group.state = PopulationGroupState(*values)
+
+    # Firms
+    firm_numeric = zip(*(_read_numbers(arrays, f"firm.p.{name}") for name in FIRM_PARAM_FIELDS))
+    firm_state = zip(*(_read_numbers(arrays, f"firm.state.{name}") for name in FIRM_STATE_DTYPES))
+    firm_inv = _unflatten_inventories(meta["firm_goods"], _read_numbers(arrays, "firm.inv"))
+    firms = []
+    for (productivity, capacity, education, capital, wage), text, state, inv, stream in zip(
+            firm_numeric, meta["firm_text"], firm_state, firm_inv, arrays["firm.stream"].tolist()):
+        ownership, good, input_mats, required_skill, country_policy = text
+        firm = Firm(
+            params=FirmParams(productivity=productivity, production_capacity=capacity,
+                              ownership=ownership, good=good, education_wanted=education,
+                              input_mats=input_mats, capital=_from_optional(capital),
+                              wage=_from_optional(wage), required_skill=required_skill,
+                              country_policy=country_policy),
+            rng=rng_for("firm", stream),
+        )
+        firm.state = FirmState(*state, inv=inv)
+        firms.append(firm)
+
+    # Cities, provinces, countries
+    names, channels = meta["event_names"], meta["event_channels"]
+    city_state = list(zip(*(arrays[f"city.state.{name}"].tolist() for name in CITY_STATE_DTYPES)))
+    city_step = list(zip(*(arrays[f"city.step.{name}"].tolist() for name in STEP_STATE_DTYPES)))
+    city_deficit = arrays["city.state.last_food_deficit"].tolist()
+    city_inv = _unflatten_inventories(meta["city_goods"], _read_numbers(arrays, "city.inv"))
+    city_summary = list(zip(*(_read_numbers(arrays, f"city.{name}") for name in CITY_SUMMARY_FIELDS)))
+    if "city.aggregates.dirty" in arrays:
+        city_aggregates = list(zip(
+            [dict(zip(SUMMED_FIELDS, totals)) for totals in
+             zip(*(_read_numbers(arrays, f"city.aggregates.{name}") for name in SUMMED_FIELDS))],
+            arrays["city.aggregates.attractiveness"].tolist(),
+            arrays["city.aggregates.dirty"].tolist()))
+    else:
+        city_aggregates = None
+    city_labour = _read_labour(arrays, [city for country in meta["countries"]
+                                        for province in country["provinces"] for city in province["cities"]])
+    has_summary = arrays["city.has_summary"].tolist()
+    city_streams = arrays["city.stream"].tolist()
+    province_streams = arrays["province.stream"].tolist()
+    country_streams = arrays["country.stream"].tolist()
+    cursors = arrays["history.cursor"].tolist()
+
+    city_index = province_index = 0
+    group_pos = firm_pos = 0
+    for country_index, country_meta in enumerate(meta["countries"]):
+        provinces = []
+        for province_meta in country_meta["provinces"]:
+            cities = []
+            for city_meta in province_meta["cities"]:
+                i = city_index
+                city_groups = groups[group_pos:group_pos + city_meta["groups"]]
+                city_firms = firms[firm_pos:firm_pos + city_meta["firms"]]
+                city = City(
+                    cfg=core.city_cfg,
+                    rng=rng_for("city", city_streams[i]),
+                    params=CityParams(name=city_meta["name"], populations=city_groups, firms=city_firms,
+                                      location=tuple(city_meta["location"]) if city_meta["location"] else None),
+                )
+                employed, treasury, starving = city_state[i]
+                city.state = CityState(employed=employed, migrations=city.state.migrations,
+                                       last_food_deficit=_from_optional(city_deficit[i]),
+                                       inv=city_inv[i], treasury=treasury, starving=starving,
+                                       labour_result=city_labour[i],
+                                       stepping=StepState(*city_step[i]))
+                if has_summary[i]:
+                    for name, value in zip(CITY_SUMMARY_FIELDS, city_summary[i]):
+                        setattr(city, name, value)
+                if city_aggregates is not None:
+                    city.aggregates.cached = city_aggregates[i]
+
+                updates, head, filled, interval, retention = cursors[i]
+                history = CityHistory(group_count=len(city_groups),
+                                      firm_labels=[(f.ownership, f.good) for f in city_firms],
+                                      retention=retention,
+                                      policy=meta["history_policy"][i],
+                                      interval=interval)
+                # A ring only wraps once full, so filled samples fit the saved layout.
+                history.reserve(filled)
+                history.updates, history.head, history.filled = updates, head, filled
+                capacity = history.capacity
+                history.slot_ticks[:] = arrays["history.slot_ticks"][i, :capacity]
+                for name, values in history.city.items():
+                    values[:] = arrays[f"history.city.{name}"][i, :capacity]
+                for name, values in history.groups.items():
+                    values[:] = arrays[f"history.groups.{name}"][:capacity,
+                                                                 group_pos:group_pos + len(city_groups)]
+                for name, values in history.firms.items():
+                    values[:] = arrays[f"history.firms.{name}"][:capacity,
+                                                                firm_pos:firm_pos + len(city_firms)]
+                city.city_data.data = history
+
+                cities.append(city)
+                city_index += 1
+                group_pos += len(city_groups)
+                firm_pos += len(city_firms)
+
+            province = Province(
+                cfg=core.province_cfg,
+                rng=rng_for("province", province_streams[province_index]),
+                params=ProvinceParams(name=province_meta["name"], area=province_meta["area"],
+                                      cities=cities),
+            )
+            provinces.append(province)
+            province_index += 1
+
+        core.countries.append(Country(
+            params=CountryParams(name=country_meta["name"], provinces=provinces),
+            cfg=core.country_cfg,
+            rng=rng_for("country", country_streams[country_index]),
+        ))
+
+    _read_events("city.migrations", arrays, names, channels,
+                 [city.state.migrations for city in core.iter_cities()])
+    _read_events("province.migrations", arrays, names, channels,
+                 [province.state.migrations for country in core.countries for province in country.provinces])
+
+    core.bind_population_store()
+    core.attach_profiler(core.profiler)
+    return core
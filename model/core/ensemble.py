@@ -0,0 +1,202 @@
+'''Monte Carlo ensembles: one world run under many seeds.
+
+The input file is compiled once to the binary world cache and every
+member builds from that memory-mapped file, so the world is parsed once
+rather than per worker. Members run on a process pool and return only
+their per-tick metrics, which are folded into running means and P-square
+quantile estimates in seed order. Memory stays constant in the number of
+runs and results don't depend on the worker count.
+'''
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from model.core.ticks import Core
+from model.core.world_loader import compile_world
+
+
+METRICS = ("population", "employed", "food_deficit", "treasury")
+
+
+def tick_metrics(core: Core) -> np.ndarray:
+    '''World totals of each of METRICS after the latest tick.'''
+    totals = np.zeros(len(METRICS), dtype=np.float64)
+    for city in core.iter_cities():
+        totals += (city.total_population, city.employed, city.last_food_deficit or 0.0,
+                   city.state.treasury)
+    return totals
+
+
+class StreamingQuantiles:
+    '''
+    P-square (Jain & Chlamtac) estimates of fixed quantiles for every cell
+    of an array, updated one observation of the whole array at a time.
+    Each quantile keeps five markers per cell; until five observations
+    arrive the exact quantile of those seen is returned.
+    '''
+
+    def __init__(self, shape, quantiles) -> None:
+        self.shape = tuple(shape)
+        self.p = np.asarray(quantiles, dtype=np.float64).reshape(-1, 1)
+        cells = int(np.prod(self.shape))
+        self.count = 0
+        self._first: list[np.ndarray] = []
+        self.heights = np.zeros((len(self.p), cells, 5))
+        self.positions = np.tile(np.arange(1.0, 6.0), (len(self.p), cells, 1))
+        self.desired = np.broadcast_to(
+            np.stack([np.ones_like(self.p), 1 + 2 * self.p, 1 + 4 * self.p, 3 + 2 * self.p,
+                      np.full_like(self.p, 5.0)], axis=-1),
+            self.positions.shape).copy()
+        self.increments = np.stack([np.zeros_like(self.p), self.p / 2, self.p, (1 + self.p) / 2,
+                                    np.ones_like(self.p)], axis=-1)
+
+    def add(self, values) -> None:
+        x = np.asarray(values, dtype=np.float64).reshape(-1)
+        self.count += 1
+        if self.count <= 5:
+            self._first.append(x)
+            if self.count == 5:
+                self.heights[:] = np.sort(np.stack(self._first, axis=-1), axis=-1)
+                self._first = []
+            return
+
+        q, n = self.heights, self.positions
+        x = np.broadcast_to(x, q.shape[:2])
+        np.minimum(q[..., 0], x, out=q[..., 0])
+        np.maximum(q[..., 4], x, out=q[..., 4])
+        # Markers above the new observation move up one position.
+        n[..., 1:] += x[..., None] < q[..., 1:]
+        n[..., 4] = self.count
+        self.desired += self.increments
+
+        for i in (1, 2, 3):
+            d = self.desired[..., i] - n[..., i]
+            move = (((d >= 1) & (n[..., i + 1] - n[..., i] > 1))
+                    | ((d <= -1) & (n[..., i - 1] - n[..., i] < -1)))
+            if not move.any():
+                continue
+            step = np.sign(d)
+            below, here, above = q[..., i - 1], q[..., i], q[..., i + 1]
+            n_below, n_here, n_above = n[..., i - 1], n[..., i], n[..., i + 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                parabolic = here + step / (n_above - n_below) * (
+                    (n_here - n_below + step) * (above - here) / (n_above - n_here)
+                    + (n_above - n_here - step) * (here - below) / (n_here - n_below))
+                neighbour = np.where(step > 0, above, below)
+                n_neighbour = np.where(step > 0, n_above, n_below)
+                linear = here + step * (neighbour - here) / (n_neighbour - n_here)
+            height = np.where((below < parabolic) & (parabolic < above), parabolic, linear)
+            q[..., i] = np.where(move, height, here)
+            n[..., i] += np.where(move, step, 0.0)
+
+    def result(self) -> np.ndarray:
+        '''Estimates shaped (len(quantiles), *shape).'''
+        if self.count == 0:
+            raise ValueError("no observations")
+        if self.count < 5:
+            exact = np.quantile(np.stack(self._first), self.p.ravel(), axis=0)
+            return exact.reshape(len(self.p), *self.shape)
+        return self.heights[..., 2].reshape(len(self.p), *self.shape)
+
+
+class EnsembleStats:
+    '''Running mean, standard deviation and quantile bands of per-tick metrics.'''
+
+    def __init__(self, ticks: int, quantiles=(0.05, 0.5, 0.95)) -> None:
+        self.ticks = ticks
+        self.quantiles = tuple(quantiles)
+        self.runs = 0
+        self.mean = np.zeros((ticks, len(METRICS)))
+        self._m2 = np.zeros((ticks, len(METRICS)))
+        self.bands = StreamingQuantiles((ticks, len(METRICS)), self.quantiles)
+
+    def add(self, run: np.ndarray) -> None:
+        '''Fold in one run's (ticks, metrics) array (Welford's update).'''
+        self.runs += 1
+        delta = run - self.mean
+        self.mean += delta / self.runs
+        self._m2 += delta * (run - self.mean)
+        self.bands.add(run)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self._m2 / max(self.runs - 1, 1))
+
+    def summary(self) -> dict:
+        '''Per-metric series of mean, std and each quantile band, by tick.'''
+        bands = self.bands.result()
+        out = {"runs": self.runs, "ticks": self.ticks, "metrics": {}}
+        for m, metric in enumerate(METRICS):
+            series = {"mean": self.mean[:, m].tolist(), "std": self.std[:, m].tolist()}
+            for q, quantile in enumerate(self.quantiles):
+                series[f"p{quantile * 100:g}"] = bands[q, :, m].tolist()
+            out["metrics"][metric] = series
+        return out
+
+    def export(self, path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+def run_member(seed: int, ticks: int, cfgs: dict, world_path) -> np.ndarray:
+    '''Run one seed over the compiled world and return its (ticks, metrics) array.'''
+    core = Core(
+        seed_cfg={**cfgs["seed"], "seed": seed, "use": True},
+        city_cfg=cfgs["city"],
+        province_cfg=cfgs["province"],
+        country_cfg=cfgs["country"],
+        # One process per member; nested province pools would only contend.
+        core_cfg={**cfgs["core"], "parallel": {"workers": 1}, "profiler": {"enabled": False}},
+    )
+    core.build_compiled(world_path)
+    metrics = np.zeros((ticks, len(METRICS)))
+    for tick in range(ticks):
+        core.tick()
+        metrics[tick] = tick_metrics(core)
+    core.close()
+    return metrics
+
+
+class EnsembleRunner:
+    '''
+    Runs seeds base_seed .. base_seed + runs - 1 of the same configs over
+    a pool of workers. cfgs holds the "seed", "city", "province", "country"
+    and "core" config sections.
+    '''
+
+    def __init__(self, cfgs: dict, runs: int, ticks: int, workers: int = 1, base_seed: int = 0,
+                 quantiles=(0.05, 0.5, 0.95)) -> None:
+        if runs < 1:
+            raise ValueError("runs must be at least 1")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.cfgs = cfgs
+        self.runs = runs
+        self.ticks = ticks
+        self.workers = workers
+        self.base_seed = base_seed
+        self.quantiles = quantiles
+
+    @property
+    def seeds(self) -> range:
+        return range(self.base_seed, self.base_seed + self.runs)
+
+    def run(self, path="input_data.json") -> EnsembleStats:
+        '''Compile path once, run every seed and return the aggregated stats.'''
+        world_cfg = self.cfgs["core"].get("world", {})
+        world_path = compile_world(path, world_cfg.get("cache_dir", ".worldsim_cache"))
+        stats = EnsembleStats(self.ticks, self.quantiles)
+        members = [(seed, self.ticks, self.cfgs, world_path) for seed in self.seeds]
+
+        if self.workers == 1:
+            for member in members:
+                stats.add(run_member(*member))
+            return stats
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            # map yields in seed order, so aggregation is independent of scheduling.
+            for metrics in pool.map(run_member, *zip(*members)):
+                stats.add(metrics)
+        return stats
@@ -1,42 +1,264 @@
-"""Simulation-wide invariant checks used by tests and debugging."""
+"""Simulation-wide invariant checks used by tests, debugging and production runs.
+
+InvariantChecker tests every condition as array comparisons over the
+group, firm and city state and reports failures as InvariantViolation
+records. State is read from the columnar and shared-memory stores where
+they hold it, and only gathered object by object otherwise. City
+inventories, which no store holds, are always gathered per city. It can
+run every n-th tick and on a rotating subset of cities, so it is cheap
+enough to leave on outside of tests.
+"""
+
+import math
+from dataclasses import dataclass
+from itertools import chain
+
+import numpy as np
+
+
+MESSAGES = {
+    "city.negative_food": "{city}: negative food inventory",
+    "city.negative_inventory": "{city}: negative inventory for {good}",
+    "group.negative_size": "{city}: negative group size",
+    "group.negative_sick": "{city}: negative sick count",
+    "group.negative_money": "{city}: negative group money",
+    "group.negative_employed": "{city}: negative employed count",
+    "group.employed_exceeds_size": "{city}: employed exceeds group size",
+    "firm.negative_inventory": "{city}: negative firm inventory for {good}",
+    "firm.negative_employed": "{city}: negative firm employment",
+    "firm.negative_productivity": "{city}: negative firm productivity",
+    "firm.negative_market_capital": "{city}: negative firm market capital",
+    "city.negative_treasury": "{city}: negative city treasury",
+}
+
+GROUP_FIELDS = ("size", "sick", "money", "employed")
+
+FIRM_FIELDS = ("employed", "total_productivity", "market_capital")
+
+
+@dataclass(frozen=True)
+class InvariantViolation:
+    '''One failed check on one city, group or firm.'''
+    check: str  # Key of MESSAGES
+    city: str
+    index: int  # Group or firm index within the city; -1 for the city itself
+    value: float
+    good: str | None = None
+
+    @property
+    def message(self) -> str:
+        return MESSAGES[self.check].format(city=self.city, good=self.good)
+
+
+class InvariantError(AssertionError):
+    def __init__(self, violations: list[InvariantViolation]) -> None:
+        super().__init__("\n".join(violation.message for violation in violations))
+        self.violations = violations
+
+
+def _offsets(counts) -> np.ndarray:
+    return np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+
+
+def _rows(offsets: np.ndarray, cities: np.ndarray) -> np.ndarray:
+    '''Flat entity rows belonging to the given city positions.'''
+    counts = offsets[cities + 1] - offsets[cities]
+    starts = np.repeat(offsets[cities] - np.cumsum(counts) + counts, counts)
+    return starts + np.arange(counts.sum())
+
+
+def _inventory(owners: list, positions: np.ndarray):
+    '''Values, owner positions and a function giving the goods of the inventories of owners.'''
+    inventories = [owner.inv for owner in owners]
+    lengths = [len(inv) for inv in inventories]
+    values = np.fromiter(chain.from_iterable(inv.values() for inv in inventories),
+                         dtype=np.float64, count=sum(lengths))
+    return values, np.repeat(positions, lengths), lambda: [good for inv in inventories for good in inv]
+
+
+def _column_inventory(columns: dict[str, np.ndarray], rows: np.ndarray):
+    '''_inventory for owners whose inventories are one column per good.'''
+    goods = list(columns)
+    if not goods:
+        return np.zeros(0), np.zeros(0, dtype=np.int64), list
+    # Owner-major, like the per-object inventories.
+    values = np.column_stack([columns[good][rows] for good in goods]).ravel()
+    return values, np.repeat(np.arange(len(rows)), len(goods)), lambda: goods * len(rows)
+
+
+def _bound_in_order(entities: list, block, inventories=None) -> bool:
+    '''Whether each entity's state is row i of block (and its inventory of inventories).'''
+    for row, entity in enumerate(entities):
+        state = entity.state
+        if getattr(state, "store", None) is not block or state.row != row:
+            return False
+        if inventories is not None and getattr(state.inv, "store", None) is not inventories:
+            return False
+    return True
+
+
+class InvariantChecker:
+    '''
+    Vectorized invariant checks over a built Core.
+
+    interval runs the checks on every n-th tick. sample below 1 checks
+    every k-th city (k = ceil(1 / sample)), moving the offset each check so
+    every city is covered within k checks. on_violation "raise" raises
+    InvariantError; "record" keeps up to max_records violations in
+    violations and carries on.
+    '''
+
+    def __init__(self, core, interval: int = 1, sample: float = 1.0, on_violation: str = "raise",
+                 max_records: int = 1000) -> None:
+        if interval < 1:
+            raise ValueError("interval must be at least 1")
+        if not 0 < sample <= 1:
+            raise ValueError("sample must be in (0, 1]")
+        if on_violation not in ("raise", "record"):
+            raise ValueError(f"Unknown invariant violation action: {on_violation!r}")
+        self.interval = interval
+        self.stride = math.ceil(1 / sample)
+        self.on_violation = on_violation
+        self.max_records = max_records
+        self.violations: list[InvariantViolation] = []
+        self.checks = 0
+
+        self.cities = list(core.iter_cities())
+        self.groups = [group for city in self.cities for group in city.populations]
+        self.firms = [firm for city in self.cities for firm in city.firms]
+        self.group_offsets = _offsets([len(city.populations) for city in self.cities])
+        self.firm_offsets = _offsets([len(city.firms) for city in self.cities])
+
+        # Read state straight from the columnar and shared stores when they hold
+        # these entities in order; shared memory holds groups under either engine.
+        shared = core.shared_state
+        store = core.population_store
+        if store is None and shared is not None:
+            store = shared.store
+        same_rows = (store is not None and len(store.groups) == len(self.groups)
+                     and all(a is b for a, b in zip(store.groups, self.groups)))
+        self.store = store if same_rows else None
+        self.firm_columns = self.inventory_columns = self.city_columns = None
+        if shared is not None:
+            if _bound_in_order(self.firms, shared.firms, shared.firm_inventory):
+                self.firm_columns = shared.firms.columns
+                self.inventory_columns = shared.firm_inventory.columns
+            if _bound_in_order(self.cities, shared.cities):
+                self.city_columns = shared.cities.columns
+
+    @classmethod
+    def from_cfg(cls, core, cfg: dict) -> "InvariantChecker":
+        return cls(
+            core,
+            interval=cfg.get("interval", 1),
+            sample=cfg.get("sample", 1.0),
+            on_violation=cfg.get("on_violation", "raise"),
+            max_records=cfg.get("max_records", 1000),
+        )
+
+    def _group_values(self, rows: np.ndarray) -> dict[str, np.ndarray]:
+        if self.store is not None:
+            return {name: self.store.columns[name][rows] for name in GROUP_FIELDS}
+        states = [self.groups[row].state for row in rows.tolist()]
+        return {name: np.fromiter((getattr(state, name) for state in states), dtype=np.float64,
+                                  count=len(states))
+                for name in GROUP_FIELDS}
+
+    def _firm_values(self, rows: np.ndarray, firms: list) -> dict[str, np.ndarray]:
+        if self.firm_columns is not None:
+            return {name: self.firm_columns[name][rows] for name in FIRM_FIELDS}
+        states = [firm.state for firm in firms]
+        return {name: np.fromiter((getattr(state, name) for state in states), dtype=np.float64,
+                                  count=len(states))
+                for name in FIRM_FIELDS}
+
+    def _treasury(self, cities: np.ndarray, selected: list) -> np.ndarray:
+        if self.city_columns is not None:
+            return self.city_columns["treasury"][cities]
+        return np.fromiter((city.state.treasury for city in selected), dtype=np.float64,
+                           count=len(selected))
+
+    def check(self, cities=None) -> list[InvariantViolation]:
+        '''Violations in the cities at the given positions (all cities by default).'''
+        cities = np.arange(len(self.cities)) if cities is None else np.asarray(cities, dtype=np.int64)
+        found: list[tuple[int, InvariantViolation]] = []
+
+        def flag(check, failed, city_pos, index, values, goods=None):
+            for i in np.flatnonzero(failed).tolist():
+                position = int(city_pos[i])
+                found.append((position, InvariantViolation(
+                    check=check, city=self.cities[position].name, index=int(index[i]),
+                    value=float(values[i]), good=None if goods is None else goods[i])))
+
+        # Cities
+        selected = [self.cities[i] for i in cities.tolist()]
+        no_index = np.full(len(cities), -1)
+        food = np.fromiter((city.inv.get("food", 0) for city in selected), dtype=np.float64,
+                           count=len(selected))
+        flag("city.negative_food", food < 0, cities, no_index, food)
+        values, owners, goods = _inventory(selected, cities)
+        if (values < 0).any():
+            flag("city.negative_inventory", values < 0, owners, np.full(len(values), -1), values, goods())
+
+        # Groups
+        rows = _rows(self.group_offsets, cities)
+        group_city = np.repeat(cities, np.diff(self.group_offsets)[cities])
+        group_index = rows - self.group_offsets[group_city]
+        g = self._group_values(rows)
+        flag("group.negative_size", g["size"] < 0, group_city, group_index, g["size"])
+        flag("group.negative_sick", g["sick"] < 0, group_city, group_index, g["sick"])
+        flag("group.negative_money", g["money"] < 0, group_city, group_index, g["money"])
+        flag("group.negative_employed", g["employed"] < 0, group_city, group_index, g["employed"])
+        flag("group.employed_exceeds_size", g["employed"] > g["size"], group_city, group_index,
+             g["employed"])
+
+        # Firms
+        rows = _rows(self.firm_offsets, cities)
+        firm_city = np.repeat(cities, np.diff(self.firm_offsets)[cities])
+        firm_index = rows - self.firm_offsets[firm_city]
+        if self.firm_columns is None:
+            firms = [self.firms[row] for row in rows.tolist()]
+            values, owners, goods = _inventory(firms, np.arange(len(firms)))
+        else:
+            firms = None
+            values, owners, goods = _column_inventory(self.inventory_columns, rows)
+        if (values < 0).any():
+            flag("firm.negative_inventory", values < 0, firm_city[owners], firm_index[owners], values, goods())
+        f = self._firm_values(rows, firms)
+        flag("firm.negative_employed", f["employed"] < 0, firm_city, firm_index, f["employed"])
+        flag("firm.negative_productivity", f["total_productivity"] < 0, firm_city, firm_index,
+             f["total_productivity"])
+        flag("firm.negative_market_capital", f["market_capital"] < 0, firm_city, firm_index,
+             f["market_capital"])
+
+        treasury = self._treasury(cities, selected)
+        flag("city.negative_treasury", treasury < 0, cities, no_index, treasury)
+
+        found.sort(key=lambda item: item[0])
+        return [violation for _, violation in found]
+
+    def selected_cities(self) -> np.ndarray:
+        '''City positions covered by the next check.'''
+        return np.arange(self.checks % self.stride, len(self.cities), self.stride)
+
+    def after_tick(self, tick: int) -> list[InvariantViolation]:
+        '''Check the next sample of cities if tick falls on the interval.'''
+        if tick % self.interval:
+            return []
+        violations = self.check(self.selected_cities())
+        self.checks += 1
+        if violations:
+            if self.on_violation == "raise":
+                raise InvariantError(violations)
+            self.violations.extend(violations[:max(self.max_records - len(self.violations), 0)])
+        return violations
 
 
 def collect_invariant_errors(core):
-    errors = []
-    for country in core.countries:
-        for province in country.provinces:
-            for city in province.cities:
-                if city.inv.get("food", 0) < 0:
-                    errors.append(f"{city.name}: negative food inventory")
-                for good, amount in city.inv.items():
-                    if amount < 0:
-                        errors.append(f"{city.name}: negative inventory for {good}")
-                for group in city.populations:
-                    if group.size < 0:
-                        errors.append(f"{city.name}: negative group size")
-                    if group.sick < 0:
-                        errors.append(f"{city.name}: negative sick count")
-                    if group.money < 0:
-                        errors.append(f"{city.name}: negative group money")
-                    if group.employed < 0:
-                        errors.append(f"{city.name}: negative employed count")
-                    if group.employed > group.size:
-                        errors.append(f"{city.name}: employed exceeds group size")
-                for firm in city.firms:
-                    if firm.inventory < 0:
-                        errors.append(f"{city.name}: negative firm inventory for {firm.good}")
-                    if firm.employed < 0:
-                        errors.append(f"{city.name}: negative firm employment")
-                    if firm.total_productivity < 0:
-                        errors.append(f"{city.name}: negative firm productivity")
-                    if firm.market_capital < 0:
-                        errors.append(f"{city.name}: negative firm market capital")
-                if city.state.treasury < 0:
-                    errors.append(f"{city.name}: negative city treasury")
-    return errors
+    return [violation.message for violation in InvariantChecker(core).check()]
 
 
 def assert_core_invariants(core):
-    errors = collect_invariant_errors(core)
-    if errors:
-        raise AssertionError("\n".join(errors))
+    violations = InvariantChecker(core).check()
+    if violations:
+        raise InvariantError(violations)
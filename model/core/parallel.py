@@ -0,0 +1,325 @@
+'''Process-pool execution of province ticks.
+
+Provinces only interact through country-level phases, so a tick can run
+each province on a worker process. The runner ships provinces to the pool,
+ticks them there and copies the resulting state (not the provinces
+themselves) back onto the coordinator's objects at a per-tick barrier.
+Merging happens in province order, so with keyed random streams the result
+is identical to the serial path for any worker count.
+
+With core.parallel.shared_memory the numeric group, firm and city state,
+firm inventories and city histories live in shared memory (see
+shared_state). Each shard of provinces is then sent once to a long-lived
+worker process that keeps it resident. Every tick only the stream tick and
+a few values per city cross the pipe (CityInputs out, CityOutputs back);
+the coordinator reads every number straight from the shared blocks.
+Migration logs and labour results stay with the worker until sync()
+fetches them.
+'''
+
+import pickle
+from dataclasses import fields
+from typing import TYPE_CHECKING, NamedTuple
+
+from model.population.group_properties import PopulationGroupState
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+
+GROUP_STATE_FIELDS = [f.name for f in fields(PopulationGroupState)]
+
+# Attributes CityData sets on the city outside of CityState.
+CITY_SUMMARY_ATTRS = ("birth_total", "death_total", "employable", "productivity")
+
+
+class CityInputs(NamedTuple):
+    '''Coordinator-side city values a resident worker takes on before a tick.'''
+    stepping: object
+    # CityAggregates.cached; the columnar store ticks groups on the coordinator.
+    aggregates: tuple
+    inv: dict
+
+
+class CityOutputs(NamedTuple):
+    '''The values of a city a resident worker ticked that are not in shared memory.'''
+    summary: dict
+    aggregates: tuple
+    inv: dict
+    last_food_deficit: float | None
+    stepping: object
+    # CityHistory cursor: updates, head, filled, interval.
+    history: tuple
+
+
+def city_outputs(city) -> CityOutputs:
+    history = city.city_data.data
+    return CityOutputs(
+        summary={attr: getattr(city, attr) for attr in CITY_SUMMARY_ATTRS if hasattr(city, attr)},
+        aggregates=city.aggregates.cached,
+        inv=city.state.inv,
+        last_food_deficit=city.state.last_food_deficit,
+        stepping=city.state.stepping,
+        history=(history.updates, history.head, history.filled, history.interval),
+    )
+
+
+def apply_city_outputs(city, outputs: CityOutputs) -> None:
+    for attr, value in outputs.summary.items():
+        setattr(city, attr, value)
+    city.aggregates.cached = outputs.aggregates
+    city.state.inv = outputs.inv
+    city.state.last_food_deficit = outputs.last_food_deficit
+    city.state.stepping = outputs.stepping
+    history = city.city_data.data
+    history.updates, history.head, history.filled, history.interval = outputs.history
+
+
+def _serve_shard(conn, provinces, streams) -> None:
+    '''Worker loop keeping one shard of provinces resident between ticks.'''
+    while True:
+        message = pickle.loads(conn.recv_bytes())
+        try:
+            reply = _handle(message, provinces, streams)
+        except Exception as error:
+            # Raised again on the coordinator by ResidentShard.receive.
+            reply = error
+        if message[0] == "close":
+            break
+        conn.send_bytes(pickle.dumps(reply))
+    conn.close()
+
+
+def _handle(message, provinces, streams):
+    '''One resident worker step: tick some provinces or hand over their state.'''
+    if message[0] == "tick":
+        _, tick, week, tick_groups, positions, inputs = message
+        if streams is not None:
+            streams.tick = tick
+        ticked = [provinces[position] for position in positions]
+        cities = [city for province in ticked for city in province.cities]
+        for city, city_inputs in zip(cities, inputs):
+            city.state.stepping = city_inputs.stepping
+            city.aggregates.cached = city_inputs.aggregates
+            city.state.inv = city_inputs.inv
+        for province in ticked:
+            province.tick(tick_groups=tick_groups, week=week)
+        return [city_outputs(city) for city in cities]
+    if message[0] == "sync":
+        return [(province.state.migrations,
+                 [(city.state.migrations, city.state.labour_result) for city in province.cities])
+                for province in provinces]
+    return None
+
+
+class ResidentShard:
+    '''A worker process holding one shard of provinces, and the pipe to it.'''
+
+    def __init__(self, context, provinces, streams) -> None:
+        self.provinces = provinces
+        self.positions = {id(province): position for position, province in enumerate(provinces)}
+        self.conn, child = context.Pipe()
+        # Forked workers inherit the shard; otherwise it is pickled once, here.
+        self.process = context.Process(target=_serve_shard, args=(child, provinces, streams), daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, message) -> int:
+        payload = pickle.dumps(message)
+        self.conn.send_bytes(payload)
+        return len(payload)
+
+    def receive(self) -> tuple[object, int]:
+        payload = self.conn.recv_bytes()
+        reply = pickle.loads(payload)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply, len(payload)
+
+    def close(self) -> None:
+        try:
+            self.send(("close",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join()
+        self.conn.close()
+
+
+class CityResult(NamedTuple):
+    '''What a worker sends back for one ticked city.'''
+    state: object
+    summary: dict
+    history: object
+    firm_states: list
+    # CityAggregates.cached, so the coordinator's sums match the worker's.
+    aggregates: tuple
+    group_states: list
+
+
+def city_result(city) -> CityResult:
+    return CityResult(
+        state=city.state,
+        summary={attr: getattr(city, attr) for attr in CITY_SUMMARY_ATTRS if hasattr(city, attr)},
+        history=city.city_data.data,
+        firm_states=[firm.state for firm in city.firms],
+        aggregates=city.aggregates.cached,
+        group_states=[group.state for group in city.populations],
+    )
+
+
+def _tick_shard(provinces, tick_groups, week):
+    for province in provinces:
+        province.tick(tick_groups=tick_groups, week=week)
+    # Only state travels back, not params, entities or random streams.
+    return [(province.state, [city_result(city) for city in province.cities])
+            for province in provinces]
+
+
+def merge_province(dst, result) -> None:
+    '''Copy the state of a province ticked elsewhere onto dst.'''
+    dst.state, city_results = result
+    for city, city_result_ in zip(dst.cities, city_results):
+        merge_city(city, city_result_)
+
+
+def merge_city(dst, result: CityResult) -> None:
+    '''Copy city, group and firm state from a CityResult onto dst.'''
+    dst.state = result.state
+    for attr, value in result.summary.items():
+        setattr(dst, attr, value)
+    dst.city_data.data.extend(result.history)
+
+    for group, state in zip(dst.populations, result.group_states):
+        # Write field by field: group.state may be a view onto a PopulationStore.
+        for name in GROUP_STATE_FIELDS:
+            setattr(group.state, name, getattr(state, name))
+    dst.aggregates.cached = result.aggregates
+
+    for firm, state in zip(dst.firms, result.firm_states):
+        firm.state = state
+
+
+class ParallelProvinceRunner:
+    '''Ticks provinces across a pool of worker processes.'''
+
+    def __init__(self, workers: int) -> None:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self._pool: "ProcessPoolExecutor | None" = None
+        # Set by bind_shared: the world's SharedWorldState, provinces and streams.
+        self.shared = None
+        self.provinces: list = []
+        self.streams = None
+        self._resident: list[ResidentShard] = []
+        # Bytes pickled across the pipes by the latest resident tick, both ways.
+        self.payload_bytes = 0
+
+    def bind_shared(self, shared, provinces, streams) -> None:
+        '''Tick on resident workers over shared, the state of every province in the world.'''
+        self.shared = shared
+        self.provinces = list(provinces)
+        self.streams = streams
+
+    def shards(self, provinces) -> list[list]:
+        '''Split provinces into contiguous, roughly group-balanced shards.'''
+        weights = [sum(city.group_count for city in province.cities) for province in provinces]
+        target = sum(weights) / self.workers if provinces else 0
+        shards: list[list] = [[]]
+        load = 0
+        for province, weight in zip(provinces, weights):
+            if shards[-1] and load >= target and len(shards) < self.workers:
+                shards.append([])
+                load = 0
+            shards[-1].append(province)
+            load += weight
+        return [shard for shard in shards if shard]
+
+    def tick(self, provinces, tick_groups: bool = True, week: int | None = None) -> None:
+        '''Tick provinces on the pool and merge results back in order.'''
+        if self.shared is not None:
+            self._tick_resident(provinces, tick_groups, week)
+            return
+        if self._pool is None:
+            # Imported here so serial runs never load multiprocessing.
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        shards = self.shards(provinces)
+        # History stays on the coordinator; workers record into a small detached copy.
+        histories = [(city, city.city_data.data) for province in provinces for city in province.cities]
+        for city, data in histories:
+            city.city_data.data = data.detached()
+        try:
+            futures = [self._pool.submit(_tick_shard, shard, tick_groups, week) for shard in shards]
+            results = [future.result() for future in futures]
+        finally:
+            for city, data in histories:
+                city.city_data.data = data
+
+        for shard, ticked in zip(shards, results):
+            for dst, result in zip(shard, ticked):
+                merge_province(dst, result)
+
+    def _start_resident(self) -> None:
+        # Imported here so serial runs never load multiprocessing.
+        import multiprocessing
+
+        shards = self.shards(self.provinces)
+        # Raises before any worker starts if two shards would write the same rows.
+        self.shared.partition(shards)
+        context = multiprocessing.get_context()
+        self._resident = [ResidentShard(context, shard, self.streams) for shard in shards]
+
+    def _tick_resident(self, provinces, tick_groups: bool, week: int | None) -> None:
+        '''Tick provinces on the workers holding them; only per-city values cross the pipes.'''
+        if not self._resident:
+            self._start_resident()
+        wanted = {id(province) for province in provinces}
+        tick = self.streams.tick if self.streams is not None else None
+        payload = 0
+        running = []
+        for shard in self._resident:
+            ticked = [province for province in shard.provinces if id(province) in wanted]
+            if not ticked:
+                continue
+            cities = [city for province in ticked for city in province.cities]
+            inputs = [CityInputs(city.state.stepping, city.aggregates.cached, city.state.inv) for city in cities]
+            payload += shard.send(("tick", tick, week, tick_groups,
+                                   [shard.positions[id(province)] for province in ticked], inputs))
+            running.append((shard, cities))
+        error = None
+        for shard, cities in running:
+            # Read every reply, so no pipe is left holding one when a shard failed.
+            try:
+                outputs, size = shard.receive()
+            except Exception as exc:
+                error = error or exc
+                continue
+            payload += size
+            for city, city_outputs_ in zip(cities, outputs):
+                apply_city_outputs(city, city_outputs_)
+        self.payload_bytes = payload
+        if error is not None:
+            raise error
+
+    def sync(self) -> None:
+        '''Fetch the objects resident workers keep (migration logs, labour results).'''
+        for shard in self._resident:
+            shard.send(("sync",))
+        for shard in self._resident:
+            kept, _ = shard.receive()
+            for province, (migrations, cities) in zip(shard.provinces, kept):
+                province.state.migrations = migrations
+                for city, (city_migrations, labour_result) in zip(province.cities, cities):
+                    city.state.migrations = city_migrations
+                    city.state.labour_result = labour_result
+
+    def close(self) -> None:
+        for shard in self._resident:
+            shard.close()
+        self._resident = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
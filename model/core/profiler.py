@@ -0,0 +1,155 @@
+'''
+Per-phase tick profiler.
+
+Entities time their phases with `with self.profiler.phase(level, name):`
+and count events with `self.profiler.count(level, name, n)`. Every entity
+starts with NULL_PROFILER, whose methods do nothing, so instrumentation
+costs a method call when profiling is off. Core.attach_profiler points
+the whole world at a real Profiler.
+
+Timings and counts are summed per (level, name) within a tick; end_tick
+closes the tick into a record. Records export as JSON or CSV.
+'''
+
+import csv
+import json
+import time
+from collections import defaultdict
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullProfiler:
+    '''Profiler that records nothing.'''
+
+    enabled = False
+
+    def phase(self, level: str, name: str) -> _NullPhase:
+        return _NULL_PHASE
+
+    def count(self, level: str, name: str, amount: int = 1) -> None:
+        pass
+
+    def end_tick(self, tick: int) -> None:
+        pass
+
+    def __reduce__(self):
+        return (_null_profiler, ())
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def _null_profiler() -> NullProfiler:
+    return NULL_PROFILER
+
+
+class _Phase:
+    __slots__ = ("profiler", "key", "start")
+
+    def __init__(self, profiler: "Profiler", key: tuple[str, str]) -> None:
+        self.profiler = profiler
+        self.key = key
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.seconds[self.key] += time.perf_counter() - self.start
+        self.profiler.calls[self.key] += 1
+        return False
+
+
+class Profiler:
+    '''Named timers and counters, aggregated per tick and per entity level.'''
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.seconds: defaultdict[tuple[str, str], float] = defaultdict(float)
+        self.calls: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.counters: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.ticks: list[dict] = []
+
+    def phase(self, level: str, name: str) -> _Phase:
+        '''Context manager adding its wall time to (level, name).'''
+        return _Phase(self, (level, name))
+
+    def count(self, level: str, name: str, amount: int = 1) -> None:
+        self.counters[(level, name)] += amount
+
+    def end_tick(self, tick: int) -> None:
+        '''Close the current tick into a record and start the next one empty.'''
+        self.ticks.append({
+            "tick": tick,
+            "timers": {f"{level}.{name}": {"seconds": seconds, "calls": self.calls[(level, name)]}
+                       for (level, name), seconds in self.seconds.items()},
+            "counters": {f"{level}.{name}": value for (level, name), value in self.counters.items()},
+        })
+        self.seconds.clear()
+        self.calls.clear()
+        self.counters.clear()
+
+    def __reduce__(self):
+        # Entities ticked in worker processes don't report back.
+        return (_null_profiler, ())
+
+    def totals(self) -> dict:
+        '''Sums over all closed ticks, keyed by "level.name".'''
+        timers: dict[str, dict] = {}
+        counters: dict[str, int] = defaultdict(int)
+        for record in self.ticks:
+            for key, timer in record["timers"].items():
+                total = timers.setdefault(key, {"seconds": 0.0, "calls": 0})
+                total["seconds"] += timer["seconds"]
+                total["calls"] += timer["calls"]
+            for key, value in record["counters"].items():
+                counters[key] += value
+        return {"ticks": len(self.ticks), "timers": timers, "counters": dict(counters)}
+
+    def by_level(self) -> dict[str, float]:
+        '''Total seconds per entity level over all closed ticks.'''
+        levels: dict[str, float] = defaultdict(float)
+        for key, timer in self.totals()["timers"].items():
+            levels[key.split(".", 1)[0]] += timer["seconds"]
+        return dict(levels)
+
+    def rows(self) -> list[dict]:
+        '''One flat row per tick, metric; the CSV layout.'''
+        rows = []
+        for record in self.ticks:
+            for key, timer in record["timers"].items():
+                level, name = key.split(".", 1)
+                rows.append({"tick": record["tick"], "level": level, "name": name, "kind": "timer",
+                             "value": timer["seconds"], "calls": timer["calls"]})
+            for key, value in record["counters"].items():
+                level, name = key.split(".", 1)
+                rows.append({"tick": record["tick"], "level": level, "name": name, "kind": "counter",
+                             "value": value, "calls": ""})
+        return rows
+
+    def export(self, path) -> None:
+        '''Write per-tick records to path; CSV for a .csv suffix, otherwise JSON.'''
+        if str(path).endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=["tick", "level", "name", "kind", "value", "calls"])
+                writer.writeheader()
+                writer.writerows(self.rows())
+        else:
+            with open(path, "w") as f:
+                json.dump({"totals": self.totals(), "by_level": self.by_level(), "ticks": self.ticks},
+                          f, indent=2)
+                f.write("\n")
@@ -1,5 +1,8 @@
 '''Helper functions related to randomness'''
 import math
+import zlib
+
+import numpy as np
 
 def _sample_normal(expected, rng) -> int:
     '''Samples a count based on normal distribution around expected count. 
@@ -10,3 +13,240 @@ def _sample_normal(expected, rng) -> int:
         return 0
     sample = rng.normal(loc=expected, scale=stddev)
     return max(0, int(sample))
+
+def _sample_normal_array(expected, rng) -> np.ndarray:
+    '''Array version of _sample_normal.
+    Draws are taken in C order and skipped where expected <= 0, so the RNG
+    stream matches calling _sample_normal on each element in turn.'''
+    expected = np.asarray(expected, dtype=np.float64)
+    out = np.zeros(expected.shape, dtype=np.int64)
+    mask = expected > 0
+    if mask.any():
+        loc = expected[mask]
+        sample = rng.normal(loc=loc, scale=np.sqrt(loc))
+        out[mask] = np.maximum(sample.astype(np.int64), 0)
+    return out
+
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX_A = 0xBF58476D1CE4E5B9
+_MIX_B = 0x94D049BB133111EB
+_TWO_PI = 2.0 * np.pi
+
+
+def _mix64(x: int) -> int:
+    '''SplitMix64 finaliser on a Python int.'''
+    x = ((x ^ (x >> 30)) * _MIX_A) & _MASK64
+    x = ((x ^ (x >> 27)) * _MIX_B) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _mix64_array(x: np.ndarray) -> np.ndarray:
+    '''SplitMix64 finaliser on a uint64 array (wraps like the int version).'''
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(_MIX_A)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(_MIX_B)
+    return x ^ (x >> np.uint64(31))
+
+
+def _stream_code(kind: str) -> int:
+    '''Stable (cross-process) code for a stream kind.'''
+    return zlib.crc32(kind.encode())
+
+
+class RandomStreams:
+    '''Keyed, counter-based random number service.
+
+    Every draw is a pure function of (seed, tick, stream kind, entity id,
+    draw number), so entities can be ticked in any order, in bulk or on
+    another process and still reproduce the same run. Uniform and normal
+    draws come from a SplitMix64 hash of the key and have matching scalar
+    and array forms; other distributions use a Philox generator keyed to
+    the entity and tick.
+    '''
+
+    def __init__(self, seed: int | None = None) -> None:
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy) & _MASK64
+        self.seed = int(seed) & _MASK64
+        self.tick = 0
+        self._next_ids: dict[str, int] = {}
+        # Variates produced so far, for profiling; not part of the state.
+        self.draws = 0
+
+    @property
+    def state(self) -> dict:
+        '''Everything needed to recreate the service, like BitGenerator.state.'''
+        return {"seed": self.seed, "tick": self.tick, "next_ids": dict(self._next_ids)}
+
+    @state.setter
+    def state(self, value: dict) -> None:
+        self.seed = int(value["seed"])
+        self.tick = int(value["tick"])
+        self._next_ids = dict(value["next_ids"])
+
+    def advance(self) -> int:
+        '''Move every stream on to the next tick.'''
+        self.tick += 1
+        return self.tick
+
+    def entity(self, kind: str, entity_id: int | None = None) -> "EntityStream":
+        '''Stream for one entity. Ids default to creation order per kind.'''
+        if entity_id is None:
+            entity_id = self._next_ids.get(kind, 0)
+        self._next_ids[kind] = max(self._next_ids.get(kind, 0), entity_id + 1)
+        return EntityStream(self, kind, entity_id)
+
+    def _base_key(self, kind: str) -> int:
+        key = _mix64(self.seed ^ _stream_code(kind))
+        return _mix64((key + self.tick * _GOLDEN) & _MASK64)
+
+    def uniforms(self, kind: str, entity_ids, draws) -> np.ndarray:
+        '''Uniform [0, 1) draws for arrays of entity ids and draw numbers.'''
+        base = np.uint64(self._base_key(kind))
+        golden = np.uint64(_GOLDEN)
+        ids = np.asarray(entity_ids, dtype=np.uint64)
+        draws = np.asarray(draws, dtype=np.uint64)
+        self.draws += np.broadcast(ids, draws).size
+        h = _mix64_array(base + ids * golden)
+        h = _mix64_array(h + (draws + np.uint64(1)) * golden)
+        return (h >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+    def uniform(self, kind: str, entity_id: int, draw: int) -> float:
+        '''Scalar form of uniforms.'''
+        self.draws += 1
+        h = _mix64((self._base_key(kind) + entity_id * _GOLDEN) & _MASK64)
+        h = _mix64((h + (draw + 1) * _GOLDEN) & _MASK64)
+        return (h >> 11) * (1.0 / (1 << 53))
+
+    def standard_normals(self, kind: str, entity_ids, draws) -> np.ndarray:
+        '''Box-Muller normals; draw n uses hash draws 2n and 2n + 1.'''
+        draws = np.asarray(draws, dtype=np.int64)
+        u1 = self.uniforms(kind, entity_ids, 2 * draws)
+        u2 = self.uniforms(kind, entity_ids, 2 * draws + 1)
+        return np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(_TWO_PI * u2)
+
+    def standard_normal(self, kind: str, entity_id: int, draw: int) -> float:
+        '''Scalar form of standard_normals (numpy ufuncs keep it bit-identical).'''
+        u1 = self.uniform(kind, entity_id, 2 * draw)
+        u2 = self.uniform(kind, entity_id, 2 * draw + 1)
+        return float(np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(_TWO_PI * u2))
+
+    def sample_normal(self, kind: str, entity_ids, expected) -> np.ndarray:
+        '''Bulk _sample_normal for rows of entities.
+
+        expected has one row per entity; row i gives the same counts as
+        calling _sample_normal on each column in turn with entity_ids[i]'s
+        stream at the start of the tick.
+        '''
+        expected = np.asarray(expected, dtype=np.float64)
+        mask = expected > 0
+        draws = np.cumsum(mask, axis=1) - mask
+        ids = np.broadcast_to(np.asarray(entity_ids)[:, None], expected.shape)
+        out = np.zeros(expected.shape, dtype=np.int64)
+        if mask.any():
+            loc = expected[mask]
+            z = self.standard_normals(kind, ids[mask], draws[mask])
+            out[mask] = np.maximum((loc + np.sqrt(loc) * z).astype(np.int64), 0)
+        return out
+
+    def generator(self, kind: str, entity_id: int) -> np.random.Generator:
+        '''Philox generator for this entity and tick.'''
+        key = (self.seed << 64) | _stream_code(kind)
+        counter = np.array([0, 0, entity_id, self.tick], dtype=np.uint64)
+        return np.random.Generator(np.random.Philox(key=key, counter=counter))
+
+
+class EntityStream:
+    '''Random stream for one entity, usable wherever a numpy Generator is.
+
+    Draw numbers restart every tick, so a draw depends only on the entity's
+    own history within the tick.
+    '''
+
+    __slots__ = ("streams", "kind", "entity_id", "_tick", "_draw", "_generator")
+
+    def __init__(self, streams: RandomStreams, kind: str, entity_id: int) -> None:
+        self.streams = streams
+        self.kind = kind
+        self.entity_id = entity_id
+        self._tick = -1
+        self._draw = 0
+        self._generator = None
+
+    def _sync(self) -> None:
+        if self._tick != self.streams.tick:
+            self._tick = self.streams.tick
+            self._draw = 0
+            self._generator = None
+
+    def _next_draw(self) -> int:
+        self._sync()
+        draw = self._draw
+        self._draw += 1
+        return draw
+
+    def _tick_generator(self) -> np.random.Generator:
+        self._sync()
+        if self._generator is None:
+            self._generator = self.streams.generator(self.kind, self.entity_id)
+        return self._generator
+
+    def normal(self, loc: float = 0.0, scale: float = 1.0) -> float:
+        z = self.streams.standard_normal(self.kind, self.entity_id, self._next_draw())
+        return loc + scale * z
+
+    def uniform(self, low=0.0, high=1.0):
+        if np.ndim(low) == 0 and np.ndim(high) == 0:
+            u = self.streams.uniform(self.kind, self.entity_id, self._next_draw())
+            return low + (high - low) * u
+        # Array bounds take consecutive draw numbers, like repeated scalar calls.
+        shape = np.broadcast(low, high).shape
+        self._sync()
+        draws = self._draw + np.arange(int(np.prod(shape)), dtype=np.int64)
+        self._draw += len(draws)
+        u = self.streams.uniforms(self.kind, [self.entity_id], draws).reshape(shape)
+        return low + (high - low) * u
+
+    def binomial(self, n, p):
+        self.streams.draws += 1
+        return self._tick_generator().binomial(n, p)
+
+    def multinomial(self, n, pvals):
+        self.streams.draws += 1
+        return self._tick_generator().multinomial(n, pvals)
+
+
+class CountingGenerator(np.random.Generator):
+    '''numpy Generator that counts its draws, for the shared stream.
+
+    draws counts the variates returned (one per multinomial sample), which
+    the profiler reports as core.rng_draws like RandomStreams.draws.
+    '''
+
+    def __init__(self, bit_generator: np.random.BitGenerator) -> None:
+        super().__init__(bit_generator)
+        self.draws = 0
+
+    def multinomial(self, n, pvals, size=None):
+        values = super().multinomial(n, pvals, size)
+        self.draws += values.size // max(values.shape[-1], 1)
+        return values
+
+
+def _counted(name: str):
+    method = getattr(np.random.Generator, name)
+
+    def counted(self, *args, **kwargs):
+        values = method(self, *args, **kwargs)
+        self.draws += np.size(values)
+        return values
+
+    counted.__name__ = counted.__qualname__ = name
+    counted.__doc__ = method.__doc__
+    return counted
+
+
+for _name in ("random", "integers", "choice", "uniform", "normal", "standard_normal",
+              "lognormal", "binomial", "poisson", "exponential"):
+    setattr(CountingGenerator, _name, _counted(_name))
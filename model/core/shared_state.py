@@ -0,0 +1,328 @@
+'''Shared-memory layout of a world's numeric group, firm and city state.
+
+Each entity kind gets one multiprocessing.shared_memory block holding its
+numeric fields as NumPy columns, one row per entity in world order. Groups
+are bound to a PopulationStore built on their block; firms and cities get
+row views whose numeric fields read and write their row while lists, dicts
+and other objects stay on the view. Firm inventories get a block with one
+column per good, and every city's history records into blocks with one
+column per group, firm or city and one row per history slot.
+
+A row view pickles as (block name, row) instead of its values. A province
+shipped to a worker therefore comes up there writing straight into the
+coordinator's columns, and when it is shipped back the coordinator's
+objects already see every number it changed.
+
+Ownership follows the province shards of ParallelProvinceRunner: world
+order keeps a province's cities, groups and firms together, so each shard
+owns one contiguous, disjoint row range per kind and no two workers ever
+write the same row. SharedWorldState.partition checks this.
+'''
+
+from collections.abc import MutableMapping
+from dataclasses import fields
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+from model.city.city import CITY_STATE_DTYPES, CityState
+from model.city.city_history import CITY_METRICS, FIRM_METRICS, GROUP_METRICS
+from model.economy.industry.firm_properties import FIRM_STATE_DTYPES, FirmState
+from model.population.group_store import PARAM_DTYPES, STATE_DTYPES, PopulationStore, _column_property
+
+# Blocks created or attached by this process, by shared memory name.
+_BLOCKS: dict[str, "SharedColumns"] = {}
+
+
+class ColumnSpec(NamedTuple):
+    '''Everything another process needs to attach to a SharedColumns block.'''
+    name: str
+    count: int
+    dtypes: tuple[tuple[str, str], ...]
+    # Rows per entity for 2-d (depth, count) columns; 0 for one value per entity.
+    depth: int = 0
+
+
+class SharedColumns:
+    '''Named columns laid out back to back in one shared memory block.'''
+
+    def __init__(self, shm: shared_memory.SharedMemory | None, spec: ColumnSpec) -> None:
+        self.shm = shm
+        self.spec = spec
+        self.columns: dict[str, np.ndarray] = {}
+        shape = (spec.depth, spec.count) if spec.depth else (spec.count,)
+        offset = 0
+        for name, dtype in spec.dtypes:
+            dtype = np.dtype(dtype)
+            offset += -offset % dtype.alignment
+            self.columns[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            offset += int(np.prod(shape)) * dtype.itemsize
+
+    @staticmethod
+    def nbytes(dtypes, count: int, depth: int = 0) -> int:
+        offset = 0
+        for dtype in dtypes.values():
+            dtype = np.dtype(dtype)
+            offset += -offset % dtype.alignment + max(depth, 1) * count * dtype.itemsize
+        return offset
+
+    @classmethod
+    def create(cls, dtypes: dict, count: int, depth: int = 0) -> "SharedColumns":
+        '''Allocate a zeroed block for count rows of dtypes, depth values deep if given.'''
+        shm = shared_memory.SharedMemory(create=True, size=max(cls.nbytes(dtypes, count, depth), 1))
+        spec = ColumnSpec(shm.name, count, tuple((name, np.dtype(dtype).str) for name, dtype in dtypes.items()),
+                          depth)
+        block = cls(shm, spec)
+        for column in block.columns.values():
+            column[:] = 0
+        _BLOCKS[shm.name] = block
+        return block
+
+    @classmethod
+    def attach(cls, spec: ColumnSpec) -> "SharedColumns":
+        '''This process's handle on the block spec describes, attaching on first use.'''
+        block = _BLOCKS.get(spec.name)
+        if block is None:
+            block = _BLOCKS[spec.name] = cls(shared_memory.SharedMemory(name=spec.name), spec)
+        return block
+
+    @property
+    def shared(self) -> "SharedColumns":
+        # Row views ask their store for its block; a block is its own.
+        return self
+
+    def reduce_row(self, cls, row: int, local: tuple = ()):
+        '''Pickle a row view as a reference to this block.'''
+        return (_attach_row, (cls, self.spec, row, local))
+
+    def release(self, unlink: bool = False) -> None:
+        '''Copy the columns into private memory and close (or unlink) the block.
+
+        Row views keep working on the copies, so entities stay usable after
+        the block is gone.
+        '''
+        if self.shm is None:
+            return
+        self.columns.update({name: column.copy() for name, column in self.columns.items()})
+        _BLOCKS.pop(self.spec.name, None)
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+        self.shm = None
+
+
+def _attach_row(cls, spec: ColumnSpec, row: int, local: tuple):
+    state = cls.__new__(cls)
+    state.store = SharedColumns.attach(spec)
+    state.row = row
+    for name, value in zip(getattr(cls, "local", ()), local):
+        setattr(state, name, value)
+    return state
+
+
+class SharedRowState:
+    '''Base of the row views over firm and city blocks.'''
+
+    __slots__ = ("store", "row")
+    local: tuple = ()
+
+    @classmethod
+    def bind(cls, store: SharedColumns, row: int, state) -> "SharedRowState":
+        '''Row view at row holding everything state held.'''
+        view = _attach_row(cls, store.spec, row, tuple(getattr(state, name) for name in cls.local))
+        for name in store.columns:
+            setattr(view, name, getattr(state, name))
+        return view
+
+    def __reduce__(self):
+        return self.store.reduce_row(type(self), self.row, tuple(getattr(self, name) for name in self.local))
+
+
+def _row_state_type(name: str, state_cls, dtypes: dict) -> type:
+    '''state_cls-compatible row view with the dtypes fields in shared columns.'''
+    local = tuple(f.name for f in fields(state_cls) if f.name not in dtypes)
+    namespace = {"__slots__": local, "__module__": __name__, "__qualname__": name, "local": local}
+    namespace.update({field: _column_property(field) for field in dtypes})
+    return type(name, (SharedRowState,), namespace)
+
+
+FirmRowState = _row_state_type("FirmRowState", FirmState, FIRM_STATE_DTYPES)
+CityRowState = _row_state_type("CityRowState", CityState, CITY_STATE_DTYPES)
+
+
+class SharedInventory(MutableMapping):
+    '''A firm's inventory as a view onto its row of the inventory block.
+
+    The goods are fixed when the view is bound; amounts are stored as floats.
+    '''
+
+    __slots__ = ("store", "row", "goods")
+
+    def __init__(self, store: SharedColumns, row: int, goods: tuple[str, ...]) -> None:
+        self.store = store
+        self.row = row
+        self.goods = goods
+
+    def __getitem__(self, good: str) -> float:
+        if good not in self.goods:
+            raise KeyError(good)
+        return self.store.columns[good].item(self.row)
+
+    def __setitem__(self, good: str, amount: float) -> None:
+        if good not in self.goods:
+            raise KeyError(f"{good!r} has no inventory column for this firm")
+        self.store.columns[good][self.row] = amount
+
+    def __delitem__(self, good: str) -> None:
+        raise TypeError("goods cannot be removed from a shared inventory")
+
+    def __iter__(self):
+        return iter(self.goods)
+
+    def __len__(self) -> int:
+        return len(self.goods)
+
+    def __repr__(self) -> str:
+        return f"SharedInventory({dict(self)!r})"
+
+    def __reduce__(self):
+        return (_attach_inventory, (self.store.spec, self.row, self.goods))
+
+
+def _attach_inventory(spec: ColumnSpec, row: int, goods: tuple[str, ...]) -> SharedInventory:
+    return SharedInventory(SharedColumns.attach(spec), row, goods)
+
+
+class SharedHistory(NamedTuple):
+    '''Where one city's CityHistory arrays live in the history blocks.
+
+    Set as CityHistory.shared; a pickled history carries this instead of
+    its arrays and attaches to the blocks when unpickled.
+    '''
+    groups: ColumnSpec
+    firms: ColumnSpec
+    cities: ColumnSpec
+    group_rows: slice
+    firm_rows: slice
+    city_row: int
+
+    def attach(self, history) -> None:
+        '''Point history's arrays at its columns of the blocks.'''
+        groups, firms, cities = (SharedColumns.attach(spec) for spec in (self.groups, self.firms, self.cities))
+        retention = history.retention
+        history.groups = {name: groups.columns[name][:retention, self.group_rows] for name in GROUP_METRICS}
+        history.firms = {name: firms.columns[name][:retention, self.firm_rows] for name in FIRM_METRICS}
+        history.city = {name: cities.columns[name][:retention, self.city_row] for name in CITY_METRICS}
+        history.slot_ticks = cities.columns["slot_ticks"][:retention, self.city_row]
+        history.shared = self
+
+    @staticmethod
+    def detach(history) -> None:
+        '''Give history private copies of its arrays.'''
+        history.groups = {name: values.copy() for name, values in history.groups.items()}
+        history.firms = {name: values.copy() for name, values in history.firms.items()}
+        history.city = {name: values.copy() for name, values in history.city.items()}
+        history.slot_ticks = history.slot_ticks.copy()
+        history.shared = None
+
+
+class ShardRows(NamedTuple):
+    '''Rows of each kind one shard owns.'''
+    groups: slice
+    firms: slice
+    cities: slice
+
+
+def _owned(rows: list[int], kind: str) -> slice:
+    if not rows:
+        return slice(0, 0)
+    if rows != list(range(rows[0], rows[0] + len(rows))):
+        raise ValueError(f"Shard {kind} rows are not one contiguous range")
+    return slice(rows[0], rows[-1] + 1)
+
+
+class SharedWorldState:
+    '''Shared memory blocks for every group, firm and city of a world.'''
+
+    def __init__(self, cities, rng) -> None:
+        cities = list(cities)
+        groups = [group for city in cities for group in city.populations]
+        firms = [firm for city in cities for firm in city.firms]
+
+        self.groups = SharedColumns.create({**STATE_DTYPES, **PARAM_DTYPES}, len(groups))
+        self.firms = SharedColumns.create(FIRM_STATE_DTYPES, len(firms))
+        self.cities = SharedColumns.create(CITY_STATE_DTYPES, len(cities))
+
+        goods = dict.fromkeys(good for firm in firms for good in firm.state.inv)
+        self.firm_inventory = SharedColumns.create(dict.fromkeys(goods, np.float64), len(firms))
+
+        histories = [city.city_data.data for city in cities]
+        retention = max((history.retention for history in histories), default=1)
+        self.group_history = SharedColumns.create(GROUP_METRICS, len(groups), retention)
+        self.firm_history = SharedColumns.create(FIRM_METRICS, len(firms), retention)
+        self.city_history = SharedColumns.create({**CITY_METRICS, "slot_ticks": np.int64}, len(cities), retention)
+
+        self.store = PopulationStore(len(groups), rng=rng, columns=self.groups.columns)
+        self.store.shared = self.groups
+        self.store.bind(groups)
+        for row, firm in enumerate(firms):
+            inv = firm.state.inv
+            firm.state = FirmRowState.bind(self.firms, row, firm.state)
+            firm.state.inv = SharedInventory(self.firm_inventory, row, tuple(inv))
+            firm.state.inv.update(inv)
+
+        self.histories = []
+        group_row = firm_row = 0
+        for row, (city, history) in enumerate(zip(cities, histories)):
+            city.state = CityRowState.bind(self.cities, row, city.state)
+            rows = SharedHistory(self.group_history.spec, self.firm_history.spec, self.city_history.spec,
+                                 slice(group_row, group_row + history.group_count),
+                                 slice(firm_row, firm_row + len(history.firm_labels)), row)
+            # The blocks hold the full retention; grow the private arrays to match.
+            history.reserve(history.retention)
+            old = {"groups": history.groups, "firms": history.firms, "city": history.city}
+            slot_ticks = history.slot_ticks
+            rows.attach(history)
+            for kind, arrays in old.items():
+                for name, values in arrays.items():
+                    getattr(history, kind)[name][:] = values
+            history.slot_ticks[:] = slot_ticks
+            self.histories.append(history)
+            group_row += history.group_count
+            firm_row += len(history.firm_labels)
+
+    @property
+    def blocks(self) -> tuple[SharedColumns, ...]:
+        return (self.groups, self.firms, self.cities, self.firm_inventory,
+                self.group_history, self.firm_history, self.city_history)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(block.shm.size for block in self.blocks if block.shm is not None)
+
+    def partition(self, shards) -> list[ShardRows]:
+        '''Rows each shard of provinces owns; raises if shards would share or interleave rows.'''
+        owned = []
+        for shard in shards:
+            cities = [city for province in shard for city in province.cities]
+            owned.append(ShardRows(
+                groups=_owned([group.state.row for city in cities for group in city.populations], "group"),
+                firms=_owned([firm.state.row for city in cities for firm in city.firms], "firm"),
+                cities=_owned([city.state.row for city in cities], "city"),
+            ))
+        for kind in ShardRows._fields:
+            ranges = sorted((getattr(rows, kind).start, getattr(rows, kind).stop) for rows in owned)
+            if any(stop > start for (_, stop), (start, _) in zip(ranges, ranges[1:])):
+                raise ValueError(f"Shards overlap in {kind} rows")
+        return owned
+
+    def close(self) -> None:
+        '''Move the state back into private memory and free the blocks.'''
+        # History arrays are views of the blocks, not their columns; copy them first.
+        for history in self.histories:
+            if history.shared is not None:
+                SharedHistory.detach(history)
+        self.histories = []
+        for block in self.blocks:
+            block.release(unlink=True)
@@ -0,0 +1,158 @@
+'''Seeded synthetic worlds in the input_data.json shape.
+
+Used to benchmark and test the simulation at sizes the hand-written input
+file can't reach. write_synthetic_world streams the file one city at a
+time, so million-group worlds never have to exist as one dict.
+'''
+
+import json
+import math
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+
+# Non-food goods a synthetic city may produce; components need both ores.
+RAW_GOODS = ("copper", "iron", "silver")
+COMPONENT_INPUTS = ["copper", "iron"]
+
+
+@dataclass(frozen=True)
+class SyntheticWorldSpec:
+    '''Shape of a synthetic world. Counts are per parent entity.'''
+
+    countries: int = 1
+    provinces: int = 2
+    cities: int = 2
+    groups: int = 4
+    firms: int = 3
+    seed: int = 0
+
+    @property
+    def total_groups(self) -> int:
+        return self.countries * self.provinces * self.cities * self.groups
+
+    @property
+    def total_cities(self) -> int:
+        return self.countries * self.provinces * self.cities
+
+    @classmethod
+    def for_group_count(cls, groups_total: int, groups: int = 10, firms: int = 4,
+                        cities: int = 50, provinces: int = 20, seed: int = 0) -> "SyntheticWorldSpec":
+        '''Smallest world of this shape with at least groups_total groups.
+
+        Cities per province and provinces per country shrink for small
+        worlds; countries are added once a country is full.
+        '''
+        city_count = max(math.ceil(groups_total / groups), 1)
+        cities = min(cities, city_count)
+        province_count = math.ceil(city_count / cities)
+        provinces = min(provinces, province_count)
+        countries = math.ceil(province_count / provinces)
+        return cls(countries=countries, provinces=provinces, cities=cities,
+                   groups=groups, firms=firms, seed=seed)
+
+
+def _group(rng) -> dict:
+    size = max(int(rng.lognormal(math.log(40000), 0.8)), 1000)
+    return {
+        "size": size,
+        "base_healthcare": round(float(rng.uniform(0.4, 0.95)), 2),
+        "healthcare_capacity": max(int(size * rng.uniform(0.02, 0.1)), 1),
+    }
+
+
+def _firms(rng, count: int, population: int) -> list[dict]:
+    # Every city gets a food firm sized to feed it, as in input_data.json.
+    food_capacity = int(population * 3 * rng.uniform(0.9, 1.4))
+    firms = [{
+        "productivity": round(float(rng.uniform(12, 18)), 2),
+        "production_capacity": food_capacity,
+        "capital": int(food_capacity * rng.uniform(0.9, 1.2)),
+        "ownership": "state",
+        "wage": 25,
+        "good": "food",
+    }]
+    for i in range(1, count):
+        capacity = int(population * rng.uniform(4, 8))
+        firm = {
+            "productivity": round(float(rng.uniform(0.1, 0.2)), 3),
+            "production_capacity": capacity,
+            "capital": int(capacity * rng.uniform(0.9, 1.3)),
+            "ownership": "state",
+            "wage": 30,
+            "good": RAW_GOODS[(i - 1) % len(RAW_GOODS)],
+        }
+        if i % (len(RAW_GOODS) + 1) == 0:
+            firm["good"] = "components"
+            firm["input_mats"] = list(COMPONENT_INPUTS)
+        firms.append(firm)
+    return firms
+
+
+def _city(rng, spec: SyntheticWorldSpec, name: str) -> dict:
+    groups = [_group(rng) for _ in range(spec.groups)]
+    population = sum(group["size"] for group in groups)
+    return {"name": name, "groups": groups, "firms": _firms(rng, spec.firms, population)}
+
+
+def iter_synthetic_world(spec: SyntheticWorldSpec) -> Iterator[tuple[str, dict]]:
+    '''Yield ("country" | "province" | "city", data) in file order.
+
+    Country and province data exclude their children, which follow.
+    '''
+    rng = np.random.default_rng(spec.seed)
+    for c in range(spec.countries):
+        yield "country", {"name": f"Country {c}"}
+        for p in range(spec.provinces):
+            yield "province", {"name": f"Province {c}.{p}",
+                               "area": int(rng.uniform(500, 5000))}
+            for i in range(spec.cities):
+                yield "city", _city(rng, spec, f"City {c}.{p}.{i}")
+
+
+def synthetic_world(spec: SyntheticWorldSpec) -> dict:
+    '''The whole world as one dict; for small specs.'''
+    world: dict = {"countries": []}
+    for kind, data in iter_synthetic_world(spec):
+        if kind == "country":
+            world["countries"].append({**data, "provinces": []})
+        elif kind == "province":
+            world["countries"][-1]["provinces"].append({**data, "cities": []})
+        else:
+            world["countries"][-1]["provinces"][-1]["cities"].append(data)
+    return world
+
+
+def write_synthetic_world(path, spec: SyntheticWorldSpec) -> None:
+    '''Write a world to path as JSON, one city at a time.'''
+    with open(path, "w") as f:
+        f.write('{"countries": [')
+        country_open = province_open = False
+        first_country = first_province = first_city = True
+        for kind, data in iter_synthetic_world(spec):
+            if kind == "country":
+                if province_open:
+                    f.write("]}")
+                if country_open:
+                    f.write("]}")
+                f.write("" if first_country else ", ")
+                f.write(json.dumps(data)[:-1] + ', "provinces": [')
+                country_open, province_open = True, False
+                first_country, first_province = False, True
+            elif kind == "province":
+                if province_open:
+                    f.write("]}")
+                f.write("" if first_province else ", ")
+                f.write(json.dumps(data)[:-1] + ', "cities": [')
+                province_open = True
+                first_province, first_city = False, True
+            else:
+                f.write(("" if first_city else ", ") + json.dumps(data))
+                first_city = False
+        if province_open:
+            f.write("]}")
+        if country_open:
+            f.write("]}")
+        f.write("]}")
@@ -1,39 +1,171 @@
-import json
+import os
 from model.city import City
+from model.city.stepping import plan_step
 from model.province import Province
 import numpy as np
+from model.core.invariants import InvariantChecker
+from model.core.parallel import ParallelProvinceRunner
+from model.core.profiler import NULL_PROFILER, Profiler
+from model.core.random import CountingGenerator, RandomStreams
+from model.core.world_loader import (WorldCompiler, compiled_world_path,
+                                     read_compiled_world, stream_world)
 from model.economy import Firm
-from model.population import PopulationGroup
+from model.population import PopulationGroup, PopulationStore
 from model.country import Country
 
 
 class Core:
-    def __init__(self, seed_cfg, city_cfg, province_cfg, country_cfg):
+    def __init__(self, seed_cfg, city_cfg, province_cfg, country_cfg, core_cfg=None):
 
+        # Same stream as np.random.default_rng, with its draws counted.
         if seed_cfg['use']:
-            self.rng = np.random.default_rng(seed_cfg['seed'])
+            self.rng = CountingGenerator(np.random.PCG64(seed_cfg['seed']))
         else:
-            self.rng = np.random.default_rng()
+            self.rng = CountingGenerator(np.random.PCG64())
 
+        # "keyed" gives every entity its own counter-based stream, so results
+        # don't depend on evaluation order. "shared" draws everything from rng.
+        streams = seed_cfg.get("streams", "shared")
+        if streams == "keyed":
+            self.streams = RandomStreams(seed_cfg['seed'] if seed_cfg['use'] else None)
+        elif streams == "shared":
+            self.streams = None
+        else:
+            raise ValueError(f"Unknown random streams mode: {streams!r}")
+
+        self.seed_cfg = seed_cfg
         self.city_cfg = city_cfg
         self.province_cfg = province_cfg
         self.country_cfg = country_cfg
+        self.core_cfg = core_cfg or {}
 
         self.countries = []
+        self.population_store = None
+        self.shared_state = None
+        self.week = 0
+
+        workers = self.core_cfg.get("parallel", {}).get("workers", 1)
+        if workers > 1 and self.streams is None:
+            raise ValueError("Parallel ticking needs keyed random streams to stay deterministic")
+        self.province_runner = ParallelProvinceRunner(workers) if workers > 1 else None
+
+        profiler_cfg = self.core_cfg.get("profiler", {})
+        self.profiler = Profiler() if profiler_cfg.get("enabled", False) else NULL_PROFILER
+
+        # Built on first use, once the world exists.
+        self.invariants: InvariantChecker | None = None
 
     def tick(self):
+        self.week += 1
+        if self.streams is not None:
+            self.streams.advance()
+        draws_before = self.rng_draws()
+        weeks = self.plan_steps()
+        if self.population_store is not None:
+            # All groups in the world are ticked in one vectorized pass.
+            with self.profiler.phase("core", "population_store"):
+                self.population_store.tick(weeks=weeks)
+        for country in self.countries:
+            country.tick(tick_groups=self.population_store is None,
+                         runner=self.province_runner, week=self.week)
+        self.profiler.count("core", "rng_draws", self.rng_draws() - draws_before)
+        invariant_cfg = self.core_cfg.get("invariants", {})
+        if invariant_cfg.get("enabled", False):
+            with self.profiler.phase("core", "invariants"):
+                if self.invariants is None:
+                    self.invariants = InvariantChecker.from_cfg(self, invariant_cfg)
+                self.invariants.after_tick(self.week)
+        self.profiler.end_tick(self.week)
+
+    def rng_draws(self):
+        '''Draws taken so far from the shared generator and the keyed streams.'''
+        return self.rng.draws + (self.streams.draws if self.streams is not None else 0)
+
+    def plan_steps(self):
+        '''Plan every city's step under adaptive stepping (city.stepping).
+
+        Returns the weeks each population store row advances, or None when
+        stepping is off and every city ticks one week.
+        '''
+        if not (self.city_cfg or {}).get("stepping", {}).get("enabled", False):
+            return None
+        with self.profiler.phase("core", "plan_steps"):
+            cities = list(self.iter_cities())
+            weeks = np.array([plan_step(city) for city in cities], dtype=np.int64)
+        self.profiler.count("core", "held_cities", int((weeks == 0).sum()))
+        if self.population_store is None:
+            return None
+        return np.repeat(weeks, [city.group_count for city in cities])
+
+    def sync(self):
+        '''Bring objects parallel workers keep between ticks back to this process.
+
+        With shared memory, workers keep migration logs and labour results;
+        call this before reading them. Numbers in shared memory are always current.
+        '''
+        if self.province_runner is not None:
+            self.province_runner.sync()
+
+    def close(self):
+        '''Release worker processes and shared memory used for parallel ticking.
+
+        Objects kept by workers are synced first, so the world stays complete.
+        '''
+        try:
+            if self.province_runner is not None:
+                try:
+                    self.province_runner.sync()
+                finally:
+                    self.province_runner.close()
+        finally:
+            if self.shared_state is not None:
+                self.shared_state.close()
+                self.shared_state = None
+
+    def iter_cities(self):
+        for country in self.countries:
+            for province in country.provinces:
+                yield from province.cities
+
+    def attach_profiler(self, profiler):
+        '''Point every country, province and city at profiler.'''
+        self.profiler = profiler
         for country in self.countries:
-            country.tick()
+            country.profiler = profiler
+            for province in country.provinces:
+                province.profiler = profiler
+                for city in province.cities:
+                    city.profiler = profiler
+
+    def entity_rng(self, kind: str, entity_id: int | None = None):
+        '''Random source for a new entity: its own stream when keyed, else the shared rng.'''
+        if self.streams is None:
+            return self.rng
+        return self.streams.entity(kind, entity_id)
+
+    def save_checkpoint(self, path) -> None:
+        '''Write the full simulation state to a binary checkpoint file.'''
+        from model.core.checkpoint import save_checkpoint
+
+        self.sync()
+        save_checkpoint(self, path)
+
+    @classmethod
+    def from_checkpoint(cls, path, mmap: bool = True) -> "Core":
+        '''Rebuild a Core from a checkpoint; ticking it continues the saved run exactly.'''
+        from model.core.checkpoint import load_checkpoint
+
+        return load_checkpoint(path, mmap=mmap)
 
     def _build_population_groups(self, groups):
         return [
             PopulationGroup.from_dict(group_data=group,
-                rng=self.rng,)
+                rng=self.entity_rng("group"),)
             for group in groups
         ]
 
     def _build_firms(self, firms):
-        return [Firm.from_dict(firm_data, rng=self.rng) for firm_data in firms]
+        return [Firm.from_dict(firm_data, rng=self.entity_rng("firm")) for firm_data in firms]
 
     def _build_city(self, city_data):
 
@@ -44,30 +176,147 @@ class Core:
         return City.from_dict(city_data,
                               populations,
                               firms,
-                              rng=self.rng,
+                              rng=self.entity_rng("city"),
                               cfg=self.city_cfg)
 
     def _build_province(self, province_data):
         cities = [self._build_city(city_data) for city_data in province_data["cities"]]
-        return Province.from_dict(province_data, cities, cfg=self.province_cfg, rng=self.rng)
+        return Province.from_dict(province_data, cities, cfg=self.province_cfg,
+                                  rng=self.entity_rng("province"))
 
     def build_provinces(self, data):
         return [self._build_province(province_data) for province_data in data["provinces"]]
 
-    def build_sim(self):
-        with open("input_data.json") as f:
-            data = json.load(f)
+    def build_sim(self, path="input_data.json"):
+        '''Build the world from an input file.
+
+        With core.world.cache enabled, the file is compiled to a binary cache
+        keyed by its hash on first use, and later builds load that instead.
+        '''
+        world_cfg = self.core_cfg.get("world", {})
+        cache_path = None
+        if world_cfg.get("cache", False):
+            cache_path = compiled_world_path(path, world_cfg.get("cache_dir", ".worldsim_cache"))
+
+        if cache_path is not None and os.path.exists(cache_path):
+            self._build_from_compiled(cache_path)
+        else:
+            compiler = WorldCompiler() if cache_path is not None else None
+            self._build_from_stream(path, compiler)
+            if compiler is not None:
+                compiler.write(cache_path)
+
+        self.bind_population_store()
+        self.attach_profiler(self.profiler)
+
+    def build_compiled(self, cache_path):
+        '''Build the world from an already compiled world file.'''
+        self._build_from_compiled(cache_path)
+        self.bind_population_store()
+        self.attach_profiler(self.profiler)
+
+    def _build_from_stream(self, path, compiler=None):
+        '''Build entities while streaming the input file one city at a time.'''
+        cities = []
+        provinces = []
+        for kind, data in stream_world(path):
+            if compiler is not None:
+                compiler.add(kind, data)
+            if kind == "city":
+                cities.append(self._build_city(data))
+            elif kind == "province":
+                provinces.append(Province.from_dict(data, cities, cfg=self.province_cfg,
+                                                    rng=self.entity_rng("province")))
+                cities = []
+            elif kind == "country":
+                self.countries.append(Country.from_dict(data,
+                                                        provinces,
+                                                        cfg=self.country_cfg,
+                                                        rng=self.entity_rng("country")))
+                provinces = []
+
+    def _build_from_compiled(self, cache_path):
+        '''Build entities in bulk from a compiled world file.'''
+        meta, arrays = read_compiled_world(cache_path)
+
+        groups = PopulationGroup.from_arrays(
+            size=arrays["group.size"],
+            base_healthcare=arrays["group.base_healthcare"],
+            healthcare_capacity=arrays["group.healthcare_capacity"],
+            education_level=meta["group_education_level"],
+            rngs=[self.entity_rng("group") for _ in range(len(arrays["group.size"]))],
+        )
+        firm_text = meta["firm_text"]
+        firms = Firm.from_arrays(
+            productivity=arrays["firm.productivity"],
+            production_capacity=arrays["firm.production_capacity"],
+            ownership=[text[0] for text in firm_text],
+            good=[text[1] for text in firm_text],
+            input_mats=[text[2] for text in firm_text],
+            capital=arrays["firm.capital"],
+            wage=arrays["firm.wage"],
+            education_wanted=arrays["firm.education_wanted"],
+            required_skill=meta.get("firm_required_skill"),
+            rngs=[self.entity_rng("firm") for _ in range(len(firm_text))],
+        )
+
+        cities = []
+        group_pos = firm_pos = 0
+        for city_meta in meta["cities"]:
+            city_groups = groups[group_pos:group_pos + city_meta["groups"]]
+            city_firms = firms[firm_pos:firm_pos + city_meta["firms"]]
+            group_pos += city_meta["groups"]
+            firm_pos += city_meta["firms"]
+            cities.append(City.from_dict({"name": city_meta["name"], **city_meta["extra"]},
+                                         city_groups,
+                                         city_firms,
+                                         rng=self.entity_rng("city"),
+                                         cfg=self.city_cfg))
+
+        provinces = []
+        city_start = 0
+        for province_meta in meta["provinces"]:
+            provinces.append(Province.from_dict(province_meta["fields"],
+                                                cities[city_start:province_meta["cities"]],
+                                                cfg=self.province_cfg,
+                                                rng=self.entity_rng("province")))
+            city_start = province_meta["cities"]
 
-        for country_data in data["countries"]:
-            provinces = self.build_provinces(data=country_data)
+        province_start = 0
+        for country_meta in meta["countries"]:
+            self.countries.append(Country.from_dict(country_meta["fields"],
+                                                    provinces[province_start:country_meta["provinces"]],
+                                                    cfg=self.country_cfg,
+                                                    rng=self.entity_rng("country")))
+            province_start = country_meta["provinces"]
 
-            cfg = self.country_cfg
+    def bind_population_store(self):
+        '''Move every group into a PopulationStore when the columnar engine is configured.
 
-            country_obj = Country.from_dict(country_data,
-                                            provinces,
-                                            cfg=cfg,
-                                            rng=self.rng)
+        With parallel workers and core.parallel.shared_memory, groups, firms
+        and cities are bound to shared memory instead and the columnar engine
+        ticks the shared group columns.
+        '''
+        engine = self.core_cfg.get("population", {}).get("engine", "object")
+        if engine not in ("columnar", "object"):
+            raise ValueError(f"Unknown population engine: {engine!r}")
+        if self.province_runner is not None and self.core_cfg["parallel"].get("shared_memory", False):
+            # Imported here so runs without it never load multiprocessing.
+            from model.core.shared_state import SharedWorldState
 
-            self.countries.append(country_obj)
+            self.shared_state = SharedWorldState(self.iter_cities(),
+                                                 rng=self.streams if self.streams is not None else self.rng)
+            self.province_runner.bind_shared(
+                self.shared_state,
+                [province for country in self.countries for province in country.provinces],
+                self.streams,
+            )
+            if engine == "columnar":
+                self.population_store = self.shared_state.store
+        elif engine == "columnar":
+            self.population_store = PopulationStore.from_groups(
+                (group for city in self.iter_cities() for group in city.populations),
+                rng=self.streams if self.streams is not None else self.rng,
+            )
 
 
@@ -0,0 +1,229 @@
+'''Streaming world input and the compiled world cache.
+
+stream_world walks an input file of the input_data.json shape and yields
+one city at a time, followed by its province and country once they close.
+Memory is bounded by the largest single city rather than the whole file.
+
+WorldCompiler collects the same stream into columns and writes them as an
+array file named after the source file's hash. Later startups read the
+columns back (memory-mapped) and build entities with the bulk from_arrays
+constructors instead of parsing JSON.
+'''
+
+import hashlib
+import json
+import os
+from typing import Iterator
+
+import numpy as np
+
+from model.core.array_columns import _column
+from model.core.array_file import read_array_file, write_array_file
+
+
+COMPILED_WORLD_VERSION = 1
+
+GROUP_COLUMNS = ("size", "base_healthcare", "healthcare_capacity")
+FIRM_COLUMNS = ("productivity", "production_capacity", "capital", "wage", "education_wanted")
+CITY_SECTIONS = ("name", "groups", "firms")
+
+
+class _Reader:
+    '''Incremental JSON reader over a text file.'''
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, f, chunk_size: int) -> None:
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> None:
+        # Read at least as much as is buffered so re-parsing a large value stays linear.
+        more = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not more:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + more
+        self.pos = 0
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self._WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in world file, found {found!r}")
+        self.pos += 1
+
+    def decode(self):
+        '''Decode one complete JSON value.'''
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            if end == len(self.buf) and not self.eof:
+                # A number could continue in the next chunk.
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        '''Yield the keys of an object; the caller consumes each value.'''
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def items(self) -> Iterator[None]:
+        '''Yield once per array element; the caller consumes each element.'''
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield None
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+def stream_world(path, chunk_size: int = 1 << 20) -> Iterator[tuple[str, dict]]:
+    '''
+    Yield ("city", city_data) for every city in file order, then
+    ("province", fields) when its province closes and ("country", fields)
+    when its country closes. Province and country fields exclude the
+    nested cities/provinces lists.
+    '''
+    with open(path, encoding="utf-8") as f:
+        reader = _Reader(f, chunk_size)
+        for key in reader.members():
+            if key != "countries":
+                reader.decode()
+                continue
+            for _ in reader.items():
+                country = {}
+                for country_key in reader.members():
+                    if country_key != "provinces":
+                        country[country_key] = reader.decode()
+                        continue
+                    for _ in reader.items():
+                        province = {}
+                        for province_key in reader.members():
+                            if province_key != "cities":
+                                province[province_key] = reader.decode()
+                                continue
+                            for _ in reader.items():
+                                yield "city", reader.decode()
+                        yield "province", province
+                yield "country", country
+
+
+def source_digest(path) -> str:
+    '''sha256 of the input file, used as the compiled cache key.'''
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compiled_world_path(path, cache_dir) -> str:
+    return os.path.join(cache_dir, f"{source_digest(path)}.world")
+
+
+class WorldCompiler:
+    '''Accumulates streamed world data into columns for the compiled cache.'''
+
+    def __init__(self) -> None:
+        self.groups = {name: [] for name in GROUP_COLUMNS}
+        self.group_education: list = []
+        self.firms = {name: [] for name in FIRM_COLUMNS}
+        self.firm_text: list = []
+        self.firm_skill: list = []
+        self.cities: list[dict] = []
+        self.provinces: list[dict] = []
+        self.countries: list[dict] = []
+
+    def add(self, kind: str, data: dict) -> None:
+        '''Feed one event from stream_world.'''
+        if kind == "city":
+            for group in data["groups"]:
+                for name in GROUP_COLUMNS:
+                    self.groups[name].append(group[name])
+                self.group_education.append(group.get("education_level"))
+            for firm in data["firms"]:
+                for name in FIRM_COLUMNS:
+                    self.firms[name].append(firm.get(name, 1.0 if name == "education_wanted" else None))
+                self.firm_text.append([firm["ownership"], firm["good"], firm.get("input_mats")])
+                self.firm_skill.append(firm.get("required_skill"))
+            extra = {key: value for key, value in data.items() if key not in CITY_SECTIONS}
+            self.cities.append({"name": data["name"], "groups": len(data["groups"]),
+                                "firms": len(data["firms"]), "extra": extra})
+        elif kind == "province":
+            self.provinces.append({"fields": data, "cities": len(self.cities)})
+        elif kind == "country":
+            self.countries.append({"fields": data, "provinces": len(self.provinces)})
+        else:
+            raise ValueError(f"Unknown world event: {kind!r}")
+
+    def write(self, path) -> None:
+        arrays = {f"group.{name}": _column(values) for name, values in self.groups.items()}
+        arrays.update({f"firm.{name}": _column(values) for name, values in self.firms.items()})
+        meta = {
+            "version": COMPILED_WORLD_VERSION,
+            "group_education_level": (self.group_education
+                                      if any(level is not None for level in self.group_education)
+                                      else None),
+            "firm_text": self.firm_text,
+            "firm_required_skill": (self.firm_skill
+                                    if any(skill is not None for skill in self.firm_skill)
+                                    else None),
+            "cities": self.cities,
+            "provinces": self.provinces,
+            "countries": self.countries,
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        write_array_file(path, meta, arrays)
+
+
+def compile_world(path, cache_dir) -> str:
+    '''Compile path into cache_dir unless it is already there; returns the compiled file.'''
+    cache_path = compiled_world_path(path, cache_dir)
+    if not os.path.exists(cache_path):
+        compiler = WorldCompiler()
+        for kind, data in stream_world(path):
+            compiler.add(kind, data)
+        compiler.write(cache_path)
+    return cache_path
+
+
+def read_compiled_world(path, mmap: bool = True) -> tuple[dict, dict[str, np.ndarray]]:
+    meta, arrays = read_array_file(path, mmap=mmap)
+    if meta.get("version") != COMPILED_WORLD_VERSION:
+        raise ValueError(f"Unsupported compiled world version: {meta.get('version')!r}")
+    return meta, arrays
@@ -4,12 +4,16 @@ from dataclasses import dataclass
 
 from .country_properties import (CountryProperties,
                                               CountryParams)
+from model.core.profiler import NULL_PROFILER
 from model.economy.trade import SupplyChain
+from model.protocols import distance_provider_from_cfg
 
 class Country(CountryProperties):
     '''
     Country object owns provinces.
     '''
+    profiler = NULL_PROFILER
+
     def __init__(self, params: CountryParams, cfg, rng):
         self.p = params
         self.cfg = cfg
@@ -26,7 +30,10 @@ class Country(CountryProperties):
             for province in self.provinces
             for city in province.cities
         ]
-        self.market = SupplyChain.build_from(rng=rng, firms=all_firms, cities=all_cities)
+        market_cfg = self.cfg.get("market")
+        self.market = SupplyChain.build_from(rng=rng, firms=all_firms, cities=all_cities,
+                                             distance_provider=distance_provider_from_cfg(market_cfg, all_cities),
+                                             cfg=market_cfg)
 
     @classmethod
     def from_dict(cls, country_data, provinces, rng, cfg) -> "Country":
@@ -38,6 +45,17 @@ class Country(CountryProperties):
             cfg=cfg,
             rng=rng)
 
-    def tick(self):
-        for province in self.p.provinces:
-            province.tick()
+    def tick(self, tick_groups: bool = True, runner=None, week: int | None = None):
+        '''Tick every province, serially or on a ParallelProvinceRunner,
+        then clear the country's input goods market.'''
+        with self.profiler.phase("country", "provinces"):
+            if runner is not None:
+                runner.tick(self.p.provinces, tick_groups=tick_groups, week=week)
+            else:
+                for province in self.p.provinces:
+                    province.tick(tick_groups=tick_groups, week=week)
+
+        if self.cfg.get("market", {}).get("enabled", False):
+            with self.profiler.phase("country", "market"):
+                trades = self.market.clear_chain()
+            self.profiler.count("country", "trades", len(trades))
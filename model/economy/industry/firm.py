@@ -1,6 +1,7 @@
 '''Firm object owned by cities.'''
 from dataclasses import dataclass, field
 from model.core.random import _sample_normal
+from model.core.array_columns import _as_list, _as_optional_list
 
 from model.economy.industry.firm_properties import (FirmParams,
                                                     FirmState,
@@ -9,6 +10,8 @@ from model.economy.industry.firm_properties import (FirmParams,
 from model.economy.industry.firm_types import GoodDemandItem, GoodDemandResult
 
 class Firm(FirmProperties):
+    __slots__ = ("p", "state", "rng")
+
     def __init__(self, params: FirmParams, rng):
         self.p = params
         self.state = FirmState()
@@ -35,11 +38,41 @@ class Firm(FirmProperties):
                 wage=firm_data.get("wage"),
                 input_mats=firm_data.get("input_mats"),
                 education_wanted=firm_data.get("education_wanted", 1.0),
+                required_skill=firm_data.get("required_skill"),
                 country_policy=country_policy,
             ),
             rng=rng,
         )
 
+    @classmethod
+    def from_arrays(cls, productivity, production_capacity, ownership, good, rngs,
+                    capital=None, wage=None, education_wanted=None, input_mats=None,
+                    required_skill=None, country_policy: None = None) -> list["Firm"]:
+        '''Build many firms at once from parallel columns.
+        NaN in the optional numeric columns means the field was not given.'''
+        count = len(productivity)
+        capital = _as_optional_list(capital, count)
+        wage = _as_optional_list(wage, count)
+        education_wanted = _as_list(education_wanted) if education_wanted is not None else [1.0] * count
+        input_mats = input_mats if input_mats is not None else [None] * count
+        required_skill = required_skill if required_skill is not None else [None] * count
+        return [
+            cls(params=FirmParams(productivity=prod,
+                                  production_capacity=cap,
+                                  ownership=own,
+                                  good=g,
+                                  capital=capital_,
+                                  wage=wage_,
+                                  input_mats=mats,
+                                  education_wanted=ed,
+                                  required_skill=skill,
+                                  country_policy=country_policy),
+                rng=rng)
+            for prod, cap, own, g, capital_, wage_, mats, ed, skill, rng in zip(
+                _as_list(productivity), _as_list(production_capacity), ownership, good,
+                capital, wage, input_mats, education_wanted, required_skill, rngs)
+        ]
+
     def labour_demand(self, market_capital: float | None = None, market_wage: float | None = None) -> int:
         '''Limiting factor of employment is either:
         The production capacity / output per worker,
@@ -88,8 +121,8 @@ class Firm(FirmProperties):
 
         return self.total_productivity
 
-    def produce(self):
-        produced = min(_sample_normal(expected=self.update_total_productivity(), rng=self.rng),
+    def produce(self, weeks: int = 1):
+        produced = min(_sample_normal(expected=self.update_total_productivity() * weeks, rng=self.rng),
                        self.able_to_produce)
         if self.input_mats is not None:
             for mat in self.input_mats:
@@ -97,8 +130,8 @@ class Firm(FirmProperties):
         self.inv[self.good] += produced
 
 
-    def tick(self):
-        self.produce()
+    def tick(self, weeks: int = 1):
+        self.produce(weeks)
 
     def transfer_to_city(self):
         '''For moving inventory to city. Only called if state owned.'''
@@ -2,7 +2,9 @@
 
 from dataclasses import dataclass, field
 
-@dataclass
+import numpy as np
+
+@dataclass(slots=True)
 class FirmParams:
     productivity: float
     production_capacity: int
@@ -19,7 +21,7 @@ class FirmParams:
     required_skill: str | None = None
     country_policy: dict | None = None
 
-@dataclass
+@dataclass(slots=True)
 class FirmState:
     employed: int = 0
     total_productivity: float = 0.0
@@ -27,8 +29,19 @@ class FirmState:
     inv: dict = field(default_factory=dict)
 
 
+# Numeric FirmState fields as stored in columns (checkpoints, shared memory).
+FIRM_STATE_DTYPES = {
+    "employed": np.int64,
+    "total_productivity": np.float64,
+    "market_capital": np.float64,
+}
+
+
 class FirmProperties:
     '''Property accessors for firms.'''
+
+    __slots__ = ()
+
     @property
     def employed(self):
         return self.state.employed
@@ -0,0 +1,59 @@
+"""Bucketed index of which population groups may work at which firms."""
+
+import numpy as np
+
+
+class EligibilityIndex:
+    """Groups bucketed by education level and firms by required skill.
+
+    A group may work at a firm when the firm has no required skill or the
+    skill equals the group's education level. Clearing visits only the
+    groups in a firm's bucket, and per-bucket supply shows when no
+    compatible workers are left.
+    """
+
+    def __init__(self, group_levels, firm_skills) -> None:
+        self.levels: dict = {}
+        self.group_codes = np.array([self.levels.setdefault(level, len(self.levels)) for level in group_levels],
+                                    dtype=np.int64)
+        # -1: no requirement, -2: a skill no group has.
+        self.firm_codes = np.array([-1 if skill is None else self.levels.get(skill, -2) for skill in firm_skills],
+                                   dtype=np.int64)
+        order = np.argsort(self.group_codes, kind="stable")
+        bounds = np.searchsorted(self.group_codes[order], np.arange(len(self.levels) + 1))
+        self.buckets = [order[bounds[code]:bounds[code + 1]] for code in range(len(self.levels))]
+        self.all_groups = np.arange(len(self.group_codes))
+        self.empty = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_entities(cls, populations, firms) -> "EligibilityIndex":
+        return cls(group_levels=[group.education_level for group in populations],
+                   firm_skills=[firm.p.required_skill for firm in firms])
+
+    def groups_for(self, firm_index: int) -> np.ndarray:
+        """Indexes of the groups that may work at a firm, in group order."""
+        code = self.firm_codes[firm_index]
+        if code == -1:
+            return self.all_groups
+        if code == -2:
+            return self.empty
+        return self.buckets[code]
+
+    def pair_count(self) -> int:
+        """Number of compatible group/firm pairs."""
+        return sum(len(self.groups_for(firm_index)) for firm_index in range(len(self.firm_codes)))
+
+    def bucket_supply(self, per_g_supply) -> np.ndarray:
+        """Supply per education level bucket."""
+        return np.bincount(self.group_codes, weights=per_g_supply, minlength=len(self.levels))
+
+    def firm_supply(self, per_g_supply) -> np.ndarray:
+        """Supply each firm can draw on: its bucket's, or everyone's without a requirement."""
+        # Codes -2 and -1 index the two values appended after the buckets.
+        buckets = np.append(self.bucket_supply(per_g_supply), [0.0, float(np.sum(per_g_supply))])
+        return buckets[self.firm_codes]
+
+    def matrix(self) -> np.ndarray:
+        """Group x firm eligibility matrix."""
+        return ((self.group_codes[:, None] == self.firm_codes[None, :])
+                | (self.firm_codes[None, :] == -1))
@@ -2,6 +2,10 @@
 
 from dataclasses import dataclass, field
 
+import numpy as np
+
+from model.economy.labour.eligibility import EligibilityIndex
+
 
 @dataclass(frozen=True)
 class LabourFlow:
@@ -29,9 +33,12 @@ class LabourClearResult:
 class LabourMarket:
     """Labour market object owned by cities."""
 
-    def __init__(self, rng, country_policy=None):
+    def __init__(self, rng, country_policy=None, engine: str = "loop"):
+        if engine not in ("loop", "matrix"):
+            raise ValueError(f"Unknown labour market engine: {engine!r}")
         self.rng = rng
         self.country_policy = country_policy
+        self.engine = engine
 
     def compute_supply(self, populations) -> tuple[list[int], int]:
         """Return per-group labour supply and total supply."""
@@ -46,9 +53,16 @@ class LabourMarket:
         return per_f_demand, total_demand
 
     def is_eligible(self, group, firm) -> bool:
-        """Eligibility hook for future education/skill constraints."""
-        del group, firm
-        return True
+        """A group may work at a firm that requires no skill or its education level."""
+        return firm.p.required_skill is None or firm.p.required_skill == group.education_level
+
+    def eligibility_index(self, populations, firms) -> EligibilityIndex:
+        """Bucketed form of is_eligible that clearing iterates over."""
+        return EligibilityIndex.from_entities(populations, firms)
+
+    def eligibility_matrix(self, populations, firms) -> np.ndarray:
+        """Group x firm matrix form of is_eligible used by the matrix engine."""
+        return self.eligibility_index(populations, firms).matrix()
 
     def _empty_result(self, populations, firms):
         return LabourClearResult(
@@ -60,8 +74,11 @@ class LabourMarket:
             firm_wage_bill=[0.0 for _ in firms],
         )
 
-    def clear_market(self, populations, firms) -> "LabourClearResult":
-        """Assign workers to firms and settle gross wages."""
+    def clear_market(self, populations, firms, weeks: int = 1) -> "LabourClearResult":
+        """Assign workers to firms and settle gross wages.
+
+        The result holds one week's flows; wages are paid for weeks weeks.
+        """
         result = self._empty_result(populations=populations, firms=firms)
         if not populations or not firms:
             return result
@@ -71,18 +88,55 @@ class LabourMarket:
         if total_supply == 0 or total_demand == 0:
             return result
 
-        remaining_supply = total_supply
-        remaining_demand = total_demand
-        remaining_per_g_supply = per_g_supply[:]
-        remaining_per_f_demand = per_f_demand[:]
+        # Demand no eligible group can fill doesn't keep clearing going.
+        index = self.eligibility_index(populations, firms)
+        per_f_demand = np.where(index.firm_supply(per_g_supply) > 0, per_f_demand, 0).tolist()
+        if sum(per_f_demand) == 0:
+            return result
+
+        if self.engine == "matrix":
+            self._clear_matrix(result, populations, firms,
+                               per_g_supply=per_g_supply,
+                               per_f_demand=per_f_demand,
+                               index=index)
+        else:
+            self._clear_loop(result, populations, firms,
+                             per_g_supply=per_g_supply,
+                             per_f_demand=per_f_demand,
+                             index=index)
+
+        result.total_employed = sum(result.group_employed)
+        self._settle(result, populations, firms, weeks)
+        return result
 
-        firm_order = sorted(
+    def _firm_order(self, firms) -> list[int]:
+        """Firm indexes by descending wage; ties go to the earlier firm."""
+        return sorted(
             range(len(firms)),
             key=lambda idx: (float(firms[idx].wage), -idx),
             reverse=True,
         )
 
+    def _clear_loop(self, result, populations, firms, per_g_supply, per_f_demand, index=None) -> None:
+        """Reference engine: one probability and binomial draw per eligible group/firm pair."""
+        index = index if index is not None else self.eligibility_index(populations, firms)
+        total_supply = sum(per_g_supply)
+        total_demand = sum(per_f_demand)
+        remaining_supply = total_supply
+        remaining_demand = total_demand
+        remaining_per_g_supply = per_g_supply[:]
+        remaining_per_f_demand = per_f_demand[:]
+
+        firm_order = self._firm_order(firms)
+        hiring = np.array([firm.state.market_capital > 0 and firm.wage > 0 for firm in firms])
+
         while remaining_supply > (total_supply * 0.1) and remaining_demand > (total_demand * 0.1):
+            supply_before = remaining_supply
+            # Stop once no hiring firm has an eligible group with workers left.
+            drawable = np.where(np.array(remaining_per_g_supply) > 1, remaining_per_g_supply, 0)
+            if not (hiring & (np.array(remaining_per_f_demand) > 0) & (index.firm_supply(drawable) > 0)).any():
+                break
+
             for firm_index in firm_order:
                 if remaining_per_f_demand[firm_index] <= 0:
                     continue
@@ -90,15 +144,13 @@ class LabourMarket:
                 if firm.state.market_capital <= 0 or firm.wage <= 0:
                     continue
 
-                for group_index, group in enumerate(populations):
+                for group_index in index.groups_for(firm_index).tolist():
+                    group = populations[group_index]
                     if remaining_per_f_demand[firm_index] <= 0:
                         break
                     if remaining_per_g_supply[group_index] <= 1:
                         continue
 
-                    if not self.is_eligible(group, firm):
-                        continue
-
                     p = self.calc_employment_probability(remaining_supply=remaining_supply,
                                                         remaining_demand=remaining_demand,
                                                         group=group,
@@ -106,7 +158,7 @@ class LabourMarket:
 
                     workers = min(self.draw_count(supply=remaining_per_g_supply[group_index],
                                               probability=p),
-                                              per_f_demand[firm_index])
+                                              remaining_per_f_demand[firm_index])
 
                     gross_pay = workers * firm.wage
                     result.flows.append(
@@ -128,17 +180,121 @@ class LabourMarket:
                     remaining_per_g_supply[group_index] -= workers
                     remaining_per_f_demand[firm_index] -= workers
 
-        result.total_employed = sum(result.group_employed)
+            if remaining_supply == supply_before and not hasattr(self.rng, "binomial"):
+                # Deterministic passes repeat exactly once nothing moves.
+                break
+
+    def _clear_matrix(self, result, populations, firms, per_g_supply, per_f_demand, index=None) -> None:
+        """Batched engine: each round draws every group/firm pair in one call.
 
+        Drawing a binomial per firm from what is left of a group's supply is
+        the same as one multinomial over the firms, so each round uses cell
+        probabilities p[g, f] * prod(1 - p[g, earlier firms]). Draws beyond a
+        firm's remaining demand are returned to the groups, filling the firm
+        in group order as the loop engine does.
+        """
+        total_supply = sum(per_g_supply)
+        total_demand = sum(per_f_demand)
+        order = np.array(self._firm_order(firms), dtype=np.int64)
+        ordered = [firms[idx] for idx in order]
+
+        wages = np.array([float(firm.wage) for firm in ordered])
+        has_capital = np.array([firm.state.market_capital > 0 for firm in ordered])
+        firm_ed = np.array([getattr(firm, "education_wanted", 0) for firm in ordered], dtype=float)
+        group_ed = np.array([getattr(group, "education", 0) for group in populations], dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ed_factor = np.where((group_ed[:, None] > 0) & (firm_ed[None, :] > 0),
+                                 group_ed[:, None] / firm_ed[None, :] * 0.1,
+                                 1.0)
+        index = index if index is not None else self.eligibility_index(populations, firms)
+        eligible = index.matrix()[:, order]
+
+        g_supply = np.array(per_g_supply, dtype=np.int64)
+        f_demand = np.array(per_f_demand, dtype=np.int64)[order]
+        employed = np.zeros((len(populations), len(firms)), dtype=np.int64)
+        remaining_supply = total_supply
+        remaining_demand = total_demand
+
+        while remaining_supply > (total_supply * 0.1) and remaining_demand > (total_demand * 0.1):
+            firm_active = (f_demand > 0) & has_capital & (wages > 0)
+            group_active = g_supply > 1
+            active = eligible & firm_active[None, :] & group_active[:, None]
+            if not active.any():
+                break
+
+            available = np.where(group_active, g_supply, 0)
+            cells = self._round_cells(active, ed_factor, available, f_demand,
+                                      remaining_supply, remaining_demand)
+            pvals = np.hstack((cells, np.maximum(1.0 - cells.sum(axis=1), 0.0)[:, None]))
+
+            drawn = self.draw_counts(available, pvals)[:, :-1]
+            ahead = np.cumsum(drawn, axis=0) - drawn
+            workers = np.clip(f_demand[None, :] - ahead, 0, drawn)
+
+            employed += workers
+            g_supply -= workers.sum(axis=1)
+            f_demand -= workers.sum(axis=0)
+            hired = int(workers.sum())
+            remaining_supply -= hired
+            remaining_demand -= hired
+            if hired == 0 and not self.stochastic:
+                # Deterministic rounds repeat exactly once nothing moves.
+                break
+
+        pay = employed * wages[None, :]
+        firm_employed = employed.sum(axis=0)
+        firm_wage_bill = pay.sum(axis=0)
+        for col, firm_index in enumerate(order.tolist()):
+            result.firm_employed[firm_index] = int(firm_employed[col])
+            result.firm_wage_bill[firm_index] = float(firm_wage_bill[col])
+        result.group_employed = employed.sum(axis=1).tolist()
+        result.group_income = pay.sum(axis=1).tolist()
+
+        for group_index, col in zip(*np.nonzero(employed)):
+            workers = int(employed[group_index, col])
+            wage = float(wages[col])
+            result.flows.append(
+                LabourFlow(
+                    group_index=int(group_index),
+                    firm_index=int(order[col]),
+                    workers=workers,
+                    wage_rate=wage,
+                    gross_pay=workers * wage,
+                )
+            )
+
+    @staticmethod
+    def _round_cells(active, ed_factor, available, f_demand, remaining_supply, remaining_demand) -> np.ndarray:
+        """Group x firm cell probabilities for one matrix round.
+
+        The loop engine recomputes the base probability from the remaining
+        supply and demand after every draw. Here each firm column uses the
+        base left after the expected hires of the firms before it.
+        """
+        cells = np.zeros(active.shape)
+        reach = np.ones(active.shape[0])
+        supply_left, demand_left = float(remaining_supply), float(remaining_demand)
+        for col in range(active.shape[1]):
+            if supply_left <= 0 or demand_left <= 0:
+                break
+            base = min(supply_left / demand_left, 1)
+            p = np.where(active[:, col], np.minimum(base * ed_factor[:, col], 1.0), 0.0)
+            cells[:, col] = p * reach
+            reach *= 1.0 - p
+            expected = min(float(available @ cells[:, col]), float(f_demand[col]))
+            supply_left -= expected
+            demand_left -= expected
+        return cells
+
+    def _settle(self, result, populations, firms, weeks: int = 1) -> None:
+        """Write employment back and pay gross wages."""
         for group_index, group in enumerate(populations):
             group.employed = result.group_employed[group_index]
-            group.money += result.group_income[group_index]
+            group.money += result.group_income[group_index] * weeks
 
         for firm_index, firm in enumerate(firms):
             firm.employed = result.firm_employed[firm_index]
-            firm.market_capital = max(firm.market_capital - result.firm_wage_bill[firm_index], 0.0)
-
-        return result
+            firm.market_capital = max(firm.market_capital - result.firm_wage_bill[firm_index] * weeks, 0.0)
 
 
     def draw_count(self, supply: float, probability: float) -> int:
@@ -153,6 +309,26 @@ class LabourMarket:
 
         return min(int(round(n * p)), int(supply))
 
+    def draw_counts(self, supply: np.ndarray, pvals: np.ndarray) -> np.ndarray:
+        """Draw one multinomial split per row of pvals (last column is the remainder).
+
+        Without an RNG each row is split by largest remainder in one pass.
+        """
+        supply = np.maximum(supply.astype(np.int64), 0)
+        if self.stochastic:
+            return self.rng.multinomial(supply, pvals)
+
+        exact = supply[:, None] * (pvals / np.maximum(pvals.sum(axis=1, keepdims=True), 1e-300))
+        counts = np.floor(exact).astype(np.int64)
+        short = supply - counts.sum(axis=1)
+        rank = np.argsort(np.argsort(counts - exact, axis=1, kind="stable"), axis=1, kind="stable")
+        return counts + (rank < short[:, None])
+
+    @property
+    def stochastic(self) -> bool:
+        """Whether draws come from the RNG rather than deterministic rounding."""
+        return self.rng is not None and hasattr(self.rng, "multinomial")
+
     def calc_employment_probability(self,
                                     remaining_supply: float,
                                     remaining_demand: float,
@@ -1,20 +1,34 @@
-"""Basic first version of market. Owned by a city."""
+"""Country-wide market for firm input goods. Owned by a country.
 
-from dataclasses import dataclass
-from model.protocols import DistanceProvider, NeutralDistanceProvider
+Each tick firms with input materials bid for their shortfalls and cities
+offer their stock of those goods. Orders are kept in one book per good,
+keyed by city, and matched best distance weight first. Each buying city
+only considers its nearest_sellers best-weighted selling cities, so
+clearing a book does not rank every seller against every buyer.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from model.protocols import DistanceProvider, NeutralDistanceProvider, nearest_sources
 
 @dataclass
 class MarketParams:
-    pass
+    price: float = 1.0  # Paid per unit by the buying firm to the selling city
+    reserved_goods: tuple[str, ...] = ("food",)  # Never offered; cities consume these
+    nearest_sellers: int | None = 8  # Selling cities each buying city considers; None for all
 
 @dataclass
 class MarketState:
-    pass
+    trades: list["MarketTrade"] = field(default_factory=list)
 
 @dataclass
 class MarketBuyOrder:
     '''Single request from a firm. '''
     firm: "Firm"
+    city: "City"
     item: str
     shortfall: float
 
@@ -22,8 +36,25 @@ class MarketBuyOrder:
 class MarketSellOrder:
     '''Single offer from a city (or firm in the future).'''
     city: "City"
-    item: list[str]
-    amount: list[float]
+    item: str
+    amount: float
+
+@dataclass(frozen=True)
+class MarketTrade:
+    '''Goods delivered from one city's stock to firms in another city.'''
+    seller: str
+    buyer: str
+    item: str
+    amount: float
+
+
+@dataclass
+class OrderBook:
+    '''Bids and asks for one good. Bids are grouped by the buying city; each city makes one ask.'''
+    good: str
+    bids: dict[int, list[MarketBuyOrder]] = field(default_factory=dict)
+    asks: list[MarketSellOrder] = field(default_factory=list)
+
 
 class SupplyChain:
     def __init__(self, params: MarketParams, firms, cities, distance_provider, rng):
@@ -31,48 +62,192 @@ class SupplyChain:
         self.rng = rng
         self.firms = firms
         self.cities = cities
+        self.state = MarketState()
 
         self.distance_provider = distance_provider or NeutralDistanceProvider()
 
+        # Buyers are fixed: one (firm, material) pair per input of every firm.
+        firm_city = {id(firm): city for city in cities for firm in city.firms}
+        self.buyers = [firm for firm in firms if firm.input_mats]
+        self.buyer_cities = [firm_city[id(firm)] for firm in self.buyers]
+        self.city_index = {id(city): index for index, city in enumerate(cities)}
+        self.pair_firm = np.array([i for i, firm in enumerate(self.buyers) for _ in firm.input_mats],
+                                  dtype=np.int64)
+        self.pair_buyers = [self.buyers[i] for i in self.pair_firm.tolist()]
+        self.pair_good = [mat for firm in self.buyers for mat in firm.input_mats]
+        self.productivity = np.array([firm.p.productivity for firm in self.buyers], dtype=np.float64)
+        self.capacity = np.array([firm.p.production_capacity for firm in self.buyers], dtype=np.float64)
+
     @classmethod
     def build_from(cls,
         rng,
         firms: list,
         cities: list,
         distance_provider: DistanceProvider | None = None,
+        cfg: dict | None = None,
         ) -> "SupplyChain":
 
+        cfg = cfg or {}
         return cls(
-            params=MarketParams(),
+            params=MarketParams(
+                price=cfg.get("price", 1.0),
+                reserved_goods=tuple(cfg.get("reserved_goods", ("food",))),
+                nearest_sellers=cfg.get("nearest_sellers", 8),
+            ),
             firms=firms,
             cities=cities,
             distance_provider=distance_provider,
             rng=rng,
         )
 
+    @property
+    def trades(self) -> list[MarketTrade]:
+        return self.state.trades
+
+    def shortfalls(self) -> np.ndarray:
+        '''Firm.good_demand for every (firm, input) pair at once.'''
+        employed = np.fromiter((firm.employed for firm in self.buyers), dtype=np.float64,
+                               count=len(self.buyers))
+        stock = np.fromiter((firm.inv[mat] for firm, mat in zip(self.pair_buyers, self.pair_good)),
+                            dtype=np.float64, count=len(self.pair_good))
+        max_production = np.minimum(self.productivity * employed, self.capacity)
+        return np.maximum(max_production[self.pair_firm] - stock, 0.0)
+
     def request(self) -> list[MarketBuyOrder]:
-        '''Allows firms to request goods for manufacturing from other firms/cities.'''
-        market_buyers: list[MarketBuyOrder] = []
-        for firm in self.firms:
-            demand_result = firm.good_demand()
-            if not demand_result.has_demand():
-                continue
-            for item in demand_result:
-                market_buyers.append(MarketBuyOrder(firm, item, demand_result.shortfall))
-        return market_buyers
+        '''Allows firms to request goods for manufacturing from other firms/cities.
 
-    def clear_chain(self):
-        requests = self.request()
-        suppliers = self.offer()
+        Each firm's bids are scaled down together to what its market
+        capital can pay for.
+        '''
+        shortfall = self.shortfalls()
+        if self.p.price > 0 and len(shortfall):
+            capital = np.fromiter((max(firm.market_capital, 0.0) for firm in self.buyers),
+                                  dtype=np.float64, count=len(self.buyers))
+            cost = np.bincount(self.pair_firm, weights=shortfall, minlength=len(self.buyers)) * self.p.price
+            scale = np.divide(capital, cost, out=np.ones_like(cost), where=cost > capital)
+            shortfall = shortfall * scale[self.pair_firm]
 
-        for request in requests:
-            for supply in suppliers:
-                pass
+        market_buyers: list[MarketBuyOrder] = []
+        for pair in np.flatnonzero(shortfall > 0).tolist():
+            firm_index = int(self.pair_firm[pair])
+            market_buyers.append(MarketBuyOrder(
+                firm=self.buyers[firm_index],
+                city=self.buyer_cities[firm_index],
+                item=self.pair_good[pair],
+                shortfall=float(shortfall[pair]),
+            ))
+        return market_buyers
 
-    def offer(self) -> list[MarketSellOrder]:
+    def offer(self, goods=None) -> list[MarketSellOrder]:
+        '''Offers every city's stock of goods, or of only those in goods.'''
         market_sellers: list[MarketSellOrder] = []
         for city in self.cities:
-            for item in city.inv:
-                pass
+            for item, amount in city.inv.items():
+                if item in self.p.reserved_goods or amount <= 0:
+                    continue
+                if goods is not None and item not in goods:
+                    continue
+                market_sellers.append(MarketSellOrder(city=city, item=item, amount=amount))
 
         return market_sellers
+
+    def order_books(self, requests, suppliers) -> dict[str, OrderBook]:
+        '''Sort orders into one book per good that has both bids and asks.'''
+        books: dict[str, OrderBook] = {}
+        for order in requests:
+            book = books.setdefault(order.item, OrderBook(order.item))
+            book.bids.setdefault(self.city_index[id(order.city)], []).append(order)
+        for order in suppliers:
+            if order.item in books:
+                books[order.item].asks.append(order)
+        return {good: book for good, book in books.items() if book.asks}
+
+    def clear_chain(self) -> list[MarketTrade]:
+        '''Match bids to asks for every good and deliver the goods.'''
+        self.state.trades = []
+        requests = self.request()
+        if not requests:
+            return self.state.trades
+        suppliers = self.offer({order.item for order in requests})
+
+        for book in self.order_books(requests, suppliers).values():
+            self._clear_book(book)
+        return self.state.trades
+
+    def _matches(self, book: OrderBook, demand: list[float], supply: list[float]):
+        '''Yield (bid city position, ask position) pairs, best weight first.
+
+        With neutral distance every pair weighs the same, and buyers take
+        from sellers in order. Otherwise each buying city ranks its
+        nearest_sellers best-weighted sellers, and a heap holding every
+        buyer's best seller with stock left merges those rankings; zero-weight
+        pairs never trade.
+        '''
+        bid_cities = [self.cities[index] for index in book.bids]
+        if isinstance(self.distance_provider, NeutralDistanceProvider):
+            ask = 0
+            for bid in range(len(bid_cities)):
+                while demand[bid] > 0 and ask < len(book.asks):
+                    yield bid, ask
+                    if supply[ask] <= 0:
+                        ask += 1
+            return
+
+        seller_keys = [order.city.name for order in book.asks]
+        key_ids = getattr(self.distance_provider, "key_ids", None)
+        if key_ids is not None:
+            seller_keys = key_ids(seller_keys)
+        sellers = []
+        heap = []
+        for bid, city in enumerate(bid_cities):
+            asks, weights = nearest_sources(self.distance_provider, city.name, seller_keys,
+                                            self.p.nearest_sellers)
+            sellers.append(list(zip((-weights).tolist(), asks.tolist())))
+            if sellers[bid]:
+                heap.append((sellers[bid][0][0], bid, sellers[bid][0][1], 0))
+        heapq.heapify(heap)
+        while heap:
+            _, bid, ask, rank = heap[0]
+            if demand[bid] <= 0:
+                heapq.heappop(heap)
+            elif supply[ask] > 0:
+                yield bid, ask
+            elif rank + 1 < len(sellers[bid]):
+                weight, ask = sellers[bid][rank + 1]
+                heapq.heapreplace(heap, (weight, bid, ask, rank + 1))
+            else:
+                heapq.heappop(heap)
+
+    def _clear_book(self, book: OrderBook) -> None:
+        bid_orders = list(book.bids.values())
+        demand = [sum(order.shortfall for order in orders) for orders in bid_orders]
+        supply = [order.amount for order in book.asks]
+
+        for bid, ask in self._matches(book, demand, supply):
+            amount = min(demand[bid], supply[ask])
+            demand[bid] -= amount
+            supply[ask] -= amount
+            seller = book.asks[ask].city
+            delivered = self._deliver(seller, bid_orders[bid], book.good, amount)
+            if delivered > 0:
+                self.state.trades.append(MarketTrade(seller=seller.name, buyer=bid_orders[bid][0].city.name,
+                                                     item=book.good, amount=delivered))
+
+    def _deliver(self, seller, orders: list[MarketBuyOrder], good: str, amount: float) -> float:
+        '''Move up to amount of good from seller's stock to the bidding firms, in order.'''
+        delivered = 0.0
+        for order in orders:
+            if amount <= 0:
+                break
+            given = min(order.shortfall, amount)
+            if given <= 0:
+                continue
+            order.shortfall -= given
+            amount -= given
+            delivered += given
+            order.firm.inv[good] += given
+            cost = min(given * self.p.price, max(order.firm.market_capital, 0.0))
+            order.firm.market_capital -= cost
+            seller.state.treasury += cost
+        seller.inv[good] -= delivered
+        return delivered
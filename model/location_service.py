@@ -1,5 +1,52 @@
+import numpy as np
+
+
 class LocationService:
-    '''Resolves actual coordinates for any entity.'''
+    '''Resolves actual coordinates for any entity.
+
+    Keys (entity names) are interned to integer ids in the order they are
+    added, and coordinates are kept in an (n, 2) array in id order.
+    '''
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self._coords: list[tuple[float, float]] = []
+
+    @classmethod
+    def from_cities(cls, cities) -> "LocationService":
+        '''Locate every city by its location param.
+
+        All cities must have one, and their names must be distinct, since
+        distances are looked up by name.
+        '''
+        service = cls()
+        for city in cities:
+            if city.location is None:
+                raise ValueError(f"City {city.name!r} has no location")
+            if city.name in service.ids:
+                raise ValueError(f"Duplicate city name {city.name!r}; located cities need distinct names")
+            service.set_location(city.name, *city.location)
+        return service
+
+    def set_location(self, key: str, x: float, y: float) -> int:
+        '''Place key at (x, y) and return its id.'''
+        if key in self.ids:
+            self._coords[self.ids[key]] = (float(x), float(y))
+        else:
+            self.ids[key] = len(self._coords)
+            self._coords.append((float(x), float(y)))
+        return self.ids[key]
+
+    def key_id(self, entity) -> int:
+        '''Integer id of an entity or its name.'''
+        return self.ids[getattr(entity, "name", entity)]
+
+    def get_location(self, entity) -> tuple[float, float]:
+        return self._coords[self.key_id(entity)]
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        return np.array(self._coords, dtype=np.float64).reshape(len(self._coords), 2)
 
-    def get_location(self, entity):
-        pass
+    def __len__(self) -> int:
+        return len(self._coords)
@@ -1,9 +1,14 @@
+from .event_log import MigrationEventLog, read_spill
 from .facade import Migration
+from .index import AttractivenessIndex
 from .options import MigrationOptions
 from .types import GroupMigrationEvent
 
 __all__ = [
+    "AttractivenessIndex",
     "GroupMigrationEvent",
     "Migration",
+    "MigrationEventLog",
     "MigrationOptions",
+    "read_spill",
 ]
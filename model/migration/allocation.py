@@ -1,5 +1,9 @@
 """Population draw and transfer allocation helpers."""
 
+import numpy as np
+
+from model.core.random import EntityStream
+
 
 class MigrationAllocator:
     """Draw migration counts and safely transfer populations."""
@@ -18,6 +22,17 @@ class MigrationAllocator:
             return int(self.rng.binomial(n, p))
         return int(round(n * p))
 
+    def draw_counts(self, populations, probability: float) -> np.ndarray:
+        """Array form of draw_count; one binomial call when the RNG takes arrays."""
+        n = np.maximum(np.asarray(populations, dtype=np.int64), 0)
+        p = max(min(probability, 1.0), 0.0)
+        if p <= 0 or not n.any():
+            return np.zeros(len(n), dtype=np.int64)
+
+        if isinstance(self.rng, (np.random.Generator, EntityStream)):
+            return np.asarray(self.rng.binomial(n, p), dtype=np.int64)
+        return np.array([self.draw_count(count, p) for count in n.tolist()], dtype=np.int64)
+
     def safe_transfer(self, source_group, target_group, requested_amount: int) -> int:
         """Move integer population safely between groups."""
         if requested_amount <= 0:
@@ -1,9 +1,10 @@
 """Migration engines for each migration channel."""
 
 from .intercity import IntercityMigrationEngine
-from .intergroup import IntergroupMigrationEngine
+from .intergroup import BatchedIntergroupMigrationEngine, IntergroupMigrationEngine
 
 __all__ = [
+    "BatchedIntergroupMigrationEngine",
     "IntercityMigrationEngine",
     "IntergroupMigrationEngine",
 ]
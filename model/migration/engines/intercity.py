@@ -1,12 +1,17 @@
 """Intercity migration engine."""
 
+from bisect import bisect_left
 from typing import TYPE_CHECKING, Sequence
 
-from model.migration.types import GroupMigrationEvent
+import numpy as np
+
+from model.migration.event_log import MigrationEventLog
+from model.migration.sampling import CumulativeSampler
 
 if TYPE_CHECKING:
     from model.city.city import City
     from model.migration.allocation import MigrationAllocator
+    from model.migration.index import AttractivenessIndex
     from model.migration.selectors import WeightedTargetSelector
 
 
@@ -42,14 +47,91 @@ class IntercityMigrationEngine:
             return None
         return weighted[index].candidate
 
+    def choose_target_index(
+        self,
+        index: "AttractivenessIndex",
+        source_index: int,
+        keys: Sequence[str],
+    ) -> int | None:
+        """Choose a target entity index from a sorted attractiveness index.
+
+        Candidates are the suffix of entities more attractive than the source.
+        With neutral distance the draw is a binary search over prefix-sum
+        gap weights; otherwise the suffix weights come from one batch
+        distance lookup. keys may be the provider's interned integer ids.
+        """
+        positions = index.more_attractive(source_index)
+        if not positions:
+            return None
+        start = positions.start
+
+        if self.selector.distance_neutral:
+            total = index.cumulative_gap(source_index, start, positions[-1])
+            if total <= 0:
+                return None
+            threshold = self.selector.draw_threshold(total)
+            found = bisect_left(positions, threshold,
+                                key=lambda position: index.cumulative_gap(source_index, start, position))
+        else:
+            targets = index.order_array[start:]
+            target_keys = keys[targets] if isinstance(keys, np.ndarray) else [keys[i] for i in targets.tolist()]
+            weights = index.gaps(source_index, start) * self.selector.distance_weights(keys[source_index],
+                                                                                       target_keys)
+            cumulative = np.cumsum(weights)
+            total = float(cumulative[-1])
+            if total <= 0:
+                return None
+            found = int(np.searchsorted(cumulative, self.selector.draw_threshold(total), side="left"))
+
+        return index.order[positions[min(found, len(positions) - 1)]]
+
+    def choose_target_indices(
+        self,
+        index: "AttractivenessIndex",
+        keys: Sequence[str],
+        sources: Sequence[int] | None = None,
+    ) -> np.ndarray:
+        """Array form of choose_target_index for many sources (all by default); -1 marks no target.
+
+        The draws for every source with a candidate are taken in one call, in
+        source order, so the choices match calling choose_target_index for
+        each source in turn with no other draws in between.
+        """
+        sources = np.arange(len(index)) if sources is None else np.asarray(sources, dtype=np.int64)
+        if self.selector.distance_neutral:
+            return self.selector.choose_from_index(index, sources)
+
+        starts = index.starts(sources)
+        chosen = np.full(len(sources), -1, dtype=np.int64)
+        samplers = {}
+        for i, (source, start) in enumerate(zip(sources.tolist(), starts.tolist())):
+            if start >= len(index):
+                continue
+            targets = index.order_array[start:]
+            target_keys = keys[targets] if isinstance(keys, np.ndarray) else [keys[t] for t in targets.tolist()]
+            sampler = CumulativeSampler(index.gaps(source, start)
+                                        * self.selector.distance_weights(keys[source], target_keys))
+            if sampler.total > 0:
+                samplers[i] = (sampler, targets)
+        thresholds = self.selector.draw_thresholds([sampler.total for sampler, _ in samplers.values()])
+        for (i, (sampler, targets)), threshold in zip(samplers.items(), thresholds.tolist()):
+            chosen[i] = targets[sampler.indices(threshold)]
+        return chosen
+
     def migrate_between_cities(
         self,
         source_city: "City",
         target_city: "City",
         intercity_rate: float,
-    ) -> list[GroupMigrationEvent]:
-        """Move integer migrants from source city groups to target city groups."""
-        events: list[GroupMigrationEvent] = []
+        gap: float | None = None,
+        log: MigrationEventLog | None = None,
+    ) -> MigrationEventLog:
+        """Move integer migrants from source city groups to target city groups.
+
+        gap defaults to the cities' current attractiveness difference. The
+        transfers are appended to log (a new one by default) in one batch.
+        """
+        events = MigrationEventLog() if log is None else log
         if intercity_rate <= 0:
             return events
         if not source_city.populations or not target_city.populations:
@@ -57,7 +139,8 @@ class IntercityMigrationEngine:
         if source_city.total_population <= 0:
             return events
 
-        gap = target_city.migration_attractiveness - source_city.migration_attractiveness
+        if gap is None:
+            gap = target_city.migration_attractiveness - source_city.migration_attractiveness
         if gap <= 0:
             return events
 
@@ -67,6 +150,9 @@ class IntercityMigrationEngine:
         if p_move <= 0:
             return events
 
+        source_groups: list[int] = []
+        target_groups: list[int] = []
+        amounts: list[int] = []
         for source_index, source_group in enumerate(source_city.populations):
             expected_move = self.allocator.draw_count(
                 population=source_group.size,
@@ -82,16 +168,9 @@ class IntercityMigrationEngine:
                     requested_amount=expected_move,
                 )
                 if moved > 0:
-                    events.append(
-                        GroupMigrationEvent(
-                            source_city=source_city.name,
-                            source_group_index=source_index,
-                            target_city=target_city.name,
-                            target_group_index=source_index,
-                            amount=moved,
-                            channel="intercity",
-                        )
-                    )
+                    source_groups.append(source_index)
+                    target_groups.append(source_index)
+                    amounts.append(moved)
                 continue
 
             for target_index, chunk in self.allocator.fallback_split(
@@ -105,15 +184,10 @@ class IntercityMigrationEngine:
                 )
                 if moved <= 0:
                     continue
-                events.append(
-                    GroupMigrationEvent(
-                        source_city=source_city.name,
-                        source_group_index=source_index,
-                        target_city=target_city.name,
-                        target_group_index=target_index,
-                        amount=moved,
-                        channel="intercity",
-                    )
-                )
+                source_groups.append(source_index)
+                target_groups.append(target_index)
+                amounts.append(moved)
 
+        events.append_many(source_city.name, target_city.name, source_groups, target_groups,
+                           amounts, channel="intercity")
         return events
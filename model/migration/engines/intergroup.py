@@ -4,7 +4,10 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from model.migration.types import GroupMigrationEvent
+import numpy as np
+
+from model.migration.event_log import MigrationEventLog
+from model.migration.index import AttractivenessIndex
 
 if TYPE_CHECKING:
     from model.city.city import City
@@ -23,47 +26,107 @@ class IntergroupMigrationEngine:
         self.selector = selector
         self.allocator = allocator
 
-    def migrate_within_city(self, city: "City", intergroup_rate: float) -> list[GroupMigrationEvent]:
-        """Move integer migrants between groups inside one city."""
+    def migrate_within_city(
+        self,
+        city: "City",
+        intergroup_rate: float,
+        log: MigrationEventLog | None = None,
+    ) -> MigrationEventLog:
+        """Move integer migrants between groups inside one city.
+
+        The transfers are appended to log (a new one by default) in one batch.
+        """
 
-        events: list[GroupMigrationEvent] = []
+        events = MigrationEventLog() if log is None else log
         if intergroup_rate <= 0:
             return events
 
+        source_groups: list[int] = []
+        target_groups: list[int] = []
+        amounts: list[int] = []
+
         for source_index, source_group in enumerate(city.populations):
-            targets = self.selector.find_target_groups(
+            targets, weights = self.selector.target_group_weights(
                 source_attractiveness=source_group.migration_attractiveness,
                 source_city_key=city.name,
                 source_index=source_index,
                 groups=city.populations,
             )
-            if not targets:
+            if not len(targets):
                 continue
 
-            target_choice = self.selector.weighted_choice_index(
-                [target.weight for target in targets]
-            )
+            target_choice = self.selector.weighted_choice_index(weights)
             if target_choice is None:
                 continue
-            target = targets[target_choice]
+            target_index = int(targets[target_choice])
 
             moved = self.allocator.safe_transfer(
                 source_group=source_group,
-                target_group=target.candidate,
+                target_group=city.populations[target_index],
                 requested_amount=self.allocator.draw_count(source_group.size, intergroup_rate),
             )
             if moved <= 0:
                 continue
 
-            events.append(
-                GroupMigrationEvent(
-                    source_city=city.name,
-                    source_group_index=source_index,
-                    target_city=city.name,
-                    target_group_index=target.index,
-                    amount=moved,
-                    channel="intergroup",
-                )
-            )
+            source_groups.append(source_index)
+            target_groups.append(target_index)
+            amounts.append(moved)
+
+        events.append_many(city.name, city.name, source_groups, target_groups, amounts,
+                           channel="intergroup")
+        return events
+
+
+class BatchedIntergroupMigrationEngine(IntergroupMigrationEngine):
+    """Within-city migration for every group of a city in one pass.
+
+    Attractiveness is scored once into an AttractivenessIndex, so each
+    source's positive-gap targets are a suffix of the sorted order and its
+    draw is a search over prefix sums. Migrant counts and targets are drawn
+    for all sources at once and the net transfers applied together. Unlike
+    the loop engine, every group's score and outflow come from its state at
+    the start of the pass, before this tick's moves.
+    """
+
+    def migrate_within_city(
+        self,
+        city: "City",
+        intergroup_rate: float,
+        log: MigrationEventLog | None = None,
+    ) -> MigrationEventLog:
+        """Move integer migrants between groups inside one city.
+
+        The transfers are appended to log (a new one by default) in one batch.
+        """
+        events = MigrationEventLog() if log is None else log
+        groups = city.populations
+        if intergroup_rate <= 0 or len(groups) < 2:
+            return events
+        if not self.selector.distance_neutral and self.selector.distance_weight(city.name, city.name) <= 0:
+            return events
+
+        states = [group.state for group in groups]
+        size = np.fromiter((state.size for state in states), dtype=np.int64, count=len(states))
+        employed = np.fromiter((state.employed for state in states), dtype=np.float64, count=len(states))
+        healthcare = np.fromiter((state.healthcare for state in states), dtype=np.float64, count=len(states))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            employment_rate = np.where(size > 0, employed / size, 0.0)
+        index = AttractivenessIndex.from_array(healthcare * 0.3 + employment_rate * 0.2)
+
+        sources = np.flatnonzero(size > 0)
+        targets = self.selector.choose_from_index(index, sources)
+        moving = targets >= 0
+        sources, targets = sources[moving], targets[moving]
+        amounts = self.allocator.draw_counts(size[sources], intergroup_rate)
+        moved = amounts > 0
+        sources, targets, amounts = sources[moved], targets[moved], amounts[moved]
+        if not len(amounts):
+            return events
+
+        net = (np.bincount(targets, weights=amounts, minlength=len(groups))
+               - np.bincount(sources, weights=amounts, minlength=len(groups))).astype(np.int64)
+        for i in np.flatnonzero(net).tolist():
+            groups[i].size = int(size[i] + net[i])
 
+        events.append_many(city.name, city.name, sources, targets, amounts, channel="intergroup")
         return events
@@ -0,0 +1,165 @@
+"""Columnar log of migration events."""
+
+import json
+import os
+from typing import Iterator, Sequence
+
+import numpy as np
+
+from model.migration.types import GroupMigrationEvent
+
+
+CHANNELS = ("intergroup", "intercity")
+CHANNEL_CODES = {name: code for code, name in enumerate(CHANNELS)}
+
+EVENT_DTYPE = np.dtype([
+    ("tick", np.int64),
+    ("source_city", np.int32),
+    ("source_group_index", np.int32),
+    ("target_city", np.int32),
+    ("target_group_index", np.int32),
+    ("amount", np.int64),
+    ("channel", np.int8),
+])
+
+COLUMNS = EVENT_DTYPE.names[1:]
+
+
+class MigrationEventLog(Sequence[GroupMigrationEvent]):
+    """Migration events of the latest tick, one typed array per field.
+
+    City names are interned to integer ids in the order they are first
+    logged. Engines append all transfers between one pair of cities in a
+    single call; indexing or iterating builds GroupMigrationEvent views on
+    demand. clear(tick) starts logging the next tick, normally Core.week,
+    first appending the finished tick's rows to spill_path when one is set.
+    Events are stamped with the tick being logged.
+    """
+
+    def __init__(self, spill_path: str | None = None, capacity: int = 16) -> None:
+        self.spill_path = spill_path
+        self.names: list[str] = []
+        self.ids: dict[str, int] = {}
+        self.tick = 0
+        self._rows = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self._length = 0
+        self._spilled_names = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("migration event index out of range")
+        return self._event(self._rows[index])
+
+    def __iter__(self) -> Iterator[GroupMigrationEvent]:
+        for row in self._rows[:self._length]:
+            yield self._event(row)
+
+    def __repr__(self) -> str:
+        return f"MigrationEventLog({len(self)} events, tick {self.tick})"
+
+    def _event(self, row) -> GroupMigrationEvent:
+        return GroupMigrationEvent(
+            source_city=self.names[row["source_city"]],
+            source_group_index=int(row["source_group_index"]),
+            target_city=self.names[row["target_city"]],
+            target_group_index=int(row["target_group_index"]),
+            amount=int(row["amount"]),
+            channel=CHANNELS[row["channel"]],
+        )
+
+    def city_id(self, name: str) -> int:
+        '''Interned id of a city name.'''
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+    def column(self, name: str) -> np.ndarray:
+        '''Read-only view of one field over the events logged so far.'''
+        view = self._rows[name][:self._length]
+        view.flags.writeable = False
+        return view
+
+    def _reserve(self, count: int) -> np.ndarray:
+        needed = self._length + count
+        if needed > len(self._rows):
+            grown = np.zeros(max(needed, 2 * len(self._rows)), dtype=EVENT_DTYPE)
+            grown[:self._length] = self._rows[:self._length]
+            self._rows = grown
+        rows = self._rows[self._length:needed]
+        self._length = needed
+        return rows
+
+    def append_many(self, source_city: str, target_city: str, source_groups, target_groups,
+                    amounts, channel: str) -> None:
+        '''Log transfers between one pair of cities, one per element of the group and amount lists.'''
+        if not len(amounts):
+            return
+        rows = self._reserve(len(amounts))
+        rows["tick"] = self.tick
+        rows["source_city"] = self.city_id(source_city)
+        rows["source_group_index"] = source_groups
+        rows["target_city"] = self.city_id(target_city)
+        rows["target_group_index"] = target_groups
+        rows["amount"] = amounts
+        rows["channel"] = CHANNEL_CODES[channel]
+
+    def append_columns(self, names: Sequence[str], columns: dict[str, np.ndarray]) -> None:
+        '''Log rows from columns whose city ids index names.'''
+        count = len(columns["amount"])
+        remap = np.array([self.city_id(name) for name in names], dtype=np.int32)
+        rows = self._reserve(count)
+        rows["tick"] = self.tick
+        for name in COLUMNS:
+            values = columns[name]
+            rows[name] = remap[values] if name in ("source_city", "target_city") else values
+
+    def extend(self, events) -> None:
+        '''Log GroupMigrationEvent objects, or every event of another log.'''
+        if isinstance(events, MigrationEventLog):
+            self.append_columns(events.names, {name: events.column(name) for name in COLUMNS})
+            return
+        for event in events:
+            self.append_many(event.source_city, event.target_city, [event.source_group_index],
+                             [event.target_group_index], [event.amount], event.channel)
+
+    def od_matrix(self) -> np.ndarray:
+        '''People moved from each city id (rows) to each city id (columns) this tick.'''
+        size = len(self.names)
+        flat = self.column("source_city").astype(np.int64) * size + self.column("target_city")
+        totals = np.bincount(flat, weights=self.column("amount"), minlength=size * size)
+        return totals.astype(np.int64).reshape(size, size)
+
+    def spill(self) -> None:
+        '''Append this tick's rows to spill_path, and any new names to its .names file.'''
+        directory = os.path.dirname(self.spill_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.spill_path, "ab") as handle:
+            self._rows[:self._length].tofile(handle)
+        if len(self.names) > self._spilled_names:
+            with open(f"{self.spill_path}.names", "w", encoding="utf-8") as handle:
+                json.dump(self.names, handle)
+            self._spilled_names = len(self.names)
+
+    def clear(self, tick: int | None = None) -> None:
+        '''Start logging tick (the one after the current by default),
+        spilling the finished one first if configured.'''
+        if self.spill_path is not None and self._length:
+            self.spill()
+        self._length = 0
+        self.tick = self.tick + 1 if tick is None else tick
+
+
+def read_spill(path) -> tuple[list[str], np.ndarray]:
+    '''City names and event records written by MigrationEventLog.spill.'''
+    with open(f"{path}.names", encoding="utf-8") as handle:
+        names = json.load(handle)
+    return names, np.fromfile(path, dtype=EVENT_DTYPE)
@@ -3,11 +3,13 @@
 from typing import TYPE_CHECKING, Sequence
 
 from model.migration.allocation import MigrationAllocator
-from model.migration.engines import IntercityMigrationEngine, IntergroupMigrationEngine
+from model.migration.engines import (BatchedIntergroupMigrationEngine, IntercityMigrationEngine,
+                                     IntergroupMigrationEngine)
+from model.migration.event_log import MigrationEventLog
+from model.migration.index import AttractivenessIndex
 from model.migration.options import MigrationOptions
 from model.protocols import DistanceProvider, NeutralDistanceProvider
 from model.migration.selectors import WeightedTargetSelector
-from model.migration.types import GroupMigrationEvent
 
 if TYPE_CHECKING:
     from model.city.city import City
@@ -27,6 +29,7 @@ class Migration:
         self.options = MigrationOptions(
             intergroup_rate=max(min(cfg.intergroup_rate, 1.0), 0.0),
             intercity_rate=max(min(cfg.intercity_rate, 1.0), 0.0),
+            intergroup_engine=cfg.intergroup_engine,
         )
         self.distance_provider = distance_provider or NeutralDistanceProvider()
 
@@ -35,7 +38,13 @@ class Migration:
             distance_provider=self.distance_provider,
         )
         self.allocator = MigrationAllocator(rng=self.rng)
-        self.intergroup_engine = IntergroupMigrationEngine(
+        if self.options.intergroup_engine == "batched":
+            intergroup_engine = BatchedIntergroupMigrationEngine
+        elif self.options.intergroup_engine == "loop":
+            intergroup_engine = IntergroupMigrationEngine
+        else:
+            raise ValueError(f"Unknown intergroup migration engine: {self.options.intergroup_engine!r}")
+        self.intergroup_engine = intergroup_engine(
             selector=self.selector,
             allocator=self.allocator,
         )
@@ -50,11 +59,13 @@ class Migration:
         rng,
         intergroup_rate: float,
         distance_provider: DistanceProvider | None = None,
+        engine: str = "loop",
     ) -> "Migration":
         """Create a service with only intergroup migration enabled."""
         return cls(
             rng=rng,
-            options=MigrationOptions(intergroup_rate=intergroup_rate, intercity_rate=0.0),
+            options=MigrationOptions(intergroup_rate=intergroup_rate, intercity_rate=0.0,
+                                     intergroup_engine=engine),
             distance_provider=distance_provider,
         )
 
@@ -84,17 +95,53 @@ class Migration:
         '''Uses the intercity engine's selector to choose a target city for migration.'''
         return self.intercity_engine.choose_target_city(source_city=source_city, candidates=candidates)
 
-    def migrate_within_city(self, city: "City") -> list[GroupMigrationEvent]:
-        '''Uses the intergroup engine to move migrants between groups inside one city.'''
+    def key_ids(self, keys: Sequence[str]):
+        '''Keys interned by the distance provider, for repeated batch lookups.'''
+        return self.selector.key_ids(keys)
+
+    def choose_target_index(
+        self,
+        index: AttractivenessIndex,
+        source_index: int,
+        keys: Sequence[str],
+    ) -> int | None:
+        '''Uses the intercity engine to choose a target from a sorted attractiveness index.'''
+        return self.intercity_engine.choose_target_index(index=index, source_index=source_index, keys=keys)
+
+    def choose_target_indices(
+        self,
+        index: AttractivenessIndex,
+        keys: Sequence[str],
+        sources: Sequence[int] | None = None,
+    ):
+        '''Uses the intercity engine to choose targets for many sources in one batch.'''
+        return self.intercity_engine.choose_target_indices(index=index, keys=keys, sources=sources)
+
+    def migrate_within_city(self, city: "City", log: MigrationEventLog | None = None,
+                            weeks: int = 1) -> MigrationEventLog:
+        '''Uses the intergroup engine to move migrants between groups inside one city.
+        Over several weeks the weekly rate compounds: 1 - (1 - rate) ** weeks.'''
+        rate = self.intergroup_rate
+        if weeks != 1:
+            rate = 1.0 - (1.0 - rate) ** weeks
         return self.intergroup_engine.migrate_within_city(
             city=city,
-            intergroup_rate=self.intergroup_rate,
+            intergroup_rate=rate,
+            log=log,
         )
 
-    def migrate_between_cities(self, source_city: "City", target_city: "City") -> list[GroupMigrationEvent]:
+    def migrate_between_cities(
+        self,
+        source_city: "City",
+        target_city: "City",
+        gap: float | None = None,
+        log: MigrationEventLog | None = None,
+    ) -> MigrationEventLog:
         '''Uses the intercity engine to move migrants between cities.'''
         return self.intercity_engine.migrate_between_cities(
             source_city=source_city,
             target_city=target_city,
             intercity_rate=self.intercity_rate,
+            gap=gap,
+            log=log,
         )
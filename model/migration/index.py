@@ -0,0 +1,86 @@
+"""Sorted attractiveness index for range-based target selection."""
+
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Sequence
+
+import numpy as np
+
+
+class AttractivenessIndex:
+    """Attractiveness of a fixed set of entities, sorted once per tick.
+
+    Entities more attractive than a source form a suffix of the sorted
+    order, and with neutral distance the cumulative gap weight over that
+    suffix comes from prefix sums, so each lookup is O(log n). The array
+    methods run the same lookups for many sources at once.
+    """
+
+    def __init__(self, values: Sequence[float]) -> None:
+        self.values = [float(value) for value in values]
+        self.order = sorted(range(len(self.values)), key=self.values.__getitem__)
+        self.sorted_values = [self.values[i] for i in self.order]
+        self.prefix = list(accumulate(self.sorted_values, initial=0.0))
+        self.order_array = np.array(self.order, dtype=np.int64)
+        self.sorted_array = np.array(self.sorted_values, dtype=np.float64)
+        self.value_array = np.array(self.values, dtype=np.float64)
+        self.prefix_array = np.array(self.prefix, dtype=np.float64)
+
+    @classmethod
+    def from_array(cls, values: np.ndarray) -> "AttractivenessIndex":
+        """Build the index from an array of scores, sorting with NumPy."""
+        index = cls.__new__(cls)
+        index.value_array = np.asarray(values, dtype=np.float64)
+        index.order_array = np.argsort(index.value_array, kind="stable")
+        index.sorted_array = index.value_array[index.order_array]
+        index.prefix_array = np.concatenate(([0.0], np.cumsum(index.sorted_array)))
+        index.values = index.value_array.tolist()
+        index.order = index.order_array.tolist()
+        index.sorted_values = index.sorted_array.tolist()
+        index.prefix = index.prefix_array.tolist()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def more_attractive(self, index: int) -> range:
+        """Sorted positions of every entity strictly more attractive than index."""
+        return range(bisect_right(self.sorted_values, self.values[index]), len(self.order))
+
+    def gap(self, source: int, target: int) -> float:
+        return self.values[target] - self.values[source]
+
+    def gaps(self, source: int, start: int) -> np.ndarray:
+        """Gaps from source to every sorted position from start on."""
+        return self.sorted_array[start:] - self.values[source]
+
+    def cumulative_gap(self, source: int, start: int, position: int) -> float:
+        """Sum of gaps from source to the sorted positions start..position inclusive."""
+        count = position + 1 - start
+        return self.prefix[position + 1] - self.prefix[start] - count * self.values[source]
+
+    def starts(self, sources: np.ndarray) -> np.ndarray:
+        """First sorted position more attractive than each source; len(self) when none is."""
+        return np.searchsorted(self.sorted_array, self.value_array[sources], side="right")
+
+    def cumulative_gaps(self, sources: np.ndarray, starts: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Array form of cumulative_gap."""
+        counts = positions + 1 - starts
+        return self.prefix_array[positions + 1] - self.prefix_array[starts] - counts * self.value_array[sources]
+
+    def search_gaps(self, sources: np.ndarray, starts: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+        """For each source, the first sorted position from its start whose cumulative
+        gap reaches its threshold (the last position if none does).
+
+        One binary search stepped for every source together.
+        """
+        lo = np.array(starts, dtype=np.int64)
+        hi = np.full(len(lo), len(self.order) - 1, dtype=np.int64)
+        active = lo < hi
+        while active.any():
+            mid = (lo + hi) // 2
+            reached = self.cumulative_gaps(sources, starts, mid) >= thresholds
+            hi = np.where(active & reached, mid, hi)
+            lo = np.where(active & ~reached, mid + 1, lo)
+            active = lo < hi
+        return lo
@@ -12,4 +12,5 @@ class MigrationOptions:
 
     intergroup_rate: float = 0.0
     intercity_rate: float = 0.0
+    intergroup_engine: str = "loop"  # "loop" or "batched"
 
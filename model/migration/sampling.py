@@ -0,0 +1,73 @@
+"""Batched weighted index samplers.
+
+Both samplers are built once from a weight vector and then turn any number
+of uniform draws into indices in one vectorized call, so every source that
+draws from the same candidate pool in a tick shares one table.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+
+class CumulativeSampler:
+    """Inverse-CDF sampling by binary search over cumulative weights.
+
+    A threshold t in [0, total] picks the first index whose running weight
+    reaches t, the same index a linear scan over the weights finds.
+    """
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.cumulative = np.cumsum(self.weights)
+        self.total = float(self.cumulative[-1]) if len(self.weights) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def indices(self, thresholds) -> np.ndarray:
+        """Index chosen by each threshold in [0, total]."""
+        found = np.searchsorted(self.cumulative, thresholds, side="left")
+        return np.minimum(found, len(self.weights) - 1)
+
+    def sample(self, uniforms) -> np.ndarray:
+        """Index chosen by each uniform draw in [0, 1)."""
+        return self.indices(np.asarray(uniforms, dtype=np.float64) * self.total)
+
+
+class AliasSampler:
+    """Vose's alias method: O(n) to build, O(1) per draw.
+
+    Each uniform draw picks a column by its integer part after scaling by n
+    and keeps the column or takes its alias by the fractional part.
+    """
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        weights = np.asarray(weights, dtype=np.float64)
+        self.total = float(weights.sum())
+        if len(weights) == 0 or self.total <= 0:
+            raise ValueError("AliasSampler needs a positive total weight")
+
+        n = len(weights)
+        scaled = (weights * (n / self.total)).tolist()
+        self.probability = np.ones(n, dtype=np.float64)
+        self.alias = np.arange(n, dtype=np.int64)
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left over is 1 up to rounding and keeps probability 1.
+
+    def __len__(self) -> int:
+        return len(self.alias)
+
+    def sample(self, uniforms) -> np.ndarray:
+        """Index chosen by each uniform draw in [0, 1)."""
+        scaled = np.asarray(uniforms, dtype=np.float64) * len(self.alias)
+        column = np.minimum(scaled.astype(np.int64), len(self.alias) - 1)
+        keep = scaled - column < self.probability[column]
+        return np.where(keep, column, self.alias[column])
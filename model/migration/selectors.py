@@ -2,7 +2,11 @@
 
 from typing import Callable, Sequence
 
-from model.protocols import DistanceProvider
+import numpy as np
+
+from model.core.random import EntityStream
+from model.protocols import DistanceProvider, NeutralDistanceProvider, batch_weights
+from model.migration.sampling import AliasSampler, CumulativeSampler
 from model.migration.types import T, WeightedTarget
 
 
@@ -17,21 +21,99 @@ class WeightedTargetSelector:
         """Return non-negative distance weight."""
         return max(self.distance_provider.weight(source_key, target_key), 0.0)
 
+    def distance_weights(self, source_key, target_keys) -> np.ndarray:
+        """Return non-negative distance weights to many targets in one provider call."""
+        return np.maximum(batch_weights(self.distance_provider, source_key, target_keys), 0.0)
+
+    def key_ids(self, keys: Sequence[str]):
+        """Keys as the provider's integer ids when it interns them, else unchanged."""
+        key_ids = getattr(self.distance_provider, "key_ids", None)
+        return key_ids(keys) if key_ids is not None else list(keys)
+
+    @property
+    def distance_neutral(self) -> bool:
+        """True when distance never changes a candidate's weight."""
+        return isinstance(self.distance_provider, NeutralDistanceProvider)
+
+    def draw_threshold(self, total: float) -> float:
+        """Draw a point in [0, total] using RNG, or the midpoint without one."""
+        if self.rng is not None and hasattr(self.rng, "uniform"):
+            return float(self.rng.uniform(0.0, total))
+        return total / 2.0
+
+    def draw_thresholds(self, totals) -> np.ndarray:
+        """Array form of draw_threshold: one point in [0, total] per total, drawn in order."""
+        totals = np.asarray(totals, dtype=np.float64)
+        if isinstance(self.rng, (np.random.Generator, EntityStream)):
+            return self.rng.uniform(0.0, totals)
+        return np.array([self.draw_threshold(total) for total in totals.tolist()], dtype=np.float64)
+
+    def choose_from_index(self, index, sources: np.ndarray) -> np.ndarray:
+        """For each source, an entity more attractive than it drawn by gap weight; -1 for none.
+
+        Draws come from index's prefix sums, one threshold per source with a
+        candidate taken in one call in source order.
+        """
+        starts = index.starts(sources)
+        ends = np.full(len(sources), len(index) - 1, dtype=np.int64)
+        totals = index.cumulative_gaps(sources, starts, ends)
+        chosen = np.full(len(sources), -1, dtype=np.int64)
+        drawn = (starts < len(index)) & (totals > 0)
+        if drawn.any():
+            thresholds = self.draw_thresholds(totals[drawn])
+            positions = index.search_gaps(sources[drawn], starts[drawn], thresholds)
+            chosen[drawn] = index.order_array[positions]
+        return chosen
+
     def weighted_choice_index(self, weights: Sequence[float]) -> int | None:
         """Select index from non-negative weights using RNG."""
-        total = sum(weights)
-        if total <= 0:
+        sampler = CumulativeSampler(weights)
+        if len(sampler) == 0 or sampler.total <= 0:
             return None
-        if self.rng is not None and hasattr(self.rng, "uniform"):
-            threshold = float(self.rng.uniform(0.0, total))
-        else:
-            threshold = total / 2.0
-        running = 0.0
-        for idx, weight in enumerate(weights):
-            running += weight
-            if threshold <= running:
-                return idx
-        return len(weights) - 1
+        return int(sampler.indices(self.draw_threshold(sampler.total)))
+
+    def weighted_choice_indices(self, weights: Sequence[float], count: int,
+                                method: str = "cumulative") -> np.ndarray | None:
+        """Draw count indices from one pool of non-negative weights in one call.
+
+        method "cumulative" binary-searches cumulative weights (O(log n) per
+        draw); "alias" builds a Vose alias table (O(1) per draw).
+        """
+        if method == "cumulative":
+            sampler = CumulativeSampler(weights)
+            if len(sampler) == 0 or sampler.total <= 0:
+                return None
+            return sampler.indices(self.draw_thresholds(np.full(count, sampler.total)))
+        if method == "alias":
+            weights = np.asarray(weights, dtype=np.float64)
+            if len(weights) == 0 or weights.sum() <= 0:
+                return None
+            return AliasSampler(weights).sample(self.draw_thresholds(np.ones(count)))
+        raise ValueError(f"Unknown weighted sampling method: {method!r}")
+
+    def candidate_weights(
+        self,
+        source_attractiveness: float,
+        source_key,
+        attractiveness: np.ndarray,
+        keys=None,
+        exclude: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Indexes and weights of the candidates with a positive gap-times-distance weight.
+
+        keys (one per candidate) are only needed when distance isn't neutral.
+        """
+        gap = np.asarray(attractiveness, dtype=np.float64) - source_attractiveness
+        if exclude is not None:
+            gap[exclude] = 0.0
+        indices = np.flatnonzero(gap > 0)
+        weights = gap[indices]
+        if not self.distance_neutral and len(indices):
+            target_keys = keys[indices] if isinstance(keys, np.ndarray) else [keys[i] for i in indices.tolist()]
+            weights = weights * self.distance_weights(source_key, target_keys)
+            keep = weights > 0
+            indices, weights = indices[keep], weights[keep]
+        return indices, weights
 
     def build_weighted_candidates(
         self,
@@ -43,19 +125,19 @@ class WeightedTargetSelector:
         include_candidate: Callable[[int, T], bool] | None = None,
     ) -> list[WeightedTarget[T]]:
         """Build weighted candidates from attractiveness gap and distance."""
-        weighted_candidates: list[WeightedTarget[T]] = []
-        for idx, candidate in enumerate(candidates):
-            if include_candidate is not None and not include_candidate(idx, candidate):
-                continue
-            gap = attractiveness_of(candidate) - source_attractiveness
-            if gap <= 0:
-                continue
-            weight = gap * self.distance_weight(source_key, key_of(candidate))
-            if weight > 0:
-                weighted_candidates.append(
-                    WeightedTarget(index=idx, candidate=candidate, weight=weight)
-                )
-        return weighted_candidates
+        if include_candidate is not None:
+            included = [idx for idx, candidate in enumerate(candidates) if include_candidate(idx, candidate)]
+            pool = [candidates[idx] for idx in included]
+        else:
+            included, pool = None, candidates
+        attractiveness = np.fromiter((attractiveness_of(candidate) for candidate in pool),
+                                     dtype=np.float64, count=len(pool))
+        keys = None if self.distance_neutral else [key_of(candidate) for candidate in pool]
+        indices, weights = self.candidate_weights(source_attractiveness, source_key, attractiveness, keys)
+        return [
+            WeightedTarget(index=idx if included is None else included[idx], candidate=pool[idx], weight=weight)
+            for idx, weight in zip(indices.tolist(), weights.tolist())
+        ]
 
     def find_target_groups(
         self,
@@ -65,11 +147,23 @@ class WeightedTargetSelector:
         source_index: int,
     ):
         """Return eligible weighted target groups for intracity migration."""
-        return self.build_weighted_candidates(
-            source_attractiveness=source_attractiveness,
-            source_key=source_city_key,
-            candidates=groups,
-            attractiveness_of=lambda group: group.migration_attractiveness,
-            key_of=lambda _group: source_city_key,
-            include_candidate=lambda idx, _group: idx != source_index,
-        )
+        indices, weights = self.target_group_weights(source_attractiveness, source_city_key,
+                                                     groups, source_index)
+        return [
+            WeightedTarget(index=idx, candidate=groups[idx], weight=weight)
+            for idx, weight in zip(indices.tolist(), weights.tolist())
+        ]
+
+    def target_group_weights(
+        self,
+        source_attractiveness: float,
+        source_city_key: str,
+        groups,
+        source_index: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Array form of find_target_groups: indexes and weights of the target groups."""
+        attractiveness = np.fromiter((group.migration_attractiveness for group in groups),
+                                     dtype=np.float64, count=len(groups))
+        keys = None if self.distance_neutral else [source_city_key] * len(groups)
+        return self.candidate_weights(source_attractiveness, source_city_key, attractiveness,
+                                      keys, exclude=source_index)
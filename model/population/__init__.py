@@ -1 +1,2 @@
-from .group import PopulationGroup
\ No newline at end of file
+from .group import PopulationGroup
+from .group_store import PopulationStore
\ No newline at end of file
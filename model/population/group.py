@@ -1,4 +1,5 @@
 from model.core.random import _sample_normal
+from model.core.array_columns import _as_list
 from model.population.group_properties import (PopulationGroupProperties,
                                                PopulationGroupParams,
                                                PopulationGroupState)
@@ -6,9 +7,18 @@ from model.population.group_properties import (PopulationGroupProperties,
 
 class PopulationGroup(PopulationGroupProperties):
     '''Population group representing a demographic segment of a city's population.'''
+
+    __slots__ = ("rng", "p", "state")
+
+    # Rates shared by every group; the columnar store copies them into its columns.
+    base_birth_rate = 0.0002
+    base_death_rate = 0.00015
+    base_sickness_rate = 0.025
+
     def __init__(self, params, rng):
         self.rng = rng
         self.p = params
+        self.aggregates = None
 
         self.state = PopulationGroupState()
         self.state.size = self.p.size
@@ -17,11 +27,7 @@ class PopulationGroup(PopulationGroupProperties):
         self.sick_rate = 0.02
         self.sick = 0
 
-        self.base_birth_rate = 0.0002
-        self.base_death_rate = 0.00015
-
         self.state.employable = 0.7 - self.sick_rate
-        self.base_sickness_rate = 0.025
         self.state.employed = 0
 
     @classmethod
@@ -36,10 +42,26 @@ class PopulationGroup(PopulationGroupProperties):
             rng=rng,
         )
 
-
-    def tick(self): # Simulate one time step - e.g. one week for now
-
-        self.update_demographics()
+    @classmethod
+    def from_arrays(cls, size, base_healthcare, healthcare_capacity, rngs,
+                    education_level=None) -> list["PopulationGroup"]:
+        '''Build many groups at once from parallel columns (arrays or lists).'''
+        if education_level is None:
+            education_level = [None] * len(size)
+        return [
+            cls(params=PopulationGroupParams(size=s,
+                                             base_healthcare=h,
+                                             healthcare_capacity=c,
+                                             education_level=e),
+                rng=rng)
+            for s, h, c, e, rng in zip(_as_list(size), _as_list(base_healthcare),
+                                       _as_list(healthcare_capacity), education_level, rngs)
+        ]
+
+
+    def tick(self, weeks: int = 1): # Simulate one time step - one week, or several aggregated
+
+        self.update_demographics(weeks)
 
         self.update_sick()
         self.update_healthcare()
@@ -56,18 +78,21 @@ class PopulationGroup(PopulationGroupProperties):
 
         self.state.healthcare = min(self.p.base_healthcare * healthcare_modifier, 1.0)
 
-    def update_demographics(self):
+    def update_demographics(self, weeks: int = 1):
 
         death_rate = self.base_death_rate * (2.001 - (2 * self.state.healthcare))
         birth_rate = self.base_birth_rate * max((1.0 - (self.employment_rate * 0.15 - self.state.healthcare * 0.1)), 0)
 
-        expected_births = self.p.size * birth_rate
-        expected_deaths = self.p.size * death_rate
+        expected_births = self.p.size * birth_rate * weeks
+        expected_deaths = self.p.size * death_rate * weeks
 
-        self.births = _sample_normal(expected=expected_births, rng=self.rng)
-        self.deaths = _sample_normal(expected=expected_deaths, rng=self.rng)
+        # Written around the setters like the rest of the tick; the city's
+        # tick_groups applies the change to its aggregates.
+        state = self.state
+        state.births = _sample_normal(expected=expected_births, rng=self.rng)
+        state.deaths = _sample_normal(expected=expected_deaths, rng=self.rng)
 
-        self.size = max(0, self.size + self.births - self.deaths)
+        state.size = max(0, state.size + state.births - state.deaths)
 
     def update_sick(self):
         self.sick = min(self.size * self.base_sickness_rate * (1-self.state.healthcare), self.size)
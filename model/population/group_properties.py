@@ -2,14 +2,14 @@
 
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class PopulationGroupParams:
     size: int
     base_healthcare: float
     healthcare_capacity: int
     education_level: str | None = None
 
-@dataclass
+@dataclass(slots=True)
 class PopulationGroupState:
     size: int = 0
     healthcare: float = 0.0
@@ -23,17 +23,26 @@ class PopulationGroupState:
     money: float = 0.0
     education: float = 1.0
 
-@dataclass
 class PopulationGroupProperties:
     '''Property accessors for population groups.'''
 
+    # aggregates: CityAggregates of the owning city, set when the city is built.
+    __slots__ = ("aggregates",)
+
+    def _set_tracked(self, name, value):
+        '''Write a state field the city sums, keeping the cached sums current.'''
+        if self.aggregates is None:
+            setattr(self.state, name, value)
+        else:
+            self.aggregates.set_group_field(self, name, value)
+
     @property
     def size(self):
         return self.state.size
 
     @size.setter
     def size(self, value):
-        self.state.size = value
+        self._set_tracked("size", value)
 
     @property
     def healthcare_capacity(self):
@@ -48,14 +57,14 @@ class PopulationGroupProperties:
         return self.state.births
     @births.setter
     def births(self, value):
-        self.state.births = value
+        self._set_tracked("births", value)
 
     @property
     def deaths(self):
         return self.state.deaths
     @deaths.setter
     def deaths(self, value):
-        self.state.deaths = value
+        self._set_tracked("deaths", value)
 
     @property
     def money(self):
@@ -69,7 +78,7 @@ class PopulationGroupProperties:
         return self.state.healthcare
     @healthcare.setter
     def healthcare(self, value):
-        self.state.healthcare = value
+        self._set_tracked("healthcare", value)
 
     @property
     def sick(self):
@@ -78,6 +87,13 @@ class PopulationGroupProperties:
     def sick(self, value):
         self.state.sick = value
 
+    @property
+    def sick_rate(self):
+        return self.state.sick_rate
+    @sick_rate.setter
+    def sick_rate(self, value):
+        self.state.sick_rate = value
+
     @property
     def migration_attractiveness(self):
         return (self.state.healthcare * 0.3) + (self.employment_rate * 0.2)
@@ -92,7 +108,7 @@ class PopulationGroupProperties:
         return self.state.employable
     @employable.setter
     def employable(self, value):
-        self.state.employable = value
+        self._set_tracked("employable", value)
 
     @property
     def employed(self):
@@ -100,7 +116,7 @@ class PopulationGroupProperties:
 
     @employed.setter
     def employed(self, value):
-        self.state.employed = value
+        self._set_tracked("employed", value)
 
     @property
     def education(self):
@@ -0,0 +1,218 @@
+'''Columnar (structure-of-arrays) storage for population groups.
+
+The store keeps every group's mutable state in NumPy columns so the weekly
+demographic, sickness, healthcare and employment updates can be evaluated
+for all groups at once. Groups bound to a store keep working as normal
+objects: their ``state`` is replaced by a row view onto the columns.
+
+Binding trades memory and single-field reads for bulk updates. A bound
+group keeps its object and params and gains a row in every column, and
+reads through the row view cost more than plain attribute access.
+'''
+
+import numpy as np
+
+from model.core.random import RandomStreams, _sample_normal_array
+from model.population.group_properties import PopulationGroupState
+
+
+STATE_DTYPES = {
+    "size": np.int64,
+    "healthcare": np.float64,
+    "healthcare_capacity": np.int64,
+    "sick_rate": np.float64,
+    "sick": np.float64,
+    "births": np.int64,
+    "deaths": np.int64,
+    "employable": np.float64,
+    "employed": np.int64,
+    "money": np.float64,
+    "education": np.float64,
+}
+
+# Per-group constants copied from params / instance attributes at bind time.
+PARAM_DTYPES = {
+    "initial_size": np.int64,
+    "base_healthcare": np.float64,
+    "capacity": np.float64,
+    "base_birth_rate": np.float64,
+    "base_death_rate": np.float64,
+    "base_sickness_rate": np.float64,
+}
+
+
+class GroupRowState:
+    '''PopulationGroupState-compatible view onto one row of a PopulationStore.'''
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: "PopulationStore", row: int) -> None:
+        self.store = store
+        self.row = row
+
+    def __reduce__(self):
+        # A row in shared memory pickles as a reference to it; otherwise as a
+        # detached copy of the row rather than the whole store.
+        if self.store.shared is not None:
+            return self.store.shared.reduce_row(GroupRowState, self.row)
+        return (PopulationGroupState, tuple(getattr(self, name) for name in STATE_DTYPES))
+
+
+def _column_property(name: str) -> property:
+    def fget(self):
+        return self.store.columns[name].item(self.row)
+
+    def fset(self, value):
+        self.store.columns[name][self.row] = value
+
+    return property(fget, fset)
+
+
+for _name in STATE_DTYPES:
+    setattr(GroupRowState, _name, _column_property(_name))
+
+
+class PopulationStore:
+    '''Owns the columns for a set of population groups and ticks them in bulk.'''
+
+    def __init__(self, count: int, rng, columns: dict[str, np.ndarray] | None = None) -> None:
+        # Either a shared numpy Generator or a RandomStreams service.
+        self.rng = rng
+        self.count = count
+        self.entity_ids = np.arange(count, dtype=np.int64)
+        self.stream_kind = "group"
+        # columns may be preallocated elsewhere, e.g. in shared memory.
+        self.columns: dict[str, np.ndarray] = columns if columns is not None else {
+            name: np.zeros(count, dtype=dtype)
+            for name, dtype in {**STATE_DTYPES, **PARAM_DTYPES}.items()
+        }
+        # SharedColumns block holding columns, set by SharedWorldState.
+        self.shared = None
+        self.groups: list = []
+
+    @classmethod
+    def from_groups(cls, groups, rng) -> "PopulationStore":
+        '''Copy the state of existing groups into a new store and bind them to it.'''
+        groups = list(groups)
+        store = cls(count=len(groups), rng=rng)
+        store.bind(groups)
+        return store
+
+    def bind(self, groups) -> None:
+        '''Move each group's state into its row and swap in a row view.'''
+        c = self.columns
+        for row, group in enumerate(groups):
+            for name in STATE_DTYPES:
+                c[name][row] = getattr(group.state, name)
+            c["initial_size"][row] = group.p.size
+            c["base_healthcare"][row] = group.p.base_healthcare
+            c["capacity"][row] = group.p.healthcare_capacity
+            c["base_birth_rate"][row] = group.base_birth_rate
+            c["base_death_rate"][row] = group.base_death_rate
+            c["base_sickness_rate"][row] = group.base_sickness_rate
+            if hasattr(group.rng, "entity_id"):
+                self.entity_ids[row] = group.rng.entity_id
+                self.stream_kind = group.rng.kind
+            group.state = GroupRowState(self, row)
+        self.groups = groups
+        self._bind_aggregates()
+
+    def _bind_aggregates(self) -> None:
+        '''Record the runs of rows belonging to each city's CityAggregates.'''
+        starts, owners = [], []
+        for row, group in enumerate(self.groups):
+            owner = getattr(group, "aggregates", None)
+            if not owners or owner is not owners[-1]:
+                starts.append(row)
+                owners.append(owner)
+        self.aggregate_starts = np.array(starts, dtype=np.intp)
+        self.aggregate_owners = owners
+
+    def _aggregated(self, rows: slice) -> np.ndarray:
+        '''Per row, the fields CityAggregates sums and the row's attractiveness.'''
+        c = {name: self.columns[name][rows] for name in ("size", "births", "deaths",
+                                                         "employable", "employed", "healthcare")}
+        size = c["size"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            employment_rate = np.where(size > 0, c["employed"] / size, 0.0)
+        return np.stack([size, c["births"], c["deaths"], c["employable"],
+                         c["healthcare"] * 0.3 + employment_rate * 0.2])
+
+    def _report_aggregates(self, before: np.ndarray, rows: slice) -> None:
+        '''Apply the change since before to the aggregates of the cities in rows.'''
+        start, stop, _ = rows.indices(self.count)
+        if not self.aggregate_owners or start >= stop:
+            return
+        # Only the runs of rows overlapping the slice, the first clipped to its start.
+        first = int(np.searchsorted(self.aggregate_starts, start, side="right")) - 1
+        last = int(np.searchsorted(self.aggregate_starts, stop, side="left"))
+        starts = self.aggregate_starts[first:last] - start
+        starts[0] = 0
+        change = np.add.reduceat(self._aggregated(rows) - before, starts, axis=1)
+        for owner, (size, births, deaths, employable, attractiveness) in zip(
+                self.aggregate_owners[first:last], change.T.tolist()):
+            if owner is not None:
+                owner.add({"size": int(size), "births": int(births), "deaths": int(deaths),
+                           "employable": employable}, attractiveness)
+
+    def tick(self, rows: slice | None = None, weeks: np.ndarray | None = None) -> None:
+        '''Run PopulationGroup.tick for every group (or a row range) in one pass.
+
+        With keyed streams the draws match the per-object path exactly. With a
+        shared generator births and deaths are drawn interleaved per group, so
+        ticking a single city's rows consumes it like the per-object loop.
+
+        weeks gives per row the number of weeks to advance, as
+        PopulationGroup.tick(weeks) does; rows with 0 weeks are left as they were.
+        '''
+        rows = rows if rows is not None else slice(0, self.count)
+        before = self._aggregated(rows) if self.groups else None
+        c = {name: column[rows] for name, column in self.columns.items()}
+        held = None
+        if weeks is not None:
+            held = np.flatnonzero(weeks == 0)
+            saved = {name: c[name][held] for name in STATE_DTYPES}
+        size = c["size"]
+        healthcare = c["healthcare"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Demographics
+            employment_rate = np.where(size > 0, c["employed"] / size, 0.0)
+            death_rate = c["base_death_rate"] * (2.001 - (2 * healthcare))
+            birth_rate = c["base_birth_rate"] * np.maximum(
+                1.0 - (employment_rate * 0.15 - healthcare * 0.1), 0
+            )
+            expected = np.column_stack((c["initial_size"] * birth_rate,
+                                        c["initial_size"] * death_rate))
+            if weeks is not None:
+                expected *= weeks[:, None]
+            if isinstance(self.rng, RandomStreams):
+                drawn = self.rng.sample_normal(self.stream_kind, self.entity_ids[rows], expected)
+            else:
+                drawn = _sample_normal_array(expected=expected, rng=self.rng)
+            c["births"][:] = drawn[:, 0]
+            c["deaths"][:] = drawn[:, 1]
+            size[:] = np.maximum(0, size + drawn[:, 0] - drawn[:, 1])
+
+            # Sickness
+            sick = np.minimum(size * c["base_sickness_rate"] * (1 - healthcare), size)
+            sick_rate = np.where(size > 0, sick / size, 0.0)
+            c["sick"][:] = sick
+            c["sick_rate"][:] = sick_rate
+
+            # Healthcare
+            modifier = np.where(sick / c["capacity"] <= 1.0,
+                                1.05,
+                                (c["capacity"] / size) ** 1.3)
+            healthcare[:] = np.minimum(c["base_healthcare"] * modifier, 1.0)
+
+        # Employment
+        c["employable"][:] = 0.7 - sick_rate
+
+        if held is not None and len(held):
+            for name, values in saved.items():
+                c[name][held] = values
+
+        # The rows were written around the group setters.
+        if before is not None:
+            self._report_aggregates(before, rows)
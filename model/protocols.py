@@ -1,6 +1,9 @@
 """Distance weighting protocols for migration."""
 
-from typing import Protocol
+from typing import Protocol, Sequence
+
+import numpy as np
+
 from .location_service import LocationService
 
 class DistanceProvider(Protocol):
@@ -10,15 +13,145 @@ class DistanceProvider(Protocol):
         """Return multiplicative distance weight for a source->target pair."""
 
 
+def batch_weights(provider: DistanceProvider, source_key, target_keys) -> np.ndarray:
+    """Weights from source to each target, in one call when the provider has weights()."""
+    weights = getattr(provider, "weights", None)
+    if callable(weights):
+        return np.asarray(weights(source_key, target_keys), dtype=np.float64)
+    return np.array([provider.weight(source_key, key) for key in target_keys], dtype=np.float64)
+
+
+def top_weights(weights: np.ndarray, k: int | None) -> tuple[np.ndarray, np.ndarray]:
+    """Positions and values of the up to k largest positive weights, best first.
+
+    Ties go to the earlier position.
+    """
+    candidates = np.flatnonzero(weights > 0)
+    if k is not None and len(candidates) > k:
+        kth = np.partition(weights[candidates], len(candidates) - k)[len(candidates) - k]
+        candidates = candidates[weights[candidates] >= kth]
+    candidates = candidates[np.lexsort((candidates, -weights[candidates]))][:k]
+    return candidates, weights[candidates]
+
+
+def nearest_sources(provider: DistanceProvider, target_key, source_keys, k: int | None):
+    """The up to k sources weighing most towards target, as top_weights() returns them.
+
+    Uses the provider's nearest() when it has one; zero-weight sources are left out.
+    """
+    nearest = getattr(provider, "nearest", None)
+    if callable(nearest):
+        return nearest(target_key, source_keys, k)
+    weights = np.array([provider.weight(source, target_key) for source in source_keys], dtype=np.float64)
+    return top_weights(weights, k)
+
+
 class NeutralDistanceProvider(DistanceProvider):
     """Default distance provider with no friction."""
 
     def weight(self, source_key: str, target_key: str) -> float:
         return 1.0
 
+    def weights(self, source_key, target_keys) -> np.ndarray:
+        return np.ones(len(target_keys), dtype=np.float64)
+
+    def nearest(self, target_key, source_keys, k) -> tuple[np.ndarray, np.ndarray]:
+        count = len(source_keys) if k is None else min(k, len(source_keys))
+        return np.arange(count), np.ones(count, dtype=np.float64)
+
+
 class EuclideanDistanceProvider(DistanceProvider):
-    def __init__(self, location_service: LocationService):
+    """Friction from straight-line distance between located entities.
+
+    weight = exp(-distance / scale). Weights for every pair are computed
+    once into a matrix indexed by the location service's integer ids. Above
+    max_dense entities, rows are computed in blocks on first use instead,
+    keeping the max_blocks most recently built.
+    """
+
+    ROW_CHUNK_ELEMENTS = 1 << 20
+
+    def __init__(self, location_service: LocationService, scale: float = 100.0,
+                 max_dense: int = 4096, block_size: int = 256, max_blocks: int = 64):
+        if scale <= 0:
+            raise ValueError("scale must be positive")
         self.location_service = location_service
+        self.scale = scale
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.coords = location_service.coordinates
+        self.matrix = self._rows(0, len(self.coords)) if len(self.coords) <= max_dense else None
+        self._blocks: dict[int, np.ndarray] = {}
+
+    def _rows(self, start: int, stop: int) -> np.ndarray:
+        """Weight rows for sources start..stop, a few rows at a time.
+
+        Each step's temporaries hold at most ROW_CHUNK_ELEMENTS values, so
+        building the dense matrix doesn't need an (n, n, 2) difference array.
+        """
+        x, y = self.coords[:, 0], self.coords[:, 1]
+        rows = np.empty((stop - start, len(x)), dtype=np.float64)
+        step = max(1, self.ROW_CHUNK_ELEMENTS // max(len(x), 1))
+        for lo in range(start, stop, step):
+            hi = min(lo + step, stop)
+            dx = x[lo:hi, None] - x
+            dy = y[lo:hi, None] - y
+            out = rows[lo - start:hi - start]
+            np.sqrt(dx * dx + dy * dy, out=out)
+            np.divide(out, -self.scale, out=out)
+            np.exp(out, out=out)
+        return rows
+
+    def _row(self, source: int) -> np.ndarray:
+        if self.matrix is not None:
+            return self.matrix[source]
+        block = source // self.block_size
+        if block not in self._blocks:
+            if len(self._blocks) >= self.max_blocks:
+                del self._blocks[next(iter(self._blocks))]
+            start = block * self.block_size
+            self._blocks[block] = self._rows(start, min(start + self.block_size, len(self.coords)))
+        return self._blocks[block][source % self.block_size]
+
+    def key_ids(self, keys: Sequence) -> np.ndarray:
+        """Integer ids for keys; pass these to weights() to skip name lookups."""
+        ids = self.location_service.ids
+        return np.array([ids[key] for key in keys], dtype=np.int64)
+
+    def _id(self, key) -> int:
+        return key if isinstance(key, (int, np.integer)) else self.location_service.ids[key]
 
     def distance(self, from_entity: str, to_entity: str) -> float:
-        pass
+        source = self.coords[self.location_service.key_id(from_entity)]
+        target = self.coords[self.location_service.key_id(to_entity)]
+        return float(np.hypot(*(source - target)))
+
+    def weight(self, source_key, target_key) -> float:
+        return float(self._row(self._id(source_key))[self._id(target_key)])
+
+    def weights(self, source_key, target_keys) -> np.ndarray:
+        """Weights from source to every target; targets may be an id array or keys."""
+        targets = target_keys
+        if not isinstance(targets, np.ndarray):
+            targets = self.key_ids(targets)
+        return self._row(self._id(source_key))[targets]
+
+    def nearest(self, target_key, source_keys, k) -> tuple[np.ndarray, np.ndarray]:
+        """The k nearest sources, from coordinates rather than full weight rows."""
+        sources = source_keys
+        if not isinstance(sources, np.ndarray):
+            sources = self.key_ids(sources)
+        delta = self.coords[sources] - self.coords[self._id(target_key)]
+        return top_weights(np.exp(-np.sqrt((delta ** 2).sum(axis=1)) / self.scale), k)
+
+
+def distance_provider_from_cfg(cfg: dict | None, cities) -> DistanceProvider:
+    """Build the provider named by cfg["distance_mode"] for a set of cities."""
+    cfg = cfg or {}
+    mode = cfg.get("distance_mode", "neutral")
+    if mode == "neutral":
+        return NeutralDistanceProvider()
+    if mode == "euclidean":
+        return EuclideanDistanceProvider(LocationService.from_cities(cities),
+                                         scale=cfg.get("distance_scale", 100.0))
+    raise ValueError(f"Unknown distance mode: {mode!r}")
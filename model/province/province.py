@@ -1,7 +1,10 @@
 """Province model and intercity migration orchestration."""
 
+import os
 from dataclasses import dataclass, field
-from model.migration import Migration
+from model.core.profiler import NULL_PROFILER
+from model.migration import AttractivenessIndex, Migration
+from model.protocols import distance_provider_from_cfg
 from model.province.province_properties import (ProvinceParams,
                                                 ProvinceState,
                                                 ProvinceProperties)
@@ -10,16 +13,23 @@ from model.province.province_properties import (ProvinceParams,
 class Province(ProvinceProperties):
     """Province object owning a list of cities."""
 
+    profiler = NULL_PROFILER
+
     def __init__(self, cfg: dict, rng, params: ProvinceParams) -> None:
         self.rng = rng
         self.cfg = cfg
         self.p = params
         self.state = ProvinceState()
 
-        intercity_rate = self.cfg.get("migration", {}).get("intercity_rate", 0.0001)
+        migration_cfg = self.cfg.get("migration", {})
+        if migration_cfg.get("spill_dir") is not None:
+            self.state.migrations.spill_path = os.path.join(migration_cfg["spill_dir"],
+                                                            f"{self.p.name}.province.events")
+        intercity_rate = migration_cfg.get("intercity_rate", 0.0001)
         self.migration = Migration.for_intercity(
             rng=self.rng,
             intercity_rate=intercity_rate,
+            distance_provider=distance_provider_from_cfg(migration_cfg, self.p.cities),
         )
 
     @classmethod
@@ -36,18 +46,38 @@ class Province(ProvinceProperties):
         )
 
 
-    def tick(self) -> None:
+    def tick(self, tick_groups: bool = True, week: int | None = None) -> None:
         '''Runs one time step for the province, and all cities within it.'''
         for city in self.p.cities:
-            city.tick()
-        self.run_migrations()
+            city.tick(tick_groups=tick_groups, week=week)
+        with self.profiler.phase("province", "migration"):
+            self.run_migrations(week)
+        self.profiler.count("province", "migration_events", len(self.state.migrations))
+
+    def run_migrations(self, week: int | None = None) -> None:
+        """Run basic intercity migration from less to more attractive cities.
 
-    def run_migrations(self) -> None:
-        """Run basic intercity migration from less to more attractive cities."""
-        self.state.migrations = []
-        if not self.cfg.get("migration", {}).get("enabled", True):
+        migration.engine "indexed" scores every city once per tick and picks
+        targets from a sorted index; "batched" also draws every city's target
+        from that index in one call before any city moves; "loop" rescans
+        every pair with live scores.
+        """
+        self.state.migrations.clear(week)
+        migration_cfg = self.cfg.get("migration", {})
+        if not migration_cfg.get("enabled", True):
             return
 
+        engine = migration_cfg.get("engine", "loop")
+        if engine == "indexed":
+            self._run_indexed_migrations()
+        elif engine == "batched":
+            self._run_batched_migrations()
+        elif engine == "loop":
+            self._run_loop_migrations()
+        else:
+            raise ValueError(f"Unknown intercity migration engine: {engine!r}")
+
+    def _run_loop_migrations(self) -> None:
         for source_city in self.p.cities:
             candidates = [
                 city
@@ -61,8 +91,36 @@ class Province(ProvinceProperties):
             target_city = self.migration.choose_target_city(source_city, candidates)
             if target_city is None:
                 continue
-            events = self.migration.migrate_between_cities(source_city, target_city)
-            if not events:
+            self.migration.migrate_between_cities(source_city, target_city, log=self.state.migrations)
+
+    def _run_indexed_migrations(self) -> None:
+        cities = self.p.cities
+        index = AttractivenessIndex([city.migration_attractiveness for city in cities])
+        keys = self.migration.key_ids([city.name for city in cities])
+
+        for source_index, source_city in enumerate(cities):
+            target_index = self.migration.choose_target_index(index, source_index, keys)
+            if target_index is None:
                 continue
+            self.migration.migrate_between_cities(
+                source_city,
+                cities[target_index],
+                gap=index.gap(source_index, target_index),
+                log=self.state.migrations,
+            )
+
+    def _run_batched_migrations(self) -> None:
+        cities = self.p.cities
+        index = AttractivenessIndex([city.migration_attractiveness for city in cities])
+        keys = self.migration.key_ids([city.name for city in cities])
+        targets = self.migration.choose_target_indices(index, keys)
 
-            self.state.migrations.extend(events)
+        for source_index, target_index in enumerate(targets.tolist()):
+            if target_index < 0:
+                continue
+            self.migration.migrate_between_cities(
+                cities[source_index],
+                cities[target_index],
+                gap=index.gap(source_index, target_index),
+                log=self.state.migrations,
+            )
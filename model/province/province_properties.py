@@ -1,7 +1,7 @@
 '''Property accessors, state and params for province objects'''
 
 from dataclasses import dataclass, field
-from model.migration import GroupMigrationEvent
+from model.migration import MigrationEventLog
 
 @dataclass
 class ProvinceParams:
@@ -16,7 +16,7 @@ class ProvinceParams:
 class ProvinceState:
     """Mutable province-level runtime state."""
 
-    migrations: list[GroupMigrationEvent] = field(default_factory=list)
+    migrations: MigrationEventLog = field(default_factory=MigrationEventLog)
 
 @dataclass
 class ProvinceProperties:
@@ -33,6 +33,6 @@ class ProvinceProperties:
         return self.p.area
 
     @property
-    def migrations(self) -> list[GroupMigrationEvent]:
+    def migrations(self) -> MigrationEventLog:
         """Read-only log of intercity migration events for the latest tick."""
         return self.state.migrations
@@ -0,0 +1,71 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from model.migration import Migration
+from model.population import PopulationGroup
+
+
+def make_city(count, seed, empty=None):
+    rng = np.random.default_rng(seed)
+    groups = [
+        PopulationGroup.from_dict({"size": int(size), "base_healthcare": float(healthcare),
+                                   "healthcare_capacity": 1000}, rng=None)
+        for size, healthcare in zip(rng.integers(500, 5000, count), rng.random(count))
+    ]
+    for group, share in zip(groups, rng.random(count)):
+        group.state.employed = int(group.size * share * 0.7)
+    if empty is not None:
+        groups[empty].size = 0
+        groups[empty].state.employed = 0
+    return SimpleNamespace(name="C", populations=groups)
+
+
+class BatchedIntergroupMigrationTests(unittest.TestCase):
+    def migrate(self, city, engine="batched", seed=2, rate=0.01):
+        migration = Migration.for_intergroup(rng=np.random.default_rng(seed), intergroup_rate=rate,
+                                             engine=engine)
+        return migration.migrate_within_city(city)
+
+    def test_moves_conserve_population_toward_more_attractive_groups(self):
+        city = make_city(60, seed=1, empty=3)
+        before = [group.size for group in city.populations]
+        # An empty group is scored with no employment.
+        attractiveness = [group.migration_attractiveness if group.size else group.healthcare * 0.3
+                          for group in city.populations]
+
+        events = self.migrate(city)
+
+        self.assertTrue(events)
+        self.assertEqual(sum(group.size for group in city.populations), sum(before))
+        sources = [event.source_group_index for event in events]
+        self.assertEqual(sources, sorted(set(sources)))
+        net = [0] * len(before)
+        for event in events:
+            self.assertEqual(event.channel, "intergroup")
+            self.assertGreater(attractiveness[event.target_group_index],
+                               attractiveness[event.source_group_index])
+            self.assertLessEqual(event.amount, before[event.source_group_index])
+            net[event.source_group_index] -= event.amount
+            net[event.target_group_index] += event.amount
+        self.assertEqual([group.size for group in city.populations],
+                         [size + change for size, change in zip(before, net)])
+
+    def test_same_seed_gives_same_moves(self):
+        first = self.migrate(make_city(40, seed=4), seed=8)
+        second = self.migrate(make_city(40, seed=4), seed=8)
+        self.assertEqual(list(first), list(second))
+
+    def test_volume_matches_loop_engine(self):
+        batched = sum(event.amount for event in self.migrate(make_city(200, seed=5)))
+        loop = sum(event.amount for event in self.migrate(make_city(200, seed=5), engine="loop"))
+        self.assertAlmostEqual(batched / loop, 1.0, delta=0.05)
+
+    def test_unknown_engine_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Migration.for_intergroup(rng=None, intergroup_rate=0.1, engine="fast")
+
+
+if __name__ == "__main__":
+    unittest.main()
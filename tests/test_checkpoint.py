@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from config import CONFIG
+from model.core.ticks import Core
+
+
+def make_core(streams, engine):
+    core = Core(
+        seed_cfg={"seed": 42, "use": True, "streams": streams},
+        city_cfg=CONFIG.get("city"),
+        province_cfg=CONFIG.get("province"),
+        country_cfg=CONFIG.get("country"),
+        core_cfg={"population": {"engine": engine}},
+    )
+    core.build_sim()
+    return core
+
+
+def world_state(core):
+    return [
+        (city.name,
+         [(g.size, g.births, g.deaths, g.sick, g.healthcare, g.employed, g.money, g.employable)
+          for g in city.populations],
+         [(f.employed, f.market_capital, f.total_productivity, dict(f.inv)) for f in city.firms],
+         dict(city.inv), city.state.treasury, city.last_food_deficit,
+         list(city.migrations),
+         [week["city_data"] for week in city.city_data.data])
+        for city in core.iter_cities()
+    ]
+
+
+def typed(value):
+    '''value with every leaf paired with its type, so equal means type-identical.'''
+    if isinstance(value, dict):
+        return {key: typed(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [typed(item) for item in value]
+    return (type(value).__name__, value)
+
+
+class CheckpointTests(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".wsck")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def assert_restored_run_continues_identically(self, streams, engine):
+        original = make_core(streams, engine)
+        for _ in range(6):
+            original.tick()
+        original.save_checkpoint(self.path)
+
+        restored = Core.from_checkpoint(self.path)
+        self.assertEqual(restored.week, 6)
+        self.assertEqual(world_state(restored), world_state(original))
+
+        for _ in range(6):
+            original.tick()
+            restored.tick()
+        self.assertEqual(world_state(restored), world_state(original))
+
+    def test_keyed_columnar_run_continues_identically(self):
+        self.assert_restored_run_continues_identically("keyed", "columnar")
+
+    def test_shared_object_run_continues_identically(self):
+        self.assert_restored_run_continues_identically("shared", "object")
+
+    def test_restore_keeps_types_and_labour_results(self):
+        for streams, engine in (("keyed", "columnar"), ("shared", "object")):
+            with self.subTest(engine=engine):
+                original = make_core(streams, engine)
+                for _ in range(3):
+                    original.tick()
+                original.save_checkpoint(self.path)
+
+                restored = Core.from_checkpoint(self.path)
+
+                self.assertEqual(typed(world_state(restored)), typed(world_state(original)))
+                self.assertEqual([(f.p.productivity, f.p.production_capacity, f.p.capital, f.p.wage)
+                                  for city in restored.iter_cities() for f in city.firms],
+                                 [(f.p.productivity, f.p.production_capacity, f.p.capital, f.p.wage)
+                                  for city in original.iter_cities() for f in city.firms])
+                self.assertEqual(typed([city.employable for city in restored.iter_cities()]),
+                                 typed([city.employable for city in original.iter_cities()]))
+                results = [city.state.labour_result for city in original.iter_cities()]
+                self.assertTrue(all(result is not None for result in results))
+                self.assertEqual([city.state.labour_result for city in restored.iter_cities()], results)
+
+    def test_restore_without_mmap(self):
+        core = make_core("keyed", "object")
+        core.tick()
+        core.save_checkpoint(self.path)
+
+        restored = Core.from_checkpoint(self.path, mmap=False)
+
+        self.assertEqual(world_state(restored), world_state(core))
+
+    def test_checkpoints_do_not_load_multiprocessing(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, model.core.checkpoint; print('multiprocessing' in sys.modules)"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
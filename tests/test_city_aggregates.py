@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+
+from config import CONFIG
+from model.city.city_aggregates import CityAggregates
+from model.core.ticks import Core
+from model.population import PopulationGroup
+
+
+def make_groups():
+    return [
+        PopulationGroup.from_dict({"size": size, "base_healthcare": 0.5, "healthcare_capacity": 100},
+                                  rng=None)
+        for size in (100, 250, 40)
+    ]
+
+
+class CityAggregatesTests(unittest.TestCase):
+    def test_setter_changes_update_cached_sums(self):
+        groups = make_groups()
+        aggregates = CityAggregates(groups, debug=True)
+        self.assertEqual(aggregates.total("size"), 390)
+
+        groups[0].size -= 30
+        groups[1].size += 30
+        groups[2].employed = 20
+        groups[1].healthcare = 0.9
+        groups[0].births = 4
+
+        self.assertEqual(aggregates.total("size"), 390)
+        self.assertEqual(aggregates.total("births"), 4)
+        expected = sum(group.migration_attractiveness for group in groups)
+        self.assertAlmostEqual(aggregates.attractiveness_total(), expected)
+
+    def test_debug_mode_catches_writes_around_the_setters(self):
+        groups = make_groups()
+        aggregates = CityAggregates(groups, debug=True)
+        aggregates.total("size")
+
+        groups[0].state.size = 0
+        with self.assertRaises(AssertionError):
+            aggregates.total("size")
+
+        aggregates.invalidate()
+        self.assertEqual(aggregates.total("size"), 290)
+
+    def test_cached_sums_stay_exact_through_a_run(self):
+        city_cfg = {**CONFIG.get("city"), "aggregates": {"debug": True}}
+        for engine in ("object", "columnar"):
+            with self.subTest(engine=engine):
+                core = Core(
+                    seed_cfg={"seed": 42, "use": True, "streams": "keyed"},
+                    city_cfg=city_cfg,
+                    province_cfg=CONFIG.get("province"),
+                    country_cfg=CONFIG.get("country"),
+                    core_cfg={"population": {"engine": engine}},
+                )
+                core.build_sim()
+                for _ in range(12):
+                    core.tick()
+                    for city in core.iter_cities():
+                        city.aggregates.check()
+                        self.assertEqual(city.total_population,
+                                         sum(group.size for group in city.populations))
+
+    def test_ticks_apply_deltas_instead_of_recomputing(self):
+        for engine in ("object", "columnar"):
+            with self.subTest(engine=engine):
+                core = Core(
+                    seed_cfg={"seed": 42, "use": True, "streams": "keyed"},
+                    city_cfg=CONFIG.get("city"),
+                    province_cfg=CONFIG.get("province"),
+                    country_cfg=CONFIG.get("country"),
+                    core_cfg={"population": {"engine": engine}},
+                )
+                core.build_sim()
+                core.tick()
+                with mock.patch.object(CityAggregates, "refresh", autospec=True,
+                                       side_effect=CityAggregates.refresh) as refresh:
+                    for _ in range(6):
+                        core.tick()
+                self.assertEqual(refresh.call_count, 0)
+                for city in core.iter_cities():
+                    city.aggregates.check()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import main
+from model.city.city_data import CityData
+from model.city.city_history import CityHistory
+
+
+def record_ticks(history, ticks):
+    for tick in ticks:
+        history.record(
+            city_values={"population": 100 + tick, "births": tick, "deaths": 0,
+                         "employable": 0.5, "productivity": float(tick)},
+            group_values={"size": [60 + tick, 40], "healthcare": [0.5, 0.6],
+                          "last_births": [tick, 0], "last_deaths": [0, 0],
+                          "employment_rate": [0.1, 0.2], "sick_rate": [0.0, 0.01]},
+            firm_values={"employed": [tick], "total_productivity": [2.0 * tick]},
+        )
+
+
+class CityHistoryTests(unittest.TestCase):
+    def test_snapshots_keep_the_city_snapshot_layout(self):
+        history = CityHistory(group_count=2, firm_labels=[("state", "food")])
+        record_ticks(history, range(3))
+
+        snapshot = history[2]
+        self.assertEqual(len(history), 3)
+        self.assertEqual(snapshot["city_data"]["population"], 102)
+        self.assertEqual(snapshot["population_data"][0],
+                         {"group": 1, "size": 62, "healthcare": 0.5, "last_births": 2,
+                          "last_deaths": 0, "employment_rate": 0.1, "sick_rate": 0.0})
+        self.assertEqual(snapshot["firm_data"][0],
+                         {"ownership": "state", "good": "food", "employed": 2,
+                          "total_productivity": 4.0})
+        self.assertIsInstance(snapshot["city_data"]["population"], int)
+        self.assertEqual([week["city_data"]["births"] for week in history], [0, 1, 2])
+
+    def test_ring_policy_evicts_oldest_ticks(self):
+        history = CityHistory(group_count=2, firm_labels=[("state", "food")], retention=4)
+        record_ticks(history, range(10))
+
+        self.assertEqual(list(history.ticks()), [6, 7, 8, 9])
+        self.assertEqual(history[9]["city_data"]["births"], 9)
+        self.assertEqual(history[-1]["city_data"]["births"], 9)
+        with self.assertRaises(IndexError):
+            history[2]
+
+    def test_downsample_policy_keeps_whole_run_at_lower_resolution(self):
+        history = CityHistory(group_count=2, firm_labels=[("state", "food")],
+                              retention=4, policy="downsample")
+        record_ticks(history, range(10))
+
+        self.assertEqual(list(history.ticks()), [0, 4, 8])
+        self.assertEqual(history.interval, 4)
+        self.assertEqual(list(history.series("size", 0)), [60, 64, 68])
+
+    def test_arrays_grow_with_the_samples_up_to_the_retention(self):
+        history = CityHistory(group_count=2, firm_labels=[("state", "food")], retention=20)
+        self.assertEqual(history.capacity, 8)
+
+        record_ticks(history, range(12))
+        self.assertEqual(history.capacity, 16)
+        self.assertEqual(history.groups["size"].shape, (16, 2))
+        self.assertEqual(list(history.ticks()), list(range(12)))
+
+        record_ticks(history, range(12, 30))
+        self.assertEqual(history.capacity, 20)
+        self.assertEqual(list(history.ticks()), list(range(10, 30)))
+        self.assertEqual(list(history.series("size", 0)), [60 + tick for tick in range(10, 30)])
+
+        downsampled = CityHistory(group_count=2, firm_labels=[("state", "food")],
+                                  retention=12, policy="downsample")
+        record_ticks(downsampled, range(30))
+        self.assertEqual(downsampled.capacity, 12)
+        self.assertEqual(list(downsampled.ticks()), list(range(0, 30, 4)))
+
+    def test_extend_appends_ticks_recorded_by_a_detached_copy(self):
+        history = CityHistory(group_count=2, firm_labels=[("state", "food")])
+        record_ticks(history, range(3))
+        copy = history.detached()
+        record_ticks(copy, [3])
+
+        history.extend(copy)
+
+        self.assertEqual(len(history), 4)
+        self.assertEqual(history[3]["city_data"]["population"], 103)
+
+
+def run_reported(history_cfg, weeks=12):
+    '''Report lines and the run's Core for a main.run with the given history config.'''
+    cfg = main.run_config(main.parse_args(["--weeks", str(weeks), "--output", "jsonl"]))
+    cfg["city"]["history"] = history_cfg
+    cfg["main"]["reporter"].update({"report_interval": 1, "sub_province_report": True})
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg["main"]["reporter"]["jsonl_path"] = os.path.join(tmp, "report.jsonl")
+        core = main.run(cfg)
+        with open(cfg["main"]["reporter"]["jsonl_path"]) as f:
+            return f.read().splitlines(), core
+
+
+class BoundedHistoryRunTests(unittest.TestCase):
+    def test_reports_and_readers_survive_eviction_and_downsampling(self):
+        full, full_core = run_reported({"retention": 520, "policy": "ring", "interval": 1})
+        for history_cfg in ({"retention": 4, "policy": "ring", "interval": 1},
+                            {"retention": 4, "policy": "downsample", "interval": 1},
+                            {"retention": 4, "policy": "ring", "interval": 3}):
+            with self.subTest(**history_cfg):
+                lines, core = run_reported(history_cfg)
+                self.assertEqual(lines, full)
+
+                city, full_city = next(core.iter_cities()), next(full_core.iter_cities())
+                history = city.city_data.data
+                self.assertEqual(len(history), 12)
+                self.assertLessEqual(len(history.ticks()), 4)
+                # Graph-style iteration gives the retained ticks of the full history.
+                self.assertEqual([week["city_data"]["population"] for week in history],
+                                 [full_city.city_data.data[tick]["city_data"]["population"]
+                                  for tick in history.ticks().tolist()])
+
+    def test_values_are_only_gathered_on_recorded_ticks(self):
+        with mock.patch.object(CityData, "sum_city_data", autospec=True,
+                               side_effect=CityData.sum_city_data) as gathered:
+            _, core = run_reported({"retention": 520, "policy": "ring", "interval": 3})
+
+        cities = len(list(core.iter_cities()))
+        self.assertEqual(gathered.call_count, 4 * cities)
+        self.assertEqual(len(next(core.iter_cities()).city_data.data), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
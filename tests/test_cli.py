@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import main
+from model.core.ticks import Core
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CommandLineTests(unittest.TestCase):
+    def test_options_override_config(self):
+        cfg = main.run_config(main.parse_args(
+            ["--weeks", "7", "--input", "world.json", "--output", "jsonl", "csv", "--seed", "9",
+             "--profile", "p.csv", "--ensemble", "4", "--workers", "2"]))
+        self.assertEqual(cfg["main"]["weeks"], 7)
+        self.assertEqual(cfg["main"]["input"], "world.json")
+        self.assertEqual(cfg["main"]["reporter"]["outputs"], ["jsonl", "csv"])
+        self.assertEqual(cfg["seed"]["seed"], 9)
+        self.assertTrue(cfg["core"]["profiler"]["enabled"])
+        self.assertEqual(cfg["core"]["profiler"]["output"], "p.csv")
+        self.assertEqual((cfg["main"]["ensemble"]["runs"], cfg["main"]["ensemble"]["workers"]), (4, 2))
+        self.assertTrue(cfg["main"]["ensemble"]["enabled"])
+        # CONFIG itself is untouched.
+        self.assertNotEqual(main.CONFIG["main"]["weeks"], 7)
+
+    def test_headless_run_writes_profile_and_runs_requested_weeks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            core = main.run(main.run_config(main.parse_args(
+                ["--weeks", "3", "--no-report", "--profile", path])))
+            with open(path) as f:
+                profile = json.load(f)
+        self.assertEqual(core.week, 3)
+        self.assertTrue(profile)
+
+    def test_run_closes_the_core_when_a_tick_fails(self):
+        cfg = main.run_config(main.parse_args(["--weeks", "3", "--no-report"]))
+        with mock.patch.object(Core, "tick", side_effect=RuntimeError("tick failed")), \
+                mock.patch.object(Core, "close", autospec=True) as close:
+            with self.assertRaises(RuntimeError):
+                main.run(cfg)
+        close.assert_called_once()
+
+    def test_import_stays_light_and_within_budget(self):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c",
+             "import sys, main; print([m for m in ('matplotlib', 'multiprocessing', 'model.core.ensemble')"
+             " if m in sys.modules])"],
+            cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+        main_line = next(line for line in result.stderr.splitlines() if line.rstrip().endswith("| main"))
+        cumulative_us = int(main_line.split("|")[1])
+        self.assertLess(cumulative_us / 1e6, main.IMPORT_BUDGET_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import math
+import unittest
+from dataclasses import dataclass
+
+import numpy as np
+
+from model import EuclideanDistanceProvider, LocationService, distance_provider_from_cfg
+from model.migration import AttractivenessIndex, Migration
+
+
+@dataclass
+class LocatedCity:
+    name: str
+    location: tuple[float, float] | None
+
+
+class FixedFraction:
+    def uniform(self, a: float, b: float) -> float:
+        return a + (b - a) * 0.4
+
+
+def make_service(count=7):
+    service = LocationService()
+    for i in range(count):
+        service.set_location(f"C{i}", 10.0 * i, 5.0 * (i % 3))
+    return service
+
+
+class DistanceProviderTests(unittest.TestCase):
+    def test_location_service_interns_keys_in_insertion_order(self):
+        service = make_service(3)
+
+        self.assertEqual([service.key_id(f"C{i}") for i in range(3)], [0, 1, 2])
+        self.assertEqual(service.get_location(LocatedCity("C2", None)), (20.0, 10.0))
+        with self.assertRaises(ValueError):
+            LocationService.from_cities([LocatedCity("A", (0, 0)), LocatedCity("B", None)])
+        with self.assertRaises(ValueError):
+            LocationService.from_cities([LocatedCity("A", (0, 0)), LocatedCity("A", (5, 5))])
+
+    def test_weights_decay_with_distance(self):
+        provider = EuclideanDistanceProvider(make_service(), scale=20.0)
+
+        self.assertAlmostEqual(provider.distance("C0", "C1"), math.hypot(10.0, 5.0))
+        self.assertAlmostEqual(provider.weight("C0", "C1"), math.exp(-math.hypot(10.0, 5.0) / 20.0))
+        self.assertEqual(provider.weight("C3", "C3"), 1.0)
+
+    def test_batch_weights_match_pairwise_weights(self):
+        provider = EuclideanDistanceProvider(make_service(), scale=20.0)
+        keys = [f"C{i}" for i in (4, 0, 6, 2)]
+
+        expected = [provider.weight("C1", key) for key in keys]
+        np.testing.assert_array_equal(provider.weights("C1", keys), expected)
+        np.testing.assert_array_equal(provider.weights(1, provider.key_ids(keys)), expected)
+
+    def test_matrix_is_built_a_few_rows_at_a_time(self):
+        provider = EuclideanDistanceProvider(make_service(), scale=20.0)
+        chunked = EuclideanDistanceProvider(make_service(), scale=20.0)
+        chunked.ROW_CHUNK_ELEMENTS = 10
+
+        coords = provider.coords
+        delta = coords[:, None, :] - coords[None, :, :]
+        expected = np.exp(-np.sqrt((delta ** 2).sum(axis=2)) / 20.0)
+        np.testing.assert_array_equal(provider.matrix, expected)
+        np.testing.assert_array_equal(chunked._rows(0, 7), expected)
+        np.testing.assert_array_equal(chunked._rows(2, 5), expected[2:5])
+
+    def test_blocked_rows_match_dense_matrix(self):
+        dense = EuclideanDistanceProvider(make_service(), scale=20.0)
+        blocked = EuclideanDistanceProvider(make_service(), scale=20.0, max_dense=2, block_size=3, max_blocks=1)
+
+        self.assertIsNone(blocked.matrix)
+        for source in range(7):
+            np.testing.assert_array_equal(blocked.weights(source, np.arange(7)), dense.matrix[source])
+
+    def test_provider_from_cfg(self):
+        cities = [LocatedCity("A", (0.0, 0.0)), LocatedCity("B", (3.0, 4.0))]
+
+        provider = distance_provider_from_cfg({"distance_mode": "euclidean", "distance_scale": 5.0}, cities)
+
+        self.assertAlmostEqual(provider.weight("A", "B"), math.exp(-1.0))
+        with self.assertRaises(ValueError):
+            distance_provider_from_cfg({"distance_mode": "manhattan"}, cities)
+
+    def test_indexed_choice_with_matrix_matches_linear_weighted_choice(self):
+        provider = EuclideanDistanceProvider(make_service(), scale=20.0)
+        migration = Migration.for_intercity(rng=FixedFraction(), intercity_rate=0.1,
+                                            distance_provider=provider)
+        values = [0.4, 0.1, 0.9, 0.4, 0.7, 0.2, 0.8]
+        index = AttractivenessIndex(values)
+        names = [f"C{i}" for i in range(len(values))]
+
+        for keys in (names, migration.key_ids(names)):
+            for source in range(len(values)):
+                candidates = [index.order[p] for p in index.more_attractive(source)]
+                weights = [(values[c] - values[source]) * provider.weight(names[source], names[c])
+                           for c in candidates]
+                choice = migration.selector.weighted_choice_index(weights)
+                expected = None if choice is None else candidates[choice]
+
+                self.assertEqual(migration.choose_target_index(index, source, keys), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
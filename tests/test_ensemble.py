@@ -0,0 +1,75 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from config import CONFIG
+from model.core.ensemble import METRICS, EnsembleRunner, StreamingQuantiles, run_member, tick_metrics
+from model.core.ticks import Core
+from model.core.world_loader import compile_world
+
+
+def make_cfgs(cache_dir):
+    return {
+        "seed": {"seed": 0, "use": True, "streams": "keyed"},
+        "city": CONFIG.get("city"),
+        "province": CONFIG.get("province"),
+        "country": CONFIG.get("country"),
+        "core": {"population": {"engine": "columnar"}, "world": {"cache_dir": cache_dir}},
+    }
+
+
+class StreamingQuantilesTests(unittest.TestCase):
+    def test_estimates_track_exact_quantiles(self):
+        rng = np.random.default_rng(3)
+        samples = rng.normal(size=(2000, 3)) * [1.0, 5.0, 20.0] + [0.0, 10.0, -4.0]
+        quantiles = StreamingQuantiles((3,), (0.05, 0.5, 0.95))
+        for row in samples:
+            quantiles.add(row)
+
+        exact = np.quantile(samples, (0.05, 0.5, 0.95), axis=0)
+        np.testing.assert_allclose(quantiles.result(), exact, atol=0.1 * samples.std(axis=0).max())
+
+    def test_few_observations_are_exact(self):
+        quantiles = StreamingQuantiles((2,), (0.5,))
+        for row in ([1.0, 4.0], [3.0, 2.0], [2.0, 9.0]):
+            quantiles.add(row)
+        np.testing.assert_array_equal(quantiles.result(), [[2.0, 4.0]])
+
+
+class EnsembleTests(unittest.TestCase):
+    def test_stats_match_the_member_runs_for_any_worker_count(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cfgs = make_cfgs(cache_dir)
+            serial = EnsembleRunner(cfgs, runs=3, ticks=4, base_seed=5).run()
+            pooled = EnsembleRunner(cfgs, runs=3, ticks=4, workers=2, base_seed=5).run()
+            world_path = compile_world("input_data.json", cache_dir)
+            members = np.stack([run_member(seed, 4, cfgs, world_path) for seed in (5, 6, 7)])
+
+        self.assertEqual(serial.runs, 3)
+        np.testing.assert_allclose(serial.mean, members.mean(axis=0))
+        np.testing.assert_allclose(serial.std, members.std(axis=0, ddof=1))
+        np.testing.assert_array_equal(pooled.mean, serial.mean)
+        summary = serial.summary()
+        self.assertEqual(set(summary["metrics"]), set(METRICS))
+        self.assertEqual(summary["metrics"]["population"]["p50"],
+                         np.median(members[:, :, 0], axis=0).tolist())
+
+    def test_member_matches_a_core_built_from_the_input_file(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cfgs = make_cfgs(cache_dir)
+            member = run_member(9, 3, cfgs, compile_world("input_data.json", cache_dir))
+
+        core = Core(seed_cfg={"seed": 9, "use": True, "streams": "keyed"}, city_cfg=cfgs["city"],
+                    province_cfg=cfgs["province"], country_cfg=cfgs["country"],
+                    core_cfg={"population": {"engine": "columnar"}})
+        core.build_sim()
+        expected = []
+        for _ in range(3):
+            core.tick()
+            expected.append(tick_metrics(core))
+        np.testing.assert_array_equal(member, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from benchmarks.memory import compare, measure
+from model.core.random import RandomStreams
+from model.economy import Firm
+from model.population import PopulationGroup, PopulationStore
+
+
+def make_group(rng=None):
+    return PopulationGroup.from_dict({"size": 1000, "base_healthcare": 0.6, "healthcare_capacity": 200},
+                                     rng=rng)
+
+
+def make_firm(rng=None):
+    return Firm.from_dict({"productivity": 1.5, "production_capacity": 500, "ownership": "state",
+                           "good": "food", "wage": 2.0, "capital": 100.0}, rng=rng)
+
+
+class EntityLayoutTests(unittest.TestCase):
+    def test_groups_and_firms_have_no_instance_dict(self):
+        for entity in (make_group(), make_firm()):
+            for obj in (entity, entity.p, entity.state):
+                self.assertFalse(hasattr(obj, "__dict__"), type(obj).__name__)
+
+    def test_rates_are_shared_class_constants(self):
+        group = make_group()
+        self.assertEqual(group.base_birth_rate, PopulationGroup.base_birth_rate)
+        with self.assertRaises(AttributeError):
+            group.fertility = 1.0
+
+    def test_slotted_entities_pickle_with_their_state(self):
+        streams = RandomStreams(seed=1)
+        group, firm = make_group(streams.entity("group")), make_firm(streams.entity("firm"))
+        group.money = 12.5
+        firm.inv["food"] = 3.0
+        store = PopulationStore.from_groups([make_group(), group], rng=streams)
+
+        copy = pickle.loads(pickle.dumps((group, firm)))
+
+        self.assertEqual((copy[0].size, copy[0].money, copy[0].healthcare),
+                         (group.size, group.money, group.healthcare))
+        self.assertEqual(copy[1].inv, {"food": 3.0})
+        self.assertIsNone(copy[0].aggregates)
+        self.assertEqual(store.columns["money"][1], 12.5)
+
+    def test_memory_benchmark_reports_per_entity_bytes(self):
+        results = measure(200)
+        for name in ("group_bytes", "firm_bytes", "store_group_bytes"):
+            self.assertGreater(results[name], 0)
+        report = {"results": results}
+        self.assertEqual(compare(report, report, tolerance=0.1), [])
+        grown = {"results": {**results, "firm_bytes": results["firm_bytes"] / 2}}
+        self.assertEqual(len(compare(report, grown, tolerance=0.1)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+
+from model.city.food_rationing import ration_food
+
+
+NEEDED = np.array([30.0, 50.0, 20.0])
+MONEY = np.array([100.0, 10.0, 500.0])
+
+
+def sequential_reference(needed, money, available, price):
+    purchased = []
+    for need, cash in zip(needed, money):
+        if available <= 0:
+            bought = 0.0
+        elif price <= 0:
+            bought = min(need, available)
+        else:
+            bought = min(need, available, cash / price)
+        available -= bought
+        purchased.append(bought)
+    return purchased
+
+
+class FoodRationingTests(unittest.TestCase):
+    def test_sequential_matches_serving_groups_in_order(self):
+        for available in (0.0, 25.0, 45.0, 100.0):
+            for price in (0.0, 0.5, 1.0):
+                with self.subTest(available=available, price=price):
+                    np.testing.assert_allclose(ration_food(NEEDED, MONEY, available, price),
+                                               sequential_reference(NEEDED, MONEY, available, price))
+
+    def test_proportional_shares_a_shortage_evenly(self):
+        purchased = ration_food(NEEDED, MONEY, 30.0, 1.0, policy="proportional")
+        # Demand is capped by money: 30, 10, 20.
+        np.testing.assert_allclose(purchased, [15.0, 5.0, 10.0])
+        np.testing.assert_allclose(ration_food(NEEDED, MONEY, 100.0, 1.0, policy="proportional"),
+                                   [30.0, 10.0, 20.0])
+
+    def test_money_priority_serves_richest_first(self):
+        purchased = ration_food(NEEDED, MONEY, 40.0, 1.0, policy="money_priority")
+        np.testing.assert_allclose(purchased, [20.0, 0.0, 20.0])
+
+    def test_unknown_policy_raises(self):
+        with self.assertRaises(ValueError):
+            ration_food(NEEDED, MONEY, 10.0, 1.0, policy="lottery")
+
+
+if __name__ == "__main__":
+    unittest.main()
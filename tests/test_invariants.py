@@ -0,0 +1,91 @@
+import unittest
+
+from config import CONFIG
+from model.core.invariants import InvariantChecker, InvariantError, collect_invariant_errors
+from model.core.ticks import Core
+
+
+def make_core(engine="columnar", invariants=None, shared_memory=False):
+    parallel = {"workers": 2, "shared_memory": True} if shared_memory else {"workers": 1}
+    core = Core(
+        seed_cfg={"seed": 42, "use": True, "streams": "keyed"},
+        city_cfg=CONFIG.get("city"),
+        province_cfg=CONFIG.get("province"),
+        country_cfg=CONFIG.get("country"),
+        core_cfg={"population": {"engine": engine}, "invariants": invariants or {},
+                  "parallel": parallel},
+    )
+    core.build_sim()
+    return core
+
+
+def corrupt(core):
+    cities = list(core.iter_cities())
+    cities[0].populations[1].employed = cities[0].populations[1].size + 1
+    cities[-1].firms[0].market_capital = -5.0
+    cities[-1].firms[0].inv["food"] = -1.0
+    cities[1].state.treasury = -2.0
+    cities[1].state.inv["food"] = -3.0
+    return cities
+
+
+class InvariantCheckerTests(unittest.TestCase):
+    def test_clean_world_has_no_violations(self):
+        for engine in ("columnar", "object"):
+            core = make_core(engine)
+            for _ in range(3):
+                core.tick()
+            self.assertEqual(collect_invariant_errors(core), [])
+
+    def test_violations_are_structured_and_ordered_by_city(self):
+        for engine, shared_memory in (("columnar", False), ("object", False),
+                                      ("columnar", True), ("object", True)):
+            with self.subTest(engine=engine, shared_memory=shared_memory):
+                core = make_core(engine, shared_memory=shared_memory)
+                self.addCleanup(core.close)
+                cities = corrupt(core)
+                checker = InvariantChecker(core)
+                # Shared memory holds groups, firms and city numbers under either engine.
+                self.assertEqual(checker.store is not None, engine == "columnar" or shared_memory)
+                self.assertEqual(checker.firm_columns is not None, shared_memory)
+                self.assertEqual(checker.city_columns is not None, shared_memory)
+                violations = checker.check()
+                found = [(v.check, v.city, v.index, v.good) for v in violations]
+                self.assertEqual(found, [
+                    ("group.employed_exceeds_size", cities[0].name, 1, None),
+                    ("city.negative_food", cities[1].name, -1, None),
+                    ("city.negative_inventory", cities[1].name, -1, "food"),
+                    ("city.negative_treasury", cities[1].name, -1, None),
+                    ("firm.negative_inventory", cities[-1].name, 0, "food"),
+                    ("firm.negative_market_capital", cities[-1].name, 0, None),
+                ])
+                self.assertEqual(violations[3].value, -2.0)
+                self.assertEqual(violations[4].message, f"{cities[-1].name}: negative firm inventory for food")
+
+    def test_sampled_checks_rotate_over_every_city(self):
+        core = make_core()
+        checker = InvariantChecker(core, sample=0.5)
+        covered = []
+        for tick in (1, 2):
+            covered.extend(checker.selected_cities().tolist())
+            checker.after_tick(tick)
+        self.assertEqual(sorted(covered), list(range(len(checker.cities))))
+
+    def test_core_raises_or_records_on_its_interval(self):
+        core = make_core(invariants={"enabled": True, "interval": 2})
+        firm = next(core.iter_cities()).firms[0]
+        firm.inv["wood"] = -1.0
+        core.tick() # Off the interval
+        with self.assertRaises(InvariantError) as raised:
+            core.tick()
+        self.assertEqual([v.check for v in raised.exception.violations], ["firm.negative_inventory"])
+
+        core = make_core(invariants={"enabled": True, "on_violation": "record", "max_records": 2})
+        for city in core.iter_cities():
+            city.firms[0].inv["wood"] = -1.0
+        core.tick()
+        self.assertEqual(len(core.invariants.violations), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+
+import numpy as np
+
+from model.economy import Firm, LabourMarket
+from model.population import PopulationGroup
+
+
+GROUPS = [
+    {"size": 80000, "base_healthcare": 0.6, "healthcare_capacity": 8500},
+    {"size": 30000, "base_healthcare": 0.95, "healthcare_capacity": 6000},
+    {"size": 200000, "base_healthcare": 0.4, "healthcare_capacity": 19000},
+]
+
+FIRMS = [
+    {"productivity": 17, "production_capacity": 3000000, "capital": 3000000,
+     "ownership": "state", "wage": 25, "good": "food"},
+    {"productivity": 0.14, "production_capacity": 2500000, "capital": 2500000,
+     "ownership": "state", "wage": 30, "good": "copper"},
+    {"productivity": 1, "production_capacity": 1000, "capital": 0,
+     "ownership": "state", "wage": 40, "good": "silver"},
+]
+
+
+def make_market(engine, seed):
+    rng = np.random.default_rng(seed)
+    groups = [PopulationGroup.from_dict(data, rng=rng) for data in GROUPS]
+    firms = [Firm.from_dict(data, rng=rng) for data in FIRMS]
+    return LabourMarket(rng, engine=engine), groups, firms
+
+
+class MatrixLabourMarketTests(unittest.TestCase):
+    def test_matrix_result_totals_are_consistent(self):
+        market, groups, firms = make_market("matrix", seed=5)
+        supply, _ = market.compute_supply(groups)
+        demand, _ = market.compute_labour_demand(firms)
+
+        result = market.clear_market(groups, firms)
+
+        self.assertEqual(result.total_employed, sum(result.group_employed))
+        self.assertEqual(result.total_employed, sum(result.firm_employed))
+        self.assertEqual(result.total_employed, sum(flow.workers for flow in result.flows))
+        self.assertAlmostEqual(sum(result.group_income), sum(result.firm_wage_bill))
+        for employed, available in zip(result.group_employed, supply):
+            self.assertLessEqual(employed, available)
+        for employed, wanted in zip(result.firm_employed, demand):
+            self.assertLessEqual(employed, wanted)
+        # Firms without capital don't hire.
+        self.assertEqual(result.firm_employed[2], 0)
+        self.assertEqual([group.employed for group in groups], result.group_employed)
+
+    def test_matrix_engine_is_deterministic_and_close_to_loop(self):
+        matrix_a = make_market("matrix", seed=11)
+        matrix_b = make_market("matrix", seed=11)
+        loop = make_market("loop", seed=11)
+
+        result_a = matrix_a[0].clear_market(matrix_a[1], matrix_a[2])
+        result_b = matrix_b[0].clear_market(matrix_b[1], matrix_b[2])
+        result_loop = loop[0].clear_market(loop[1], loop[2])
+
+        self.assertEqual(result_a.group_employed, result_b.group_employed)
+        self.assertAlmostEqual(result_a.total_employed / result_loop.total_employed, 1.0, delta=0.05)
+
+    def test_engines_agree_on_expected_totals(self):
+        totals = {}
+        for engine in ("loop", "matrix"):
+            results = []
+            for seed in range(12):
+                market, groups, firms = make_market(engine, seed)
+                results.append(market.clear_market(groups, firms).total_employed)
+            totals[engine] = np.mean(results)
+
+        self.assertAlmostEqual(totals["matrix"] / totals["loop"], 1.0, delta=0.005)
+
+    def test_rounding_without_rng_places_every_worker_and_stops(self):
+        market = LabourMarket(rng=None, engine="matrix")
+        pvals = np.array([[0.3, 0.3, 0.4], [0.001, 0.001, 0.998], [0.5, 0.25, 0.25]])
+        counts = market.draw_counts(np.array([10, 2, 7]), pvals)
+        self.assertEqual(counts.sum(axis=1).tolist(), [10, 2, 7])
+        self.assertEqual(counts[0].tolist(), [3, 3, 4])
+
+        # A handful of workers against a large firm rounds to no hires every round.
+        rng = np.random.default_rng(3)
+        groups = [PopulationGroup.from_dict({**GROUPS[0], "size": 10}, rng=rng)]
+        firms = [Firm.from_dict(FIRMS[0], rng=rng)]
+        for engine in ("loop", "matrix"):
+            with self.subTest(engine=engine):
+                result = LabourMarket(rng=None, engine=engine).clear_market(groups, firms)
+                self.assertEqual(result.total_employed, 0)
+
+    def test_unknown_engine_is_rejected(self):
+        with self.assertRaises(ValueError):
+            LabourMarket(rng=None, engine="fast")
+
+
+def make_skilled_market(engine, seed, levels, skills):
+    market, groups, firms = make_market(engine, seed)
+    for group, level in zip(groups, levels):
+        group.p.education_level = level
+    for firm, skill in zip(firms, skills):
+        firm.p.required_skill = skill
+    return market, groups, firms
+
+
+class EligibilityTests(unittest.TestCase):
+    def test_index_matches_is_eligible(self):
+        market, groups, firms = make_skilled_market("loop", 1, ["basic", "higher", "basic"],
+                                                    [None, "higher", "doctorate"])
+        index = market.eligibility_index(groups, firms)
+        expected = [[market.is_eligible(group, firm) for firm in firms] for group in groups]
+
+        self.assertEqual(index.matrix().tolist(), expected)
+        self.assertEqual(index.groups_for(1).tolist(), [1])
+        self.assertEqual(index.pair_count(), 4)
+        np.testing.assert_allclose(index.firm_supply([10.0, 20.0, 30.0]), [60.0, 20.0, 0.0])
+
+    def test_engines_hire_only_eligible_groups(self):
+        for engine in ("loop", "matrix"):
+            with self.subTest(engine=engine):
+                market, groups, firms = make_skilled_market(engine, 4, ["basic", "higher", "basic"],
+                                                            ["basic", "higher", None])
+                result = market.clear_market(groups, firms)
+
+                self.assertTrue(result.flows)
+                for flow in result.flows:
+                    self.assertTrue(market.is_eligible(groups[flow.group_index], firms[flow.firm_index]))
+                self.assertEqual(result.total_employed, sum(result.group_employed))
+
+    def test_unfillable_demand_ends_clearing(self):
+        # Only the small group can fill the copper firm; the loop engine must not keep drawing.
+        for engine in ("loop", "matrix"):
+            with self.subTest(engine=engine):
+                market, groups, firms = make_skilled_market(engine, 2, ["basic", "higher", "basic"],
+                                                            ["doctorate", "higher", None])
+                result = market.clear_market(groups, firms)
+
+                self.assertEqual(result.firm_employed[0], 0)
+                self.assertEqual(result.group_employed[0], 0)
+                self.assertEqual(result.group_employed[2], 0)
+                self.assertGreater(result.firm_employed[1], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
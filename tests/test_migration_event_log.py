@@ -0,0 +1,97 @@
+import copy
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from config import CONFIG
+from model.core.ticks import Core
+from model.migration import GroupMigrationEvent, MigrationEventLog, read_spill
+
+
+def make_log(spill_path=None):
+    log = MigrationEventLog(spill_path=spill_path, capacity=2)
+    log.append_many("A", "B", [0, 1, 2], [0, 1, 0], [5, 7, 1], channel="intercity")
+    log.append_many("B", "B", [1], [2], [3], channel="intergroup")
+    log.append_many("B", "A", [], [], [], channel="intercity")
+    return log
+
+
+class MigrationEventLogTests(unittest.TestCase):
+    def test_views_match_the_appended_transfers(self):
+        log = make_log()
+        self.assertEqual(len(log), 4)
+        self.assertEqual(log.names, ["A", "B"])
+        self.assertEqual(log[1], GroupMigrationEvent("A", 1, "B", 1, 7, "intercity"))
+        self.assertEqual(log[-1], GroupMigrationEvent("B", 1, "B", 2, 3, "intergroup"))
+        self.assertEqual([event.amount for event in log], [5, 7, 1, 3])
+
+        copy = MigrationEventLog()
+        copy.extend(list(log))
+        self.assertEqual(list(copy), list(log))
+
+    def test_od_matrix_sums_amounts_per_city_pair(self):
+        np.testing.assert_array_equal(make_log().od_matrix(), [[0, 13], [0, 3]])
+
+    def test_clear_spills_each_tick(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spill", "A.events")
+            log = make_log(spill_path=path)
+            log.clear()
+            self.assertEqual(len(log), 0)
+            log.append_many("C", "A", [0], [0], [9], channel="intercity")
+            log.clear()
+
+            names, records = read_spill(path)
+            self.assertEqual(names, ["A", "B", "C"])
+            self.assertEqual(records["tick"].tolist(), [0, 0, 0, 0, 1])
+            self.assertEqual(records["amount"].tolist(), [5, 7, 1, 3, 9])
+            self.assertEqual(names[records["source_city"][-1]], "C")
+
+    def test_simulation_logs_are_columnar(self):
+        core = Core(
+            seed_cfg={"seed": 7, "use": True, "streams": "keyed"},
+            city_cfg=CONFIG.get("city"),
+            province_cfg=CONFIG.get("province"),
+            country_cfg=CONFIG.get("country"),
+            core_cfg={"population": {"engine": "columnar"}},
+        )
+        core.build_sim()
+        core.tick()
+        city = next(core.iter_cities())
+        self.assertIsInstance(city.migrations, MigrationEventLog)
+        self.assertEqual(sum(event.amount for event in city.migrations),
+                         int(city.migrations.column("amount").sum()))
+        self.assertTrue(all(event.channel == "intergroup" for event in city.migrations))
+
+    def test_events_are_stamped_with_the_core_week(self):
+        city_cfg = copy.deepcopy(CONFIG.get("city"))
+        city_cfg["stepping"] = {**city_cfg["stepping"], "enabled": True, "quiet_weeks": 1,
+                                "population_tol": 1.0, "employment_tol": 1.0, "migration_tol": 1.0}
+        core = Core(
+            seed_cfg={"seed": 7, "use": True, "streams": "keyed"},
+            city_cfg=city_cfg,
+            province_cfg=CONFIG.get("province"),
+            country_cfg=CONFIG.get("country"),
+            core_cfg={"population": {"engine": "columnar"}},
+        )
+        core.build_sim()
+        held = 0
+        for week in range(1, 9):
+            if week == 4:
+                # A log that starts mid-run, as a restored or worker-side log may.
+                next(core.iter_cities()).state.migrations = MigrationEventLog()
+            core.tick()
+            held += sum(city.state.stepping.weeks == 0 for city in core.iter_cities())
+            logs = [city.migrations for city in core.iter_cities()]
+            logs += [province.state.migrations for country in core.countries
+                     for province in country.provinces]
+            for log in logs:
+                self.assertEqual(log.tick, week)
+                self.assertTrue((log.column("tick") == week).all())
+        self.assertGreater(held, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 from dataclasses import dataclass
 import random
 
-from model.migration import Migration
+from model.migration import AttractivenessIndex, Migration
 from model.province.province import Province, ProvinceParams
 
 
@@ -46,6 +46,19 @@ class RngAdapter:
         return successes
 
 
+class FixedFraction:
+    """Uniform draws at a fixed fraction of the range."""
+
+    def __init__(self, fraction: float) -> None:
+        self.fraction = fraction
+
+    def uniform(self, a: float, b: float) -> float:
+        return a + (b - a) * self.fraction
+
+    def binomial(self, n: int, p: float) -> int:
+        return int(n * p)
+
+
 class MigrationPhase1Tests(unittest.TestCase):
     def make_cities(self) -> tuple[StubCity, StubCity]:
         source = StubCity(
@@ -121,7 +134,62 @@ class MigrationPhase1Tests(unittest.TestCase):
         )
 
         events = migration.migrate_between_cities(source, target)
-        self.assertEqual(events, [])
+        self.assertEqual(list(events), [])
+
+    def test_attractiveness_index_prefix_gaps_match_pairwise_sums(self):
+        values = [0.4, 0.1, 0.9, 0.4, 0.7, 0.2]
+        index = AttractivenessIndex(values)
+
+        for source in range(len(values)):
+            positions = index.more_attractive(source)
+            targets = [index.order[position] for position in positions]
+            self.assertEqual(sorted(targets),
+                             [i for i, value in enumerate(values) if value > values[source]])
+            for position in positions:
+                expected = sum(values[index.order[p]] - values[source]
+                               for p in range(positions.start, position + 1))
+                self.assertAlmostEqual(index.cumulative_gap(source, positions.start, position), expected)
+
+    def test_indexed_choice_matches_linear_weighted_choice(self):
+        values = [0.4, 0.1, 0.9, 0.4, 0.7, 0.2]
+        index = AttractivenessIndex(values)
+        keys = [str(i) for i in range(len(values))]
+
+        for fraction in (0.0, 0.3, 0.65, 1.0):
+            for distance in (None, ZeroDistance()):
+                migration = Migration.for_intercity(rng=FixedFraction(fraction), intercity_rate=0.1,
+                                                    distance_provider=distance)
+                for source in range(len(values)):
+                    candidates = [index.order[p] for p in index.more_attractive(source)]
+                    weights = [max(values[c] - values[source], 0.0) for c in candidates]
+                    if distance is not None:
+                        weights = [0.0 for _ in weights]
+                    choice = migration.selector.weighted_choice_index(weights)
+                    expected = None if choice is None else candidates[choice]
+
+                    self.assertEqual(migration.choose_target_index(index, source, keys), expected)
+
+    def test_indexed_province_migration_conserves_population(self):
+        cities = [
+            StubCity(name=str(i),
+                     populations=[StubGroup(100 + i, 0.1), StubGroup(50, 0.2)],
+                     migration_attractiveness=0.1 * (i % 4))
+            for i in range(12)
+        ]
+        province = Province(
+            cfg={"migration": {"enabled": True, "engine": "indexed", "intercity_rate": 0.5}},
+            rng=RngAdapter(3),
+            params=ProvinceParams(name="P", area=100, cities=cities),
+        )
+        before = sum(city.total_population for city in cities)
+
+        province.run_migrations()
+
+        self.assertTrue(province.migrations)
+        self.assertEqual(sum(city.total_population for city in cities), before)
+        attractiveness = {city.name: city.migration_attractiveness for city in cities}
+        for event in province.migrations:
+            self.assertGreater(attractiveness[event.target_city], attractiveness[event.source_city])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from config import CONFIG
+from model.core.shared_state import SharedColumns
+from model.core.synthetic_world import SyntheticWorldSpec, write_synthetic_world
+from model.core.ticks import Core
+
+
+def make_core(workers, engine="object", shared_memory=False, world=None, city_cfg=None, country_cfg=None):
+    core = Core(
+        seed_cfg={"seed": 42, "use": True, "streams": "keyed"},
+        city_cfg=city_cfg or CONFIG.get("city"),
+        province_cfg=CONFIG.get("province"),
+        country_cfg=country_cfg or CONFIG.get("country"),
+        core_cfg={"population": {"engine": engine},
+                  "parallel": {"workers": workers, "shared_memory": shared_memory}},
+    )
+    if world is None:
+        core.build_sim()
+    else:
+        core.build_sim(world)
+    return core
+
+
+def run(core, ticks):
+    path = []
+    try:
+        for _ in range(ticks):
+            core.tick()
+            # Migration logs stay with resident workers until synced.
+            core.sync()
+            path.append([
+                ([(g.size, g.sick, g.employed, g.money) for g in city.populations],
+                 [(f.employed, f.market_capital) for f in city.firms],
+                 dict(city.inv), city.state.treasury,
+                 [event.amount for event in city.migrations])
+                for city in core.iter_cities()
+            ])
+    finally:
+        core.close()
+    return path
+
+
+class ParallelProvinceTests(unittest.TestCase):
+    def test_parallel_matches_serial_for_any_worker_count(self):
+        serial = run(make_core(workers=1), ticks=6)
+        for workers in (2, 3):
+            self.assertEqual(run(make_core(workers=workers), ticks=6), serial)
+
+    def test_parallel_with_columnar_store_matches_serial(self):
+        serial = run(make_core(workers=1, engine="columnar"), ticks=6)
+        core = make_core(workers=2, engine="columnar")
+        parallel = run(core, ticks=6)
+
+        self.assertEqual(parallel, serial)
+        city = next(core.iter_cities())
+        self.assertEqual(len(city.city_data.data), 6)
+        self.assertEqual(city.populations[0].size,
+                         int(core.population_store.columns["size"][0]))
+
+    def test_parallel_requires_keyed_streams(self):
+        with self.assertRaises(ValueError):
+            Core(
+                seed_cfg={"seed": 1, "use": True, "streams": "shared"},
+                city_cfg={}, province_cfg={}, country_cfg={},
+                core_cfg={"parallel": {"workers": 2}},
+            )
+
+
+class SharedWorldStateTests(unittest.TestCase):
+    def test_shared_memory_matches_serial(self):
+        for engine in ("object", "columnar"):
+            with self.subTest(engine=engine):
+                serial = run(make_core(workers=1, engine=engine), ticks=6)
+                core = make_core(workers=2, engine=engine, shared_memory=True)
+                shared = core.shared_state
+                city = next(core.iter_cities())
+
+                self.assertEqual(run(core, ticks=6), serial)
+                # Closing copies the state out of shared memory; entities stay readable.
+                self.assertIsNone(core.shared_state)
+                self.assertIsNone(shared.groups.shm)
+                self.assertEqual(city.populations[0].size, serial[-1][0][0][0][0])
+                self.assertEqual(city.state.treasury, serial[-1][0][3])
+
+    def test_coordinator_phases_reach_resident_workers(self):
+        # The market and step planning change city and firm state between ticks.
+        cfgs = {
+            "city_cfg": {**CONFIG.get("city"), "stepping": {**CONFIG.get("city")["stepping"], "enabled": True}},
+            "country_cfg": {**CONFIG.get("country"),
+                            "market": {**CONFIG.get("country")["market"], "enabled": True}},
+        }
+        serial = run(make_core(workers=1, engine="columnar", **cfgs), ticks=8)
+        shared = run(make_core(workers=2, engine="columnar", shared_memory=True, **cfgs), ticks=8)
+
+        self.assertEqual(shared, serial)
+
+    def test_resident_workers_record_history_into_shared_memory(self):
+        serial = make_core(workers=1, engine="columnar")
+        run(serial, ticks=5)
+        core = make_core(workers=2, engine="columnar", shared_memory=True)
+        run(core, ticks=5)
+
+        for city, reference in zip(core.iter_cities(), serial.iter_cities()):
+            self.assertEqual(list(city.city_data.data), list(reference.city_data.data))
+            self.assertEqual(city.state.labour_result, reference.state.labour_result)
+
+    def test_resident_ticks_send_nothing_per_entity(self):
+        payload = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for groups in (4, 256):
+                path = os.path.join(tmp, f"world{groups}.json")
+                write_synthetic_world(path, SyntheticWorldSpec(provinces=2, cities=2, groups=groups, firms=3))
+                core = make_core(workers=2, engine="columnar", shared_memory=True, world=path)
+                try:
+                    for _ in range(3):
+                        core.tick()
+                    payload[groups] = core.province_runner.payload_bytes
+                finally:
+                    core.close()
+
+        # 64 times the groups adds no more than a few bytes of larger city totals,
+        # and the whole tick is less than one number per group of the large world.
+        self.assertLess(payload[256] - payload[4], 100)
+        self.assertLess(payload[256], 8 * 256 * 4)
+
+    def test_row_views_pickle_as_references(self):
+        core = make_core(workers=2, shared_memory=True)
+        try:
+            city = next(core.iter_cities())
+            firm, group = city.firms[0], city.populations[0]
+            firm.state.inv["food"] = 5.0
+
+            firm_copy = pickle.loads(pickle.dumps(firm.state))
+            group_copy = pickle.loads(pickle.dumps(group.state))
+            firm_copy.market_capital = 123.0
+            group_copy.money = 7.5
+
+            self.assertEqual(firm.state.market_capital, 123.0)
+            self.assertEqual(group.money, 7.5)
+            self.assertEqual(firm_copy.inv["food"], 5.0)
+            self.assertIs(firm_copy.store, SharedColumns.attach(firm.state.store.spec))
+        finally:
+            core.close()
+
+    def test_shards_own_disjoint_rows(self):
+        core = make_core(workers=2, shared_memory=True)
+        try:
+            provinces = [province for country in core.countries for province in country.provinces]
+            owned = core.shared_state.partition(core.province_runner.shards(provinces))
+
+            self.assertEqual(sum(rows.groups.stop - rows.groups.start for rows in owned),
+                             core.shared_state.store.count)
+            if len(provinces) > 2:
+                with self.assertRaises(ValueError):
+                    core.shared_state.partition([[provinces[0], provinces[2]], [provinces[1]]])
+            with self.assertRaises(ValueError):
+                core.shared_state.partition([[provinces[0]], [provinces[0]]])
+        finally:
+            core.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
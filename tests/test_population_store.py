@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from model.city.city_aggregates import CityAggregates
+from model.population import PopulationGroup, PopulationStore
+from model.population.group_store import STATE_DTYPES
+
+
+GROUP_DATA = [
+    {"size": 80000, "base_healthcare": 0.6, "healthcare_capacity": 8500},
+    {"size": 30000, "base_healthcare": 0.95, "healthcare_capacity": 6000},
+    {"size": 200000, "base_healthcare": 0.4, "healthcare_capacity": 19000},
+    {"size": 0, "base_healthcare": 0.5, "healthcare_capacity": 100},
+]
+
+
+def make_groups(rng):
+    groups = [PopulationGroup.from_dict(data, rng=rng) for data in GROUP_DATA]
+    for i, group in enumerate(groups):
+        group.employed = 1000 * i
+    return groups
+
+
+class PopulationStoreTests(unittest.TestCase):
+    def test_store_tick_matches_object_tick(self):
+        object_groups = make_groups(np.random.default_rng(3))
+        store_groups = make_groups(None)
+        # Zero sized groups can't run the object tick, so compare the live ones.
+        object_groups, store_groups = object_groups[:3], store_groups[:3]
+        store = PopulationStore.from_groups(store_groups, rng=np.random.default_rng(3))
+
+        for _ in range(10):
+            for group in object_groups:
+                group.tick()
+            store.tick()
+
+        for expected, actual in zip(object_groups, store_groups):
+            for name in STATE_DTYPES:
+                self.assertEqual(getattr(expected.state, name), getattr(actual.state, name), name)
+
+    def test_bound_groups_read_and_write_through_store(self):
+        groups = make_groups(None)
+        store = PopulationStore.from_groups(groups, rng=np.random.default_rng(0))
+
+        groups[1].size -= 500
+        self.assertEqual(store.columns["size"][1], 29500)
+        self.assertIsInstance(groups[1].size, int)
+
+        store.tick()
+        self.assertEqual(groups[2].births, int(store.columns["births"][2]))
+        self.assertEqual(groups[3].size, 0)
+        self.assertEqual(groups[3].sick_rate, 0.0)
+
+    def test_row_range_tick_leaves_other_rows_untouched(self):
+        groups = make_groups(None)
+        store = PopulationStore.from_groups(groups, rng=np.random.default_rng(0))
+        before = store.columns["size"].copy()
+
+        store.tick(rows=slice(0, 1))
+
+        self.assertTrue(np.array_equal(before[1:], store.columns["size"][1:]))
+
+    def test_row_range_tick_only_reduces_its_own_rows(self):
+        groups = make_groups(None)
+        cities = [CityAggregates(groups[:2], debug=True), CityAggregates(groups[2:], debug=True)]
+        for city in cities:
+            city.refresh()
+        store = PopulationStore.from_groups(groups, rng=np.random.default_rng(0))
+        untouched = cities[1].cached
+
+        with mock.patch.object(store, "_aggregated", wraps=store._aggregated) as aggregated:
+            store.tick(rows=slice(0, 2))
+
+        # Before and after the tick, over the ticked rows only.
+        self.assertEqual([call.args[0] for call in aggregated.call_args_list], [slice(0, 2)] * 2)
+        cities[0].check()
+        self.assertEqual(cities[1].cached, untouched)
+
+        store.tick(rows=slice(1, 3))
+        for city in cities:
+            city.check()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import csv
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from config import CONFIG
+from model.core.profiler import NULL_PROFILER, Profiler
+from model.core.random import CountingGenerator
+from model.core.ticks import Core
+
+
+def make_core(profiler_enabled, streams="keyed"):
+    core = Core(
+        seed_cfg={"seed": 42, "use": True, "streams": streams},
+        city_cfg=CONFIG.get("city"),
+        province_cfg=CONFIG.get("province"),
+        country_cfg=CONFIG.get("country"),
+        core_cfg={"population": {"engine": "columnar"}, "profiler": {"enabled": profiler_enabled}},
+    )
+    core.build_sim()
+    return core
+
+
+class ProfilerTests(unittest.TestCase):
+    def test_profiled_run_records_phases_and_counts_per_tick(self):
+        core = make_core(profiler_enabled=True)
+        for _ in range(3):
+            core.tick()
+
+        self.assertEqual([record["tick"] for record in core.profiler.ticks], [1, 2, 3])
+        record = core.profiler.ticks[-1]
+        city_count = sum(1 for _ in core.iter_cities())
+        self.assertEqual(record["timers"]["city.labour"]["calls"], city_count)
+        for name in ("core.population_store", "city.consume_food", "city.migration",
+                     "city.city_data", "province.migration", "country.provinces"):
+            self.assertIn(name, record["timers"])
+        self.assertEqual(record["counters"]["city.labour_flows"],
+                         sum(len(city.state.labour_result.flows) for city in core.iter_cities()))
+        self.assertGreater(record["counters"]["core.rng_draws"], 0)
+        self.assertEqual(set(core.profiler.by_level()), {"core", "country", "city", "province"})
+
+    def test_rng_draws_are_counted_on_the_shared_generator(self):
+        core = make_core(profiler_enabled=True, streams="shared")
+        core.tick()
+        draws = core.profiler.ticks[-1]["counters"]["core.rng_draws"]
+        self.assertGreater(draws, 0)
+        self.assertEqual(draws, core.rng.draws)
+
+        # Counting leaves the stream as np.random.default_rng draws it.
+        counting = CountingGenerator(np.random.PCG64(7))
+        plain = np.random.default_rng(7)
+        self.assertEqual(counting.normal(size=4).tolist(), plain.normal(size=4).tolist())
+        self.assertEqual(counting.uniform(), plain.uniform())
+        self.assertEqual(counting.multinomial(10, [0.5, 0.5], size=3).tolist(),
+                         plain.multinomial(10, [0.5, 0.5], size=3).tolist())
+        self.assertEqual(counting.draws, 8)
+
+    def test_profiling_does_not_change_the_run(self):
+        plain = make_core(profiler_enabled=False)
+        profiled = make_core(profiler_enabled=True)
+        for _ in range(4):
+            plain.tick()
+            profiled.tick()
+
+        self.assertIs(plain.profiler, NULL_PROFILER)
+        self.assertEqual([city.total_population for city in profiled.iter_cities()],
+                         [city.total_population for city in plain.iter_cities()])
+
+    def test_export_json_and_csv(self):
+        profiler = Profiler()
+        with profiler.phase("city", "labour"):
+            pass
+        profiler.count("city", "migration_events", 3)
+        profiler.end_tick(1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "profile.json")
+            csv_path = os.path.join(tmp, "profile.csv")
+            profiler.export(json_path)
+            profiler.export(csv_path)
+            with open(json_path) as f:
+                exported = json.load(f)
+            with open(csv_path) as f:
+                rows = list(csv.DictReader(f))
+
+        self.assertEqual(exported["totals"]["counters"], {"city.migration_events": 3})
+        self.assertEqual(exported["totals"]["timers"]["city.labour"]["calls"], 1)
+        self.assertEqual([(row["level"], row["name"], row["kind"]) for row in rows],
+                         [("city", "labour", "timer"), ("city", "migration_events", "counter")])
+
+    def test_profilers_pickle_as_the_null_profiler(self):
+        self.assertIs(pickle.loads(pickle.dumps(Profiler())), NULL_PROFILER)
+        self.assertIs(pickle.loads(pickle.dumps(NULL_PROFILER)), NULL_PROFILER)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from config import CONFIG
+from model.core.random import RandomStreams, _sample_normal
+from model.core.ticks import Core
+
+
+def make_core(engine):
+    core = Core(
+        seed_cfg={"seed": 42, "use": True, "streams": "keyed"},
+        city_cfg=CONFIG.get("city"),
+        province_cfg=CONFIG.get("province"),
+        country_cfg=CONFIG.get("country"),
+        core_cfg={"population": {"engine": engine}},
+    )
+    core.build_sim()
+    return core
+
+
+def world_state(core):
+    return {
+        city.name: (
+            [(g.size, g.births, g.deaths, g.sick, g.healthcare, g.employed, g.money)
+             for g in city.populations],
+            [(f.employed, f.market_capital, f.total_productivity) for f in city.firms],
+            dict(city.inv),
+            city.state.treasury,
+        )
+        for city in core.iter_cities()
+    }
+
+
+class RandomStreamsTests(unittest.TestCase):
+    def test_bulk_normals_match_entity_draws(self):
+        streams = RandomStreams(seed=7)
+        streams.advance()
+        expected = np.column_stack((np.linspace(0, 40, 50), np.linspace(5, 0, 50)))
+
+        bulk = streams.sample_normal("group", np.arange(50), expected)
+        single = [
+            [_sample_normal(row[0], stream), _sample_normal(row[1], stream)]
+            for row, stream in zip(expected, [streams.entity("group", i) for i in range(50)])
+        ]
+
+        self.assertEqual(bulk.tolist(), single)
+
+    def test_draws_depend_on_key_not_call_order(self):
+        streams = RandomStreams(seed=7)
+        streams.advance()
+        a, b = streams.entity("city", 0), streams.entity("city", 1)
+        forward = [a.uniform(), b.uniform(), a.binomial(50, 0.5), b.binomial(50, 0.5)]
+
+        streams = RandomStreams(seed=7)
+        streams.advance()
+        a, b = streams.entity("city", 0), streams.entity("city", 1)
+        backward = [b.uniform(), a.uniform(), b.binomial(50, 0.5), a.binomial(50, 0.5)]
+
+        self.assertEqual(forward, [backward[1], backward[0], backward[3], backward[2]])
+
+    def test_array_uniforms_match_repeated_scalar_draws(self):
+        streams = RandomStreams(seed=7)
+        streams.advance()
+        highs = np.array([1.0, 2.5, 0.0, 4.0])
+        bulk = streams.entity("city", 2).uniform(0.0, highs)
+        stream = streams.entity("city", 2)
+
+        self.assertEqual(bulk.tolist(), [stream.uniform(0.0, high) for high in highs.tolist()])
+
+    def test_pickled_stream_continues_the_same_sequence(self):
+        streams = RandomStreams(seed=3)
+        streams.advance()
+        stream = streams.entity("city", 4)
+        stream.normal()
+        stream.binomial(100, 0.2)
+        copy = pickle.loads(pickle.dumps(stream))
+
+        self.assertEqual(stream.normal(), copy.normal())
+        self.assertEqual(stream.binomial(100, 0.2), copy.binomial(100, 0.2))
+
+    def test_columnar_and_object_engines_match_with_keyed_streams(self):
+        columnar = make_core("columnar")
+        objects = make_core("object")
+
+        for _ in range(8):
+            columnar.tick()
+            objects.tick()
+
+        self.assertEqual(world_state(columnar), world_state(objects))
+
+    def test_province_order_does_not_change_results(self):
+        forward = make_core("object")
+        backward = make_core("object")
+        backward.countries[0].provinces.reverse()
+
+        for _ in range(8):
+            forward.tick()
+            backward.tick()
+
+        self.assertEqual(world_state(forward), world_state(backward))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from config import CONFIG
+from model.core.ticks import Core
+from visualisation.pipeline import CsvWriter, JsonlWriter, ReportPipeline, TextWriter
+from visualisation.report import format_report
+from visualisation.summary import summarise
+
+
+def make_summaries(weeks, history=None):
+    core = Core(
+        seed_cfg={"seed": 42, "use": True, "streams": "keyed"},
+        city_cfg={**CONFIG.get("city"), "history": history or CONFIG["city"]["history"]},
+        province_cfg=CONFIG.get("province"),
+        country_cfg=CONFIG.get("country"),
+        core_cfg={"population": {"engine": "columnar"}},
+    )
+    core.build_sim()
+    summaries = []
+    for week in range(1, weeks + 1):
+        core.tick()
+        summaries.append(summarise(week, core, spr=True))
+    return summaries
+
+
+def city_summaries(summary):
+    return [city for country in summary.countries for province in country.provinces for city in province.cities]
+
+
+class BlockingWriter:
+    def __init__(self):
+        self.release = threading.Event()
+        self.written = []
+
+    def write(self, summary):
+        self.release.wait()
+        self.written.append(summary.week)
+
+    def close(self):
+        pass
+
+
+class FailingWriter:
+    def write(self, summary):
+        raise OSError("disk full")
+
+    def close(self):
+        pass
+
+
+class ReportPipelineTests(unittest.TestCase):
+    def test_background_output_matches_direct_writes(self):
+        summaries = make_summaries(3)
+        direct, background = io.StringIO(), io.StringIO()
+        with ReportPipeline([TextWriter(direct)], background=False) as pipeline:
+            for summary in summaries:
+                pipeline.submit(summary)
+        with ReportPipeline([TextWriter(background)], queue_size=1) as pipeline:
+            for summary in summaries:
+                pipeline.submit(summary)
+
+        self.assertEqual(background.getvalue(), direct.getvalue())
+        self.assertEqual(direct.getvalue(), "".join(format_report(s) + "\n" for s in summaries))
+
+    def test_full_queue_blocks_submit_until_the_writer_catches_up(self):
+        writer = BlockingWriter()
+        pipeline = ReportPipeline([writer], queue_size=1)
+        summaries = make_summaries(3)
+        pipeline.submit(summaries[0]) # Taken by the writer, which then waits
+        pipeline.submit(summaries[1]) # Fills the queue
+
+        submitted = threading.Event()
+        third = threading.Thread(target=lambda: (pipeline.submit(summaries[2]), submitted.set()))
+        third.start()
+        self.assertFalse(submitted.wait(0.2))
+
+        writer.release.set()
+        third.join()
+        pipeline.close()
+        self.assertEqual(writer.written, [1, 2, 3])
+
+    def test_jsonl_and_csv_writers(self):
+        summaries = make_summaries(2)
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl_path = os.path.join(directory, "report.jsonl")
+            csv_path = os.path.join(directory, "report.csv")
+            with ReportPipeline([JsonlWriter(jsonl_path), CsvWriter(csv_path)]) as pipeline:
+                for summary in summaries:
+                    pipeline.submit(summary)
+
+            with open(jsonl_path, encoding="utf-8") as handle:
+                lines = [json.loads(line) for line in handle]
+            with open(csv_path, encoding="utf-8", newline="") as handle:
+                rows = list(csv.DictReader(handle))
+
+        self.assertEqual([line["week"] for line in lines], [1, 2])
+        city = summaries[1].countries[0].provinces[0].cities[0]
+        self.assertEqual(lines[1]["countries"][0]["provinces"][0]["cities"][0]["population"],
+                         city.population)
+        cities = sum(len(p.cities) for c in summaries[0].countries for p in c.provinces)
+        self.assertEqual(len(rows), 2 * cities)
+        self.assertEqual(rows[-1]["week"], "2")
+
+    def test_writer_errors_surface_on_close(self):
+        pipeline = ReportPipeline([FailingWriter()])
+        pipeline.submit(make_summaries(1)[0])
+        with self.assertRaises(OSError):
+            pipeline.close()
+
+    def test_writer_errors_surface_once(self):
+        summaries = make_summaries(2)
+        pipeline = ReportPipeline([FailingWriter()])
+        pipeline.submit(summaries[0])
+        while pipeline.error is None:
+            pipeline.thread.join(timeout=0.01)
+        with self.assertRaises(OSError):
+            pipeline.submit(summaries[1])
+        pipeline.close()  # Already surfaced by submit()
+
+        # An exception leaving the with block isn't replaced by the writer's.
+        with self.assertRaises(ValueError) as raised:
+            with ReportPipeline([FailingWriter()]) as pipeline:
+                pipeline.submit(summaries[0])
+                raise ValueError("simulation failed")
+        self.assertIsNone(raised.exception.__context__)
+
+
+class SummaryTests(unittest.TestCase):
+    def test_every_week_reports_with_sparse_history(self):
+        dense = make_summaries(5)
+        sparse = make_summaries(5, history={"retention": 2, "policy": "downsample", "interval": 2})
+
+        self.assertEqual([summary.week for summary in sparse], [1, 2, 3, 4, 5])
+        self.assertEqual(sparse, dense)
+
+    def test_summary_matches_recorded_history(self):
+        core = Core(
+            seed_cfg={"seed": 42, "use": True, "streams": "keyed"},
+            city_cfg=CONFIG.get("city"),
+            province_cfg=CONFIG.get("province"),
+            country_cfg=CONFIG.get("country"),
+            core_cfg={"population": {"engine": "columnar"}},
+        )
+        core.build_sim()
+        core.tick()
+        city = next(core.iter_cities())
+        snapshot = city.city_data.data[-1]
+        summary = city_summaries(summarise(1, core, spr=True))[0]
+
+        self.assertEqual([(g.group, g.size, g.healthcare, g.employment_rate, g.sick_rate) for g in summary.groups],
+                         [(g['group'], g['size'], g['healthcare'], g['employment_rate'], g['sick_rate'])
+                          for g in snapshot['population_data']])
+        self.assertEqual([(f.employed, f.total_productivity) for f in summary.firms],
+                         [(f['employed'], f['total_productivity']) for f in snapshot['firm_data']])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,12 +6,13 @@ from model.core.invariants import assert_core_invariants
 
 
 class SimulationRegressionTests(unittest.TestCase):
-    def make_core(self):
+    def make_core(self, core_cfg=None):
         core = Core(
             seed_cfg=CONFIG.get("seed"),
             city_cfg=CONFIG.get("city"),
             province_cfg=CONFIG.get("province"),
             country_cfg=CONFIG.get("country"),
+            core_cfg=core_cfg,
         )
         core.build_sim()
         return core
@@ -48,6 +49,19 @@ class SimulationRegressionTests(unittest.TestCase):
 
         self.assertEqual(path_a, path_b)
 
+    def test_columnar_population_engine_runs_with_invariants(self):
+        core = self.make_core(core_cfg={"population": {"engine": "columnar"}})
+        self.assertIsNotNone(core.population_store)
+        groups = [group for city in core.iter_cities() for group in city.populations]
+        self.assertEqual(core.population_store.count, len(groups))
+
+        for _ in range(12):
+            core.tick()
+            assert_core_invariants(core)
+
+        sizes = core.population_store.columns["size"]
+        self.assertEqual(list(sizes), [group.size for group in groups])
+
 
 if __name__ == "__main__":
     unittest.main()
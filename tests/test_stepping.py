@@ -0,0 +1,122 @@
+import copy
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from config import CONFIG
+from model.city.stepping import stepping_error
+from model.core.ticks import Core
+
+
+def make_core(stepping=None, engine="columnar", workers=1):
+    city_cfg = copy.deepcopy(CONFIG.get("city"))
+    city_cfg["stepping"] = {**city_cfg["stepping"], "enabled": True, **(stepping or {})}
+    core = Core(
+        seed_cfg={"seed": 42, "use": True, "streams": "keyed"},
+        city_cfg=city_cfg,
+        province_cfg=CONFIG.get("province"),
+        country_cfg=CONFIG.get("country"),
+        core_cfg={"population": {"engine": engine}, "parallel": {"workers": workers}},
+    )
+    core.build_sim()
+    return core
+
+
+def world_state(core):
+    return [
+        (city.name,
+         [(g.size, g.births, g.deaths, g.sick, g.employed, g.money) for g in city.populations],
+         [(f.employed, f.market_capital, dict(f.inv)) for f in city.firms],
+         dict(city.inv), city.state.treasury, city.last_food_deficit,
+         [event.amount for event in city.migrations],
+         (city.state.stepping.weeks, city.state.stepping.quiet, city.state.stepping.held))
+        for city in core.iter_cities()
+    ]
+
+
+def run(core, ticks):
+    held = 0
+    try:
+        for _ in range(ticks):
+            core.tick()
+            held += sum(city.state.stepping.weeks == 0 for city in core.iter_cities())
+    finally:
+        core.close()
+    return held
+
+
+class AdaptiveSteppingTests(unittest.TestCase):
+    def test_cities_that_never_settle_tick_like_weekly_mode(self):
+        weekly = make_core({"enabled": False})
+        never_quiet = make_core({"quiet_weeks": 10_000})
+        for _ in range(8):
+            weekly.tick()
+            never_quiet.tick()
+        self.assertEqual([s[:-1] for s in world_state(never_quiet)],
+                         [s[:-1] for s in world_state(weekly)])
+
+    def test_quiet_cities_hold_within_tolerance_of_weekly_run(self):
+        weekly = make_core({"enabled": False})
+        stepped = make_core()
+        self.assertEqual(run(weekly, 40), 0)
+        self.assertGreater(run(stepped, 40), 0)
+
+        # Greenock runs short of food every week, so it never holds.
+        greenock = next(city for city in stepped.iter_cities() if city.name == "Greenock")
+        self.assertEqual(greenock.state.stepping.quiet, 0)
+
+        error = stepping_error(weekly, stepped)
+        self.assertLess(error["population"], 0.005)
+        self.assertLess(error["employed"], 0.02)
+
+    def test_held_weeks_are_recorded_in_history(self):
+        core = make_core()
+        run(core, 20)
+        for city in core.iter_cities():
+            self.assertEqual(len(city.city_data.data), 20)
+
+    def test_object_and_columnar_engines_agree(self):
+        columnar, objects = make_core(engine="columnar"), make_core(engine="object")
+        run(columnar, 20)
+        run(objects, 20)
+        self.assertEqual(world_state(columnar), world_state(objects))
+
+    def test_parallel_matches_serial(self):
+        serial, parallel = make_core(engine="object"), make_core(engine="object", workers=2)
+        run(serial, 16)
+        run(parallel, 16)
+        self.assertEqual(world_state(parallel), world_state(serial))
+
+    def test_checkpoint_restores_step_state(self):
+        handle, path = tempfile.mkstemp(suffix=".wsck")
+        os.close(handle)
+        try:
+            original = make_core()
+            run(original, 10)
+            original.save_checkpoint(path)
+            restored = Core.from_checkpoint(path)
+            self.assertEqual(world_state(restored), world_state(original))
+            run(original, 10)
+            run(restored, 10)
+            self.assertEqual(world_state(restored), world_state(original))
+        finally:
+            os.remove(path)
+
+
+class StoreWeeksTests(unittest.TestCase):
+    def test_rows_with_zero_weeks_are_left_unchanged(self):
+        core = make_core({"enabled": False})
+        store = core.population_store
+        before = {name: column.copy() for name, column in store.columns.items()}
+        weeks = np.zeros(store.count, dtype=np.int64)
+        weeks[::2] = 4
+        store.tick(weeks=weeks)
+        for name in ("size", "sick", "healthcare", "births", "deaths"):
+            np.testing.assert_array_equal(store.columns[name][1::2], before[name][1::2])
+        self.assertGreater(int(store.columns["births"][::2].sum()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
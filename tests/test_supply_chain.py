@@ -0,0 +1,107 @@
+import unittest
+
+from model.city.city import City, CityParams
+from model.economy import Firm, SupplyChain
+
+
+class NamedDistance:
+    """Weights from a dict of (source, target) pairs; missing pairs can't trade."""
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def weight(self, source_key, target_key):
+        return self.weights.get((source_key, target_key), 0.0)
+
+
+def make_firm(good, input_mats=None, employed=0, capital=1000.0):
+    firm = Firm.from_dict({"productivity": 2.0, "production_capacity": 500, "ownership": "state",
+                           "good": good, "capital": capital, "wage": 1.0, "input_mats": input_mats},
+                          rng=None)
+    firm.employed = employed
+    return firm
+
+
+def make_city(name, firms, stock=None):
+    city = City(cfg={}, rng=None, params=CityParams(name=name, populations=[], firms=firms))
+    city.inv.update(stock or {})
+    return city
+
+
+class SupplyChainTests(unittest.TestCase):
+    def make_market(self, distance_provider=None, capital=1000.0, cfg=None):
+        self.factory = make_firm("components", ["copper", "iron"], employed=100, capital=capital)
+        self.buyer = make_city("Buyer", [self.factory], {"copper": 30.0})
+        self.near = make_city("Near", [make_firm("copper")], {"copper": 50.0, "iron": 40.0, "food": 900.0})
+        self.far = make_city("Far", [make_firm("iron")], {"copper": 500.0, "iron": 500.0})
+        cities = [self.buyer, self.far, self.near]
+        firms = [firm for city in cities for firm in city.firms]
+        return SupplyChain.build_from(rng=None, firms=firms, cities=cities,
+                                      distance_provider=distance_provider, cfg=cfg)
+
+    def test_request_matches_firm_good_demand(self):
+        market = self.make_market()
+        self.factory.inv["iron"] = 25.0
+
+        orders = market.request()
+
+        expected = {item.good: item.shortfall for item in self.factory.good_demand().demands}
+        self.assertEqual({order.item: order.shortfall for order in orders}, expected)
+        self.assertTrue(all(order.city is self.buyer for order in orders))
+
+    def test_bids_are_capped_by_market_capital(self):
+        market = self.make_market(capital=100.0)
+
+        orders = market.request()
+
+        self.assertAlmostEqual(sum(order.shortfall for order in orders), 100.0)
+
+    def test_clearing_prefers_heavier_distance_weights_and_conserves_goods(self):
+        market = self.make_market(NamedDistance({("Near", "Buyer"): 2.0, ("Far", "Buyer"): 1.0,
+                                                 ("Buyer", "Buyer"): 0.5}))
+        before = {good: sum(city.inv.get(good, 0.0) for city in market.cities) + self.factory.inv[good]
+                  for good in ("copper", "iron")}
+
+        trades = market.clear_chain()
+
+        self.assertEqual([(t.seller, t.item) for t in trades],
+                         [("Near", "copper"), ("Far", "copper"), ("Near", "iron"), ("Far", "iron")])
+        self.assertEqual(self.factory.inv["copper"], 200.0)
+        self.assertEqual(self.factory.inv["iron"], 200.0)
+        self.assertEqual(self.near.inv["copper"], 0.0)
+        self.assertEqual(self.buyer.inv["copper"], 30.0)
+        self.assertEqual(self.near.inv["food"], 900.0)
+        for good, total in before.items():
+            self.assertAlmostEqual(sum(city.inv.get(good, 0.0) for city in market.cities)
+                                   + self.factory.inv[good], total)
+        self.assertAlmostEqual(self.factory.market_capital, 1000.0 - 400.0)
+        self.assertAlmostEqual(self.near.state.treasury + self.far.state.treasury, 400.0)
+
+    def test_zero_weight_pairs_never_trade(self):
+        market = self.make_market(NamedDistance({("Far", "Buyer"): 1.0}))
+
+        trades = market.clear_chain()
+
+        self.assertEqual({t.seller for t in trades}, {"Far"})
+
+    def test_buyers_only_consider_their_nearest_sellers(self):
+        market = self.make_market(NamedDistance({("Near", "Buyer"): 2.0, ("Far", "Buyer"): 1.0}),
+                                  cfg={"nearest_sellers": 1})
+
+        trades = market.clear_chain()
+
+        self.assertEqual([(t.seller, t.item, t.amount) for t in trades],
+                         [("Near", "copper", 50.0), ("Near", "iron", 40.0)])
+        self.assertEqual(self.far.inv["copper"], 500.0)
+
+    def test_neutral_distance_fills_buyers_from_sellers_in_order(self):
+        market = self.make_market()
+
+        trades = market.clear_chain()
+
+        self.assertEqual([(t.seller, t.item, t.amount) for t in trades],
+                         [("Buyer", "copper", 30.0), ("Far", "copper", 170.0), ("Far", "iron", 200.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.run import compare, run_rung
+from config import CONFIG
+from model.core.synthetic_world import SyntheticWorldSpec, synthetic_world, write_synthetic_world
+from model.core.ticks import Core
+
+
+class SyntheticWorldTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "world.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_streamed_file_matches_in_memory_world(self):
+        spec = SyntheticWorldSpec(countries=2, provinces=3, cities=2, groups=3, firms=5, seed=7)
+        write_synthetic_world(self.path, spec)
+
+        with open(self.path) as f:
+            world = json.load(f)
+        self.assertEqual(world, synthetic_world(spec))
+        self.assertNotEqual(world, synthetic_world(SyntheticWorldSpec(countries=2, provinces=3, cities=2,
+                                                                      groups=3, firms=5, seed=8)))
+        cities = [city for country in world["countries"]
+                  for province in country["provinces"] for city in province["cities"]]
+        self.assertEqual(len(cities), spec.total_cities)
+        self.assertEqual(sum(len(city["groups"]) for city in cities), spec.total_groups)
+        self.assertTrue(all(city["firms"][0]["good"] == "food" for city in cities))
+
+    def test_spec_for_group_count_covers_the_requested_size(self):
+        for groups in (1, 1_000, 12_345, 1_000_000):
+            spec = SyntheticWorldSpec.for_group_count(groups)
+            self.assertGreaterEqual(spec.total_groups, groups)
+            self.assertLess(spec.total_groups - groups, spec.provinces * spec.cities * spec.groups)
+
+    def test_core_builds_and_ticks_a_synthetic_world(self):
+        spec = SyntheticWorldSpec(countries=1, provinces=2, cities=3, groups=4, firms=4, seed=1)
+        write_synthetic_world(self.path, spec)
+        core = Core(
+            seed_cfg={"seed": 1, "use": True, "streams": "keyed"},
+            city_cfg=CONFIG.get("city"),
+            province_cfg=CONFIG.get("province"),
+            country_cfg=CONFIG.get("country"),
+            core_cfg={"population": {"engine": "columnar"}},
+        )
+        core.build_sim(self.path)
+        for _ in range(3):
+            core.tick()
+
+        self.assertEqual(sum(len(city.populations) for city in core.iter_cities()), spec.total_groups)
+
+
+class BenchmarkHarnessTests(unittest.TestCase):
+    def test_rung_reports_throughput_and_phases(self):
+        result = run_rung(groups=20, ticks=2, engine="columnar", streams="keyed", seed=0)
+
+        self.assertGreaterEqual(result["groups"], 20)
+        self.assertGreater(result["ticks_per_second"], 0)
+        self.assertIn("city.labour", result["phase_seconds_per_tick"])
+        self.assertIn("province.migration", result["phase_seconds_per_tick"])
+
+    def test_compare_flags_throughput_drops_beyond_tolerance(self):
+        baseline = {"results": [{"groups": 1000, "ticks_per_second": 10.0}]}
+        slower = {"results": [{"groups": 1000, "ticks_per_second": 7.0}]}
+        similar = {"results": [{"groups": 1000, "ticks_per_second": 8.0}]}
+
+        self.assertEqual(len(compare(slower, baseline, tolerance=0.25)), 1)
+        self.assertEqual(compare(similar, baseline, tolerance=0.25), [])
+
+    def test_compare_refuses_baselines_recorded_with_other_settings(self):
+        settings = {"engine": "columnar", "streams": "keyed", "history_retention": 8}
+        baseline = {"settings": settings, "results": [{"groups": 1000, "ticks_per_second": 10.0}]}
+        run = {"settings": {**settings, "engine": "object"},
+               "results": [{"groups": 1000, "ticks_per_second": 10.0}]}
+
+        self.assertEqual(compare(run, baseline, tolerance=0.25),
+                         ["settings differ: engine 'object' vs baseline 'columnar'"])
+
+
+if __name__ == "__main__":
+    unittest.main()
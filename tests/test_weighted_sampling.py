@@ -0,0 +1,118 @@
+import random
+import unittest
+from dataclasses import dataclass
+
+import numpy as np
+
+from model.migration import AttractivenessIndex, Migration
+from model.migration.sampling import AliasSampler, CumulativeSampler
+from model.province.province import Province, ProvinceParams
+
+
+@dataclass
+class StubGroup:
+    size: int
+    migration_attractiveness: float
+
+
+@dataclass
+class StubCity:
+    name: str
+    populations: list[StubGroup]
+    migration_attractiveness: float
+
+    @property
+    def total_population(self) -> int:
+        return sum(group.size for group in self.populations)
+
+
+class RngAdapter:
+    def __init__(self, seed: int) -> None:
+        self._rng = random.Random(seed)
+
+    def uniform(self, a: float, b: float) -> float:
+        return self._rng.uniform(a, b)
+
+    def binomial(self, n: int, p: float) -> int:
+        return sum(self._rng.random() < p for _ in range(n))
+
+
+def linear_choice(weights, threshold):
+    running = 0.0
+    for idx, weight in enumerate(weights):
+        running += weight
+        if threshold <= running:
+            return idx
+    return len(weights) - 1
+
+
+class SamplerTests(unittest.TestCase):
+    def test_cumulative_sampler_matches_linear_scan(self):
+        weights = [0.5, 0.0, 2.0, 0.25, 1.25]
+        sampler = CumulativeSampler(weights)
+        thresholds = np.linspace(0.0, sampler.total, 41)
+        self.assertEqual(sampler.indices(thresholds).tolist(),
+                         [linear_choice(weights, t) for t in thresholds.tolist()])
+
+    def test_alias_sampler_follows_weights(self):
+        weights = np.array([1.0, 0.0, 3.0, 6.0])
+        sampler = AliasSampler(weights)
+        draws = sampler.sample(np.random.default_rng(5).random(200_000))
+        frequency = np.bincount(draws, minlength=len(weights)) / len(draws)
+        np.testing.assert_allclose(frequency, weights / weights.sum(), atol=0.005)
+        self.assertEqual(frequency[1], 0.0)
+
+    def test_alias_sampler_needs_positive_weight(self):
+        with self.assertRaises(ValueError):
+            AliasSampler([0.0, 0.0])
+
+    def test_batched_choices_share_one_pool(self):
+        migration = Migration.for_intercity(rng=np.random.default_rng(3), intercity_rate=0.1)
+        weights = [0.0, 1.0, 4.0]
+        for method in ("cumulative", "alias"):
+            chosen = migration.selector.weighted_choice_indices(weights, 1000, method=method)
+            self.assertEqual(len(chosen), 1000)
+            self.assertNotIn(0, chosen)
+        self.assertIsNone(migration.selector.weighted_choice_indices([0.0, 0.0], 10))
+        with self.assertRaises(ValueError):
+            migration.selector.weighted_choice_indices(weights, 10, method="inverse")
+
+
+class BatchedTargetChoiceTests(unittest.TestCase):
+    def test_batched_choices_match_per_source_choices(self):
+        values = np.random.default_rng(0).random(500).round(2).tolist()
+        index = AttractivenessIndex(values)
+        keys = [str(i) for i in range(len(values))]
+
+        batched = Migration.for_intercity(rng=np.random.default_rng(9), intercity_rate=0.1)
+        per_source = Migration.for_intercity(rng=np.random.default_rng(9), intercity_rate=0.1)
+        chosen = batched.choose_target_indices(index, keys)
+        expected = [per_source.choose_target_index(index, source, keys) for source in range(len(values))]
+
+        self.assertEqual(chosen.tolist(), [-1 if target is None else target for target in expected])
+
+    def test_batched_province_migration_conserves_population(self):
+        cities = [
+            StubCity(name=str(i),
+                     populations=[StubGroup(100 + i, 0.1), StubGroup(50, 0.2)],
+                     migration_attractiveness=0.1 * (i % 4))
+            for i in range(12)
+        ]
+        province = Province(
+            cfg={"migration": {"enabled": True, "engine": "batched", "intercity_rate": 0.5}},
+            rng=RngAdapter(3),
+            params=ProvinceParams(name="P", area=100, cities=cities),
+        )
+        before = sum(city.total_population for city in cities)
+
+        province.run_migrations()
+
+        self.assertTrue(province.migrations)
+        self.assertEqual(sum(city.total_population for city in cities), before)
+        attractiveness = {city.name: city.migration_attractiveness for city in cities}
+        for event in province.migrations:
+            self.assertGreater(attractiveness[event.target_city], attractiveness[event.source_city])
+
+
+if __name__ == "__main__":
+    unittest.main()
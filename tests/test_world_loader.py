@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+
+from config import CONFIG
+from model.core.ticks import Core
+from model.core.world_loader import compiled_world_path, stream_world
+
+
+def make_core(streams, cache_dir=None):
+    world_cfg = {"cache": cache_dir is not None, "cache_dir": cache_dir}
+    core = Core(
+        seed_cfg={"seed": 42, "use": True, "streams": streams},
+        city_cfg=CONFIG.get("city"),
+        province_cfg=CONFIG.get("province"),
+        country_cfg=CONFIG.get("country"),
+        core_cfg={"population": {"engine": "columnar"}, "world": world_cfg},
+    )
+    core.build_sim()
+    return core
+
+
+def world_state(core):
+    return [
+        (city.name,
+         [(g.size, g.births, g.deaths, g.education_level, g.healthcare, g.employed, g.money)
+          for g in city.populations],
+         [(f.ownership, f.good, f.employed, f.market_capital, dict(f.inv)) for f in city.firms],
+         dict(city.inv), city.state.treasury, list(city.migrations))
+        for city in core.iter_cities()
+    ]
+
+
+class StreamWorldTests(unittest.TestCase):
+    def test_small_chunks_yield_every_city_in_file_order(self):
+        with open("input_data.json") as f:
+            data = json.load(f)
+        expected = [city for country in data["countries"]
+                    for province in country["provinces"]
+                    for city in province["cities"]]
+
+        events = list(stream_world("input_data.json", chunk_size=7))
+
+        self.assertEqual([data for kind, data in events if kind == "city"], expected)
+        self.assertEqual(events[-1][0], "country")
+        self.assertNotIn("provinces", events[-1][1])
+
+
+class CompiledWorldTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cache.cleanup()
+
+    def test_first_build_writes_the_cache(self):
+        make_core("keyed", self.cache.name)
+
+        self.assertTrue(os.path.exists(compiled_world_path("input_data.json", self.cache.name)))
+
+    def test_cached_build_matches_json_build(self):
+        for streams in ("keyed", "shared"):
+            with self.subTest(streams=streams):
+                from_json = make_core(streams)
+                make_core(streams, self.cache.name)
+                from_cache = make_core(streams, self.cache.name)
+
+                self.assertEqual(world_state(from_cache), world_state(from_json))
+                for _ in range(4):
+                    from_json.tick()
+                    from_cache.tick()
+                self.assertEqual(world_state(from_cache), world_state(from_json))
+
+
+if __name__ == "__main__":
+    unittest.main()
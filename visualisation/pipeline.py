@@ -0,0 +1,169 @@
+'''
+Background output pipeline. The tick loop submits immutable week summaries
+to a bounded queue and a writer thread formats and writes them, so report
+I/O runs alongside the simulation instead of inside the tick loop.
+'''
+
+import csv
+import json
+import queue
+import sys
+import threading
+from dataclasses import asdict
+
+from visualisation.report import format_report
+from visualisation.summary import WeekSummary
+
+
+class TextWriter:
+    '''Writes the text report to a stream, stdout by default.'''
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream or sys.stdout
+
+    def write(self, summary: WeekSummary) -> None:
+        self.stream.write(format_report(summary) + "\n")
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class JsonlWriter:
+    '''Writes each week summary as one JSON line.'''
+
+    def __init__(self, path) -> None:
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, summary: WeekSummary) -> None:
+        self.file.write(json.dumps(asdict(summary)) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class CsvWriter:
+    '''Writes one row per city per reported week.'''
+
+    COLUMNS = ["week", "country", "province", "city", "population", "productivity", "births",
+               "deaths", "food_deficit", "treasury", "migrants"]
+
+    def __init__(self, path) -> None:
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.COLUMNS)
+
+    def write(self, summary: WeekSummary) -> None:
+        for country in summary.countries:
+            for province in country.provinces:
+                for city in province.cities:
+                    self.writer.writerow([
+                        summary.week, country.name, province.name, city.name, city.population,
+                        city.productivity, city.births, city.deaths,
+                        "" if city.food_deficit is None else city.food_deficit, city.treasury,
+                        sum(amount for _, _, amount in city.migrations),
+                    ])
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def writers_from_cfg(cfg: dict) -> list:
+    '''Writers for the reporter config's "outputs": any of "stdout", "jsonl" and "csv".'''
+    writers = []
+    for output in cfg.get("outputs", ["stdout"]):
+        if output == "stdout":
+            writers.append(TextWriter())
+        elif output == "jsonl":
+            writers.append(JsonlWriter(cfg.get("jsonl_path", "report.jsonl")))
+        elif output == "csv":
+            writers.append(CsvWriter(cfg.get("csv_path", "report.csv")))
+        else:
+            raise ValueError(f"Unknown report output: {output!r}")
+    return writers
+
+
+_STOP = object()
+
+
+class ReportPipeline:
+    '''
+    Hands week summaries to writers on a background thread.
+
+    submit() blocks while queue_size summaries are waiting, so a slow
+    writer holds the simulation back instead of buffering without limit.
+    close() writes everything still queued, closes the writers and re-raises
+    the first writer error, unless submit() or an exception leaving the with
+    block already surfaced one. With background off, submit() writes directly.
+    '''
+
+    def __init__(self, writers: list, queue_size: int = 8, background: bool = True) -> None:
+        self.writers = writers
+        self.error: BaseException | None = None
+        # Set once self.error (or another exception) has reached the caller.
+        self.error_raised = False
+        self.closed = False
+        self.queue: queue.Queue | None = None
+        self.thread: threading.Thread | None = None
+        if background:
+            self.queue = queue.Queue(maxsize=queue_size)
+            self.thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+            self.thread.start()
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> "ReportPipeline":
+        return cls(
+            writers=writers_from_cfg(cfg),
+            queue_size=cfg.get("queue_size", 8),
+            background=cfg.get("background", True),
+        )
+
+    def __enter__(self) -> "ReportPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            # Don't replace the exception already propagating with a writer error.
+            self.error_raised = True
+        self.close()
+
+    def _write(self, summary: WeekSummary) -> None:
+        for writer in self.writers:
+            writer.write(summary)
+
+    def _run(self) -> None:
+        while True:
+            summary = self.queue.get()
+            if summary is _STOP:
+                return
+            if self.error is not None:
+                continue # Keep draining so submit() never blocks on a dead writer
+            try:
+                self._write(summary)
+            except BaseException as error:
+                self.error = error
+
+    def submit(self, summary: WeekSummary) -> None:
+        '''Queue a summary for writing, waiting while the queue is full.'''
+        if self.closed:
+            raise RuntimeError("report pipeline is closed")
+        if self.error is not None:
+            self.error_raised = True
+            raise self.error
+        if self.thread is None:
+            self._write(summary)
+        else:
+            self.queue.put(summary)
+
+    def close(self) -> None:
+        '''Write out queued summaries and close the writers.'''
+        if self.closed:
+            return
+        self.closed = True
+        if self.thread is not None:
+            self.queue.put(_STOP)
+            self.thread.join()
+        for writer in self.writers:
+            writer.close()
+        if self.error is not None and not self.error_raised:
+            self.error_raised = True
+            raise self.error
@@ -2,67 +2,73 @@
 Report function is part of the visualisation module. It print data from the model, called in main.py
 '''
 
+from visualisation.summary import WeekSummary, summarise
+
+
 def report(week, core, spr) -> None:
     '''
     Outputs data for main. Reporting on provinces can be enabled or disabled in config.
-    
+
     :param week: week number (int)
     :param core: core object - the whole sim
     '''
-    print(f"------\n------\nWeek {week}: ")
-    for country in core.countries:
-        print(f"Country: {country.name}")
-        if spr:
-            report_provinces(country, week)
+    print(format_report(summarise(week, core, spr)))
 
-def report_provinces(country, week):
+def format_report(summary: WeekSummary) -> str:
     '''
-    Outputs data for main. Can be disabled in config (called by the main report)
-    
-    :param week: week number (int)
-    :param country: country object
+    Formats a week summary as the text report. Provinces are only listed if
+    the summary was taken with sub province reporting on.
+    '''
+    lines = [f"------\n------\nWeek {summary.week}: "]
+    for country in summary.countries:
+        lines.append(f"Country: {country.name}")
+        lines.extend(format_provinces(country))
+    return "\n".join(lines)
+
+def format_provinces(country):
+    '''
+    Formats every province and city of a country summary, one line at a time
+
+    :param country: CountrySummary
     '''
 
     for province in country.provinces:
 
-        print(f"------\nProvince: {province.name}")
+        yield f"------\nProvince: {province.name}"
         for city in province.cities:
 
-            print(f"{city.name}: \nPopulation = {int(city.total_population)}"\
+            yield (f"{city.name}: \nPopulation = {city.population}"\
                 f"\nProductivity = {city.productivity:.2f}, "\
-                f"Births = {city.birth_total}, "\
-                f"Deaths = {city.death_total}"
+                f"Births = {city.births}, "\
+                f"Deaths = {city.deaths}"
                 )
 
-            for g in city.city_data.data[week-1]['population_data']:
-                print(
-                    f"Group {g['group']}: "
-                    f"size = {int(g['size'])}, "
-                    f"healthcare = {g['healthcare']:.3f}, "
-                    f"employment_rate = {g['employment_rate']:.3f}, "
-                    f"sick rate = {g['sick_rate']:.3f}"
+            for g in city.groups:
+                yield (
+                    f"Group {g.group}: "
+                    f"size = {g.size}, "
+                    f"healthcare = {g.healthcare:.3f}, "
+                    f"employment_rate = {g.employment_rate:.3f}, "
+                    f"sick rate = {g.sick_rate:.3f}"
                     )
 
-            for f in city.city_data.data[week-1]['firm_data']:
-                print(
-                    f"Ownership: {f['ownership']}, "                    
-                    f"Good: {f['good']}, "
-                    f"Employed = {f['employed']}, "
-                    f"Total productivity = {f['total_productivity']:.0f},"         
+            for f in city.firms:
+                yield (
+                    f"Ownership: {f.ownership}, "
+                    f"Good: {f.good}, "
+                    f"Employed = {f.employed}, "
+                    f"Total productivity = {f.total_productivity:.0f},"
                 )
 
-            for good, amount in city.inv.items():
-                print(f"Good: {good}, Kgs: {amount:.2f}")
+            for good, amount in city.inventory:
+                yield f"Good: {good}, Kgs: {amount:.2f}"
 
-            if city.last_food_deficit:
-                print(f"Food deficit: {city.last_food_deficit:.2f} Kgs")
+            if city.food_deficit:
+                yield f"Food deficit: {city.food_deficit:.2f} Kgs"
             else:
-                print("No food deficit")
-            print(f"City treasury: {city.state.treasury}")
+                yield "No food deficit"
+            yield f"City treasury: {city.treasury}"
 
-            for migration in city.migrations: # Prints migration data
+            for source_group, target_group, amount in city.migrations: # Migration data
 
-                from_group = migration.source_group_index + 1
-                to_group = migration.target_group_index + 1
-                amount = migration.amount
-                print(f"{from_group} -> {to_group}, amount: {amount:.3f}")
+                yield f"{source_group + 1} -> {target_group + 1}, amount: {amount:.3f}"
@@ -0,0 +1,109 @@
+'''
+Immutable per-week summary of the simulation, taken in the tick loop and
+handed to report writers so they never touch live simulation objects.
+'''
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class GroupSummary:
+    group: int
+    size: int
+    healthcare: float
+    employment_rate: float
+    sick_rate: float
+
+
+@dataclass(frozen=True)
+class FirmSummary:
+    ownership: str
+    good: str
+    employed: int
+    total_productivity: float
+
+
+@dataclass(frozen=True)
+class CitySummary:
+    name: str
+    population: int
+    productivity: float
+    births: int
+    deaths: int
+    groups: tuple[GroupSummary, ...]
+    firms: tuple[FirmSummary, ...]
+    inventory: tuple[tuple[str, float], ...]
+    food_deficit: float | None
+    treasury: float
+    migrations: tuple[tuple[int, int, int], ...] # (source group, target group, amount)
+
+
+@dataclass(frozen=True)
+class ProvinceSummary:
+    name: str
+    cities: tuple[CitySummary, ...]
+
+
+@dataclass(frozen=True)
+class CountrySummary:
+    name: str
+    provinces: tuple[ProvinceSummary, ...]
+
+
+@dataclass(frozen=True)
+class WeekSummary:
+    week: int
+    countries: tuple[CountrySummary, ...]
+
+
+def summarise_city(city) -> CitySummary:
+    '''Copy what the report shows for one city from its live state.
+
+    Read from the city rather than its history, which may not have kept
+    this tick (history.interval, downsampling or ring eviction).
+    '''
+    migrations = city.migrations
+    return CitySummary(
+        name=city.name,
+        population=int(city.total_population),
+        productivity=city.productivity,
+        births=city.birth_total,
+        deaths=city.death_total,
+        groups=tuple(
+            GroupSummary(i, int(g.size), g.healthcare, g.employment_rate, g.sick_rate)
+            for i, g in enumerate(city.populations, 1)
+        ),
+        firms=tuple(
+            FirmSummary(f.ownership, f.good, f.employed, f.total_productivity)
+            for f in city.firms
+        ),
+        inventory=tuple(city.inv.items()),
+        food_deficit=city.last_food_deficit,
+        treasury=city.state.treasury,
+        migrations=tuple(zip(migrations.column("source_group_index").tolist(),
+                             migrations.column("target_group_index").tolist(),
+                             migrations.column("amount").tolist())),
+    )
+
+
+def summarise(week: int, core, spr: bool) -> WeekSummary:
+    '''
+    Summary of every country for the week. Provinces and cities are only
+    included when spr (sub province report) is set.
+    '''
+    return WeekSummary(
+        week=week,
+        countries=tuple(
+            CountrySummary(
+                name=country.name,
+                provinces=tuple(
+                    ProvinceSummary(
+                        name=province.name,
+                        cities=tuple(summarise_city(city) for city in province.cities),
+                    )
+                    for province in country.provinces
+                ) if spr else (),
+            )
+            for country in core.countries
+        ),
+    )